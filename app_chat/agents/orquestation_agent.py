@@ -1,7 +1,7 @@
 from smolagents import CodeAgent, DuckDuckGoSearchTool
 from dotenv import load_dotenv
 import os
-from app_chat.azureOpenAIServerModel import AzureOpenAIServerModel
+from app_chat.azureOpenAIServerModel import get_chat_model
 from app_chat.agents.vectorial_agent import ask_vectorial_agent
 from app_chat.agents.postgres_agent import ask_postgres_agent
 from app_chat.tools.postgres_tools import extract_from_id_if_present
@@ -9,17 +9,8 @@ from app_chat.tools.postgres_tools import extract_from_id_if_present
 class OrchestrationAgent:
     def __init__(self):
         load_dotenv()
-        api_key = os.environ["AZURE_OPENAI_KEY"]
-        deployment_name = os.environ["AZURE_OPENAI_MODEL_ID"]
-        api_base = os.environ["AZURE_OPENAI_ENDPOINT"] 
-        api_version = os.environ["AZURE_API_VERSION"] 
-
-        model = AzureOpenAIServerModel(
-            model_id = deployment_name,
-            api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=api_base
-        )
+
+        model = get_chat_model()
 
         self.agent = CodeAgent(
             model=model,
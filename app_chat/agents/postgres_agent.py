@@ -1,7 +1,7 @@
 import os
 import psycopg2
 from dotenv import load_dotenv
-from app_chat.azureOpenAIServerModel import AzureOpenAIServerModel
+from app_chat.azureOpenAIServerModel import get_chat_model
 from smolagents import CodeAgent, tool
 from app_chat.tools.postgres_tools import get_record_by_id, get_record_by_id_vectorial, run_query, get_record_by_id_vectorial_, get_record_by_id_
 
@@ -12,17 +12,8 @@ class PostgresAgent:
 
         postgres_user = os.environ["POSTGRES_USER"]
         postgres_password = os.environ["POSTGRES_PASSWORD"]
-        api_key = os.environ["AZURE_OPENAI_KEY"]
-        deployment_name = os.environ["AZURE_OPENAI_MODEL_ID"]
-        api_base = os.environ["AZURE_OPENAI_ENDPOINT"] 
-        api_version = os.environ["AZURE_API_VERSION"] 
-
-        model = AzureOpenAIServerModel(
-            model_id = deployment_name,
-            api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=api_base
-        )
+
+        model = get_chat_model()
 
         if (os.environ["ENVIRONMENT"] == "PROD"):
             self.table_name = table_name
@@ -2,6 +2,7 @@ import threading
 import time
 from app_chat.agents.orquestation_agent import OrchestrationAgent
 from app_chat.logging_setup import redirect_stdout_to_logger
+from app_chat.tools.vector_store_registry import close_vectorstores
 import os
 import psycopg2
 from dotenv import load_dotenv
@@ -106,6 +107,7 @@ class OrchestrationManager:
 
             if os.path.exists(VECTORIAL_ZIP_PATH):
                 if os.path.exists(VECTORIAL_EXTRACT_PATH):
+                    close_vectorstores()
                     shutil.rmtree(VECTORIAL_EXTRACT_PATH)
                     print(f"Carpeta {VECTORIAL_EXTRACT_PATH} eliminada para limpieza.")
 
@@ -0,0 +1,266 @@
+"""
+Servidor HTTP local que imita Azure OpenAI (chat completions y embeddings) para probar y
+medir el pipeline sin credenciales ni red.
+
+Admite latencia fija por petición, inyección de 429 (cada N peticiones o por una cuota de
+peticiones por minuto, con las cabeceras retry-after-ms y x-ratelimit-* de Azure) y
+respuestas programadas por despliegue. Los embeddings son los de HashingEmbeddingProvider,
+así que son deterministas.
+
+En los tests se usa con el fixture `azure_stub` de conftest.py. También se puede arrancar
+a mano y apuntar el .env a él (AZURE_OPENAI_ENDPOINT / AZURE_EMBEDDING_ENDPOINT):
+    python -m app_chat.tests.azure_stub --port 8089 --latency 0.2 --rate-limit-every 10
+"""
+import re
+import json
+import time
+import array
+import base64
+import argparse
+import threading
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app_chat.tools.embedding_provider import HashingEmbeddingProvider
+from app_chat.tools.rate_limiter import estimate_tokens
+
+PATH_RE = re.compile(r"^/openai/deployments/([^/]+)/(chat/completions|embeddings)$")
+
+
+class AzureStub:
+    """
+    Estado y configuración del servidor. Los atributos se pueden cambiar mientras está en marcha.
+
+    Args:
+        latency (float): Segundos que tarda cada respuesta.
+        rate_limit_every (int): Si es > 0, responde 429 a una de cada `rate_limit_every` peticiones.
+        requests_per_minute (int): Si se indica, cuota por despliegue; al superarla responde 429.
+        retry_after (float): Segundos que se indican en las respuestas 429.
+        embedding_dim (int): Dimensión de los embeddings.
+        responder (callable): Función (despliegue, mensajes) -> texto de la respuesta de chat
+            cuando no hay respuestas programadas.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, rate_limit_every: int = 0,
+                 requests_per_minute: int = None, retry_after: float = 0.01, embedding_dim: int = 256,
+                 responder=None):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.requests_per_minute = requests_per_minute
+        self.retry_after = retry_after
+        self.responder = responder or (lambda deployment, messages: "OK")
+        self.embeddings = HashingEmbeddingProvider(dim=embedding_dim)
+
+        self._lock = threading.Lock()
+        self._scripts = defaultdict(deque)
+        self._windows = defaultdict(deque)
+        self.requests = Counter()
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def script(self, deployment: str, *responses):
+        """
+        Programa las siguientes respuestas de `deployment`, en orden. Cada una puede ser un
+        texto (contenido de la respuesta de chat), un dict (cuerpo JSON tal cual) o un entero
+        (código de error HTTP).
+        """
+        with self._lock:
+            self._scripts[deployment].extend(responses)
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = Counter()
+            self.rate_limited = 0
+            self.max_in_flight = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="azure-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _admit(self, deployment: str, kind: str):
+        """Registra la petición y decide si se programa una respuesta o se limita (429)."""
+        with self._lock:
+            self.requests[kind] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+            if self._scripts[deployment]:
+                return self._scripts[deployment].popleft(), None
+
+            total = sum(self.requests.values())
+            if self.rate_limit_every and total % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return 429, None
+
+            remaining = None
+            if self.requests_per_minute:
+                window = self._windows[deployment]
+                now = time.monotonic()
+                while window and now - window[0] >= 60:
+                    window.popleft()
+                if len(window) >= self.requests_per_minute:
+                    self.rate_limited += 1
+                    return 429, 0
+                window.append(now)
+                remaining = self.requests_per_minute - len(window)
+            return None, remaining
+
+    def _done(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def chat_completion(self, deployment: str, body: dict, content=None) -> dict:
+        messages = body.get("messages", [])
+        if content is None:
+            content = self.responder(deployment, messages)
+        prompt_tokens = estimate_tokens([json.dumps(messages, ensure_ascii=False)])
+        completion_tokens = estimate_tokens([content])
+        return {
+            "id": f"chatcmpl-stub-{sum(self.requests.values())}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": deployment,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def embedding(self, deployment: str, body: dict) -> dict:
+        texts = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = self.embeddings.embed(texts)
+
+        data = []
+        for i, vector in enumerate(vectors):
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(array.array("f", vector).tobytes()).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+
+        tokens = estimate_tokens(texts)
+        return {
+            "object": "list",
+            "data": data,
+            "model": deployment,
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+
+def _handler(stub: AzureStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            match = PATH_RE.match(self.path.split("?")[0])
+            if match is None:
+                self._send(404, {"error": {"code": "404", "message": f"Ruta desconocida: {self.path}"}})
+                return
+
+            deployment, route = match.groups()
+            kind = "chat" if route == "chat/completions" else "embeddings"
+            scripted, remaining = stub._admit(deployment, kind)
+            try:
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                headers = {}
+                if remaining is not None:
+                    headers["x-ratelimit-remaining-requests"] = str(remaining)
+
+                if isinstance(scripted, int):
+                    headers["retry-after-ms"] = str(int(stub.retry_after * 1000))
+                    headers["retry-after"] = str(max(int(stub.retry_after), 1))
+                    self._send(scripted, {"error": {"code": str(scripted), "message": "Respuesta de error del stub"}}, headers)
+                elif isinstance(scripted, dict):
+                    self._send(200, scripted, headers)
+                elif kind == "chat":
+                    self._send(200, stub.chat_completion(deployment, body, scripted), headers)
+                else:
+                    self._send(200, stub.embedding(deployment, body), headers)
+            finally:
+                stub._done()
+
+        def _send(self, status: int, payload: dict, headers: dict = None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def stub_env(stub: AzureStub, chat_deployment: str = "stub-chat", embedding_deployment: str = "stub-embeddings") -> dict:
+    """Variables de entorno que apuntan los clientes de chat y embeddings al stub."""
+    return {
+        "AZURE_OPENAI_ENDPOINT": stub.endpoint,
+        "AZURE_OPENAI_KEY": "stub",
+        "AZURE_API_VERSION": "2024-10-21",
+        "AZURE_OPENAI_MODEL_ID": chat_deployment,
+        "AZURE_EMBEDDING_ENDPOINT": stub.endpoint,
+        "AZURE_EMBEDDING_KEY": "stub",
+        "AZURE_EMBEDDING_API_VERSION": "2024-10-21",
+        "AZURE_EMBEDDING_DEPLOYMENT_NAME": embedding_deployment,
+        "EMBEDDING_PROVIDER": "azure",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita Azure OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos por respuesta")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Responder 429 a una de cada N peticiones")
+    parser.add_argument("--rpm", type=int, default=None, help="Cuota de peticiones por minuto y despliegue")
+    args = parser.parse_args()
+
+    stub = AzureStub(args.host, args.port, latency=args.latency, rate_limit_every=args.rate_limit_every,
+                     requests_per_minute=args.rpm)
+    print(f"Stub de Azure OpenAI escuchando en {stub.endpoint}")
+    for name, value in stub_env(stub).items():
+        print(f"{name}={value}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
+        print(f"Peticiones: {dict(stub.requests)}, 429: {stub.rate_limited}, concurrencia máxima: {stub.max_in_flight}")
+
+
+if __name__ == "__main__":
+    main()
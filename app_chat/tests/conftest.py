@@ -4,4 +4,24 @@ import os
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
 if PROJECT_ROOT not in sys.path:
-    sys.path.insert(0, PROJECT_ROOT)
\ No newline at end of file
+    sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+from app_chat import azureOpenAIServerModel
+from app_chat.tools.embedding_provider import set_embedding_provider
+from app_chat.tests.azure_stub import AzureStub, stub_env
+
+
+@pytest.fixture
+def azure_stub(monkeypatch):
+    """
+    Arranca el stub local de Azure OpenAI (tests/azure_stub.py) y apunta a él los clientes de
+    chat y embeddings durante el test. Se configura a través del objeto devuelto.
+    """
+    with AzureStub() as stub:
+        for name, value in stub_env(stub).items():
+            monkeypatch.setenv(name, value)
+        monkeypatch.setattr(azureOpenAIServerModel, "_models", {})
+        set_embedding_provider(None)
+        yield stub
+        set_embedding_provider(None)
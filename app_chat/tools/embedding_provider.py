@@ -0,0 +1,134 @@
+import os
+import re
+import math
+import hashlib
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from app_chat.azure_clients import get_embedding_client, call_with_retry, is_retryable
+from app_chat.tools.rate_limiter import get_embedding_rate_limiter, estimate_tokens
+
+EMBEDDING_HASH_DIM = int(os.getenv("EMBEDDING_HASH_DIM", 256))
+EMBEDDING_HASH_NGRAM = int(os.getenv("EMBEDDING_HASH_NGRAM", 3))
+
+WORD_RE = re.compile(r"\w+")
+
+
+class EmbeddingProvider(ABC):
+    """
+    Interfaz de los proveedores de embeddings que usan la indexación y la recuperación.
+
+    `name` identifica el modelo: es la clave de la caché de embeddings y del registro de
+    embeddings de prompts, de modo que vectores de proveedores distintos nunca se mezclan.
+    Una misma base vectorial debe indexarse y consultarse siempre con el mismo proveedor.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abstractmethod
+    def embed(self, texts: list, max_retries: int = None) -> list:
+        """
+        Calcula los embeddings de `texts` en una sola petición.
+
+        Returns:
+            list: Lista de vectores, en el mismo orden que `texts`.
+        """
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Indica si `error` es transitorio (ya reintentado) y dividir la petición no ayudaría."""
+        return False
+
+
+class AzureEmbeddingProvider(EmbeddingProvider):
+    """Embeddings del despliegue de Azure OpenAI configurado en AZURE_EMBEDDING_*."""
+
+    def __init__(self, deployment: str = None):
+        self.deployment = deployment or os.environ["AZURE_EMBEDDING_DEPLOYMENT_NAME"]
+        super().__init__(self.deployment)
+
+    def embed(self, texts: list, max_retries: int = None) -> list:
+        response = call_with_retry(
+            self.deployment,
+            get_embedding_client().embeddings.create,
+            input=texts,
+            model=self.deployment,
+            limiter=get_embedding_rate_limiter(self.deployment),
+            estimated_tokens=estimate_tokens(texts),
+            max_retries=max_retries
+        )
+        return [r.embedding for r in response.data]
+
+    def is_retryable(self, error: Exception) -> bool:
+        return is_retryable(error)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeddings locales y deterministas, sin red: cada palabra y cada n-grama de caracteres
+    se proyecta con un hash a una de `dim` dimensiones (con signo) y el vector se normaliza.
+
+    Textos con vocabulario parecido dan vectores cercanos, lo que basta para pruebas y
+    benchmarks de carga de la indexación y la recuperación sin llamar a Azure.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_HASH_DIM, ngram: int = EMBEDDING_HASH_NGRAM):
+        super().__init__(f"hashing-{dim}-{ngram}")
+        self.dim = dim
+        self.ngram = ngram
+
+    def _features(self, text: str) -> list:
+        text = "".join(c for c in unicodedata.normalize("NFKD", text.lower()) if not unicodedata.combining(c))
+        features = []
+        for word in WORD_RE.findall(text):
+            features.append(word)
+            padded = f"#{word}#"
+            features.extend(padded[i:i + self.ngram] for i in range(max(len(padded) - self.ngram + 1, 0)))
+        return features
+
+    def embed_one(self, text: str) -> list:
+        vector = [0.0] * self.dim
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+
+        norm = math.sqrt(sum(x * x for x in vector))
+        if norm:
+            vector = [x / norm for x in vector]
+        return vector
+
+    def embed(self, texts: list, max_retries: int = None) -> list:
+        return [self.embed_one(text) for text in texts]
+
+
+PROVIDERS = {
+    "azure": AzureEmbeddingProvider,
+    "hashing": HashingEmbeddingProvider,
+}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """
+    Devuelve el proveedor de embeddings compartido por el proceso, elegido con
+    EMBEDDING_PROVIDER (azure por defecto, o hashing para trabajar sin red). La
+    configuración se lee en la primera llamada, no al importar el módulo.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            nombre = os.getenv("EMBEDDING_PROVIDER", "azure").lower()
+            if nombre not in PROVIDERS:
+                raise ValueError(f"EMBEDDING_PROVIDER desconocido: {nombre}. Opciones: {', '.join(PROVIDERS)}")
+            _provider = PROVIDERS[nombre]()
+        return _provider
+
+
+def set_embedding_provider(provider: EmbeddingProvider):
+    """Sustituye el proveedor compartido (p. ej. en tests); con None se vuelve a leer la configuración."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
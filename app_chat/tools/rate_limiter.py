@@ -0,0 +1,162 @@
+import os
+import time
+import threading
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(texts: list) -> int:
+    """Estimación aproximada de tokens (unos 4 caracteres por token) sin necesidad de tokenizador."""
+    return sum(len(text) // CHARS_PER_TOKEN + 1 for text in texts)
+
+
+def estimate_chat_tokens(messages: list, completion_tokens: int = None) -> int:
+    """
+    Estima los tokens que Azure descontará de la cuota por una petición de chat: los del
+    prompt más los reservados para la respuesta (por defecto AZURE_CHAT_COMPLETION_TOKENS).
+    """
+    if completion_tokens is None:
+        completion_tokens = int(os.getenv("AZURE_CHAT_COMPLETION_TOKENS", 1000))
+
+    texts = []
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+        if isinstance(content, list):
+            texts.extend(str(part.get("text", "")) if isinstance(part, dict) else str(part) for part in content)
+        elif content is not None:
+            texts.append(str(content))
+    return estimate_tokens(texts) + 4 * len(messages) + completion_tokens
+
+
+class TokenBucket:
+    """
+    Token bucket con una cuota por minuto.
+
+    La capacidad del bucket equivale a 10 segundos de cuota, que es la ventana con la
+    que Azure OpenAI aplica los límites, para no gastar el minuto entero en una ráfaga.
+    No es thread-safe por sí mismo: lo protege el RateLimiter que lo contiene.
+    """
+
+    def __init__(self, per_minute: int):
+        if per_minute <= 0:
+            raise ValueError("La cuota por minuto debe ser mayor que 0.")
+
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, per_minute / 6)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Segundos que faltan para disponer de `amount` (0 si ya hay cuota)."""
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def limit_to(self, remaining: float):
+        """Ajusta la cuota disponible a la que el servidor dice que queda, si es menor."""
+        self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    """
+    Limitador de un despliegue de Azure OpenAI, compartido entre hilos, que aplica a la vez
+    el límite de peticiones por minuto y el de tokens por minuto.
+
+    La cuota se descuenta antes de enviar cada petición a partir de una estimación de tokens,
+    y se corrige con las cabeceras x-ratelimit-remaining-* de las respuestas y con los
+    Retry-After de los 429.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        """Bloquea hasta que haya cuota para una petición de `tokens` tokens y la consume."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                wait = max(self.paused_until - now, self.requests.wait_time(1))
+
+                if self.tokens is not None:
+                    self.tokens.refill(now)
+                    wait = max(wait, self.tokens.wait_time(tokens))
+
+                if wait <= 0:
+                    self.requests.consume(1)
+                    if self.tokens is not None:
+                        self.tokens.consume(tokens)
+                    return
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Detiene todas las peticiones del despliegue durante `seconds` (p. ej. tras un 429)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        """Corrige la cuota disponible con las cabeceras de límite que devuelve Azure."""
+        with self._lock:
+            now = time.monotonic()
+            try:
+                remaining_requests = headers.get("x-ratelimit-remaining-requests")
+                if remaining_requests is not None:
+                    self.requests.refill(now)
+                    self.requests.limit_to(float(remaining_requests))
+
+                remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+                if remaining_tokens is not None and self.tokens is not None:
+                    self.tokens.refill(now)
+                    self.tokens.limit_to(float(remaining_tokens))
+            except ValueError:
+                pass
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, requests_per_minute: int, tokens_per_minute: int = None) -> RateLimiter:
+    """
+    Devuelve el limitador compartido por el proceso para `name` (normalmente el nombre
+    del despliegue de Azure), creándolo la primera vez.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return _limiters[name]
+
+
+def find_rate_limiter(name: str):
+    """Devuelve el limitador ya creado para `name`, o None si no existe."""
+    with _limiters_lock:
+        return _limiters.get(name)
+
+
+def get_chat_rate_limiter(deployment: str) -> RateLimiter:
+    """
+    Limitador del despliegue de chat. Las cuotas (AZURE_CHAT_RPM, AZURE_CHAT_TPM) se leen al
+    llamar, no al importar el módulo, para que se apliquen los valores cargados del .env.
+    """
+    return get_rate_limiter(
+        deployment,
+        int(os.getenv("AZURE_CHAT_RPM", 60)),
+        int(os.getenv("AZURE_CHAT_TPM", 100000))
+    )
+
+
+def get_embedding_rate_limiter(deployment: str) -> RateLimiter:
+    """Limitador del despliegue de embeddings, con las cuotas AZURE_EMBEDDING_RPM y AZURE_EMBEDDING_TPM."""
+    return get_rate_limiter(
+        deployment,
+        int(os.getenv("AZURE_EMBEDDING_RPM", 120)),
+        int(os.getenv("AZURE_EMBEDDING_TPM", 120000))
+    )
@@ -0,0 +1,58 @@
+import os
+import atexit
+import threading
+from langchain_community.vectorstores import Chroma
+from chromadb.api.shared_system_client import SharedSystemClient
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_vectorstore(vectorstore_path: str) -> Chroma:
+    """
+    Devuelve el vectorstore Chroma de `vectorstore_path`, abriéndolo solo la primera vez.
+
+    Los handles se comparten entre hilos durante toda la vida del proceso, evitando cargar
+    SQLite y los índices en cada búsqueda.
+    """
+    key = os.path.abspath(vectorstore_path)
+    with _stores_lock:
+        if key not in _stores:
+            print(f"Cargando vectorstore desde: {vectorstore_path}")
+            _stores[key] = Chroma(persist_directory=vectorstore_path)
+        return _stores[key]
+
+
+def invalidate_vectorstore(vectorstore_path: str):
+    """
+    Cierra y olvida el handle de `vectorstore_path`, para que la siguiente llamada a
+    get_vectorstore lo vuelva a abrir (por ejemplo, tras reemplazar la carpeta en disco).
+    """
+    with _stores_lock:
+        db = _stores.pop(os.path.abspath(vectorstore_path), None)
+
+    if db is not None:
+        _close(db)
+
+
+def close_vectorstores():
+    """Cierra todos los handles abiertos. Se ejecuta automáticamente al terminar el proceso."""
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+
+    for db in stores:
+        _close(db)
+
+
+def _close(db: Chroma):
+    try:
+        client = db._client
+        system = client._system
+        SharedSystemClient._identifier_to_system.pop(client._identifier, None)
+        system.stop()
+    except Exception as e:
+        print(f"Error al cerrar el vectorstore: {e}")
+
+
+atexit.register(close_vectorstores)
@@ -1,20 +1,25 @@
 from smolagents import tool
-from langchain_community.vectorstores import Chroma
 from dotenv import load_dotenv
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import os
-from openai import AzureOpenAI
 import pdfplumber
 from langchain_community.docstore.document import Document
-import time
 from tqdm import tqdm  
 import uuid
+from app_chat.tools.vector_store_registry import get_vectorstore
+from app_chat.tools.embedding_provider import get_embedding_provider
 
 load_dotenv()
-api_key = os.environ["AZURE_EMBEDDING_KEY"]
-deployment_name = os.environ["AZURE_EMBEDDING_DEPLOYMENT_NAME"]
-api_base = os.environ["AZURE_EMBEDDING_ENDPOINT"] 
-api_version = os.environ["AZURE_EMBEDDING_API_VERSION"] 
+
+
+def doc_filter(doc_id: str) -> dict:
+    """
+    Filtro de Chroma para los fragmentos de un documento. Los PDFs compartidos por varias
+    convocatorias se indexan una vez con el nombre de uno de sus ficheros y el resto de
+    nombres como claves `documento_<id>` a True, así que se busca por cualquiera de ellos.
+    """
+    return {"$or": [{"id": doc_id}, {f"documento_{doc_id}": True}]}
+
 
 @tool
 def get_context(prompt: str) -> list:
@@ -37,20 +42,9 @@ def get_context(prompt: str) -> list:
     if os.getenv("ENVIRONMENT") == "TEST":
         vectorstore_path = "db_test"
 
-    client = AzureOpenAI(
-        azure_endpoint=api_base,
-        api_key=api_key,
-        api_version=api_version
-    )
+    embedding = get_embedding_provider().embed([prompt])[0]
 
-    response = client.embeddings.create(
-        input=[prompt],
-        model=deployment_name
-    )
-
-    embedding = response.data[0].embedding
-
-    db = Chroma(persist_directory=vectorstore_path)
+    db = get_vectorstore(vectorstore_path)
 
     results = db.similarity_search_by_vector(
         embedding,
@@ -81,27 +75,19 @@ def get_context_by_id(prompt: str, doc_id: str) -> list:
     if os.getenv("ENVIRONMENT") == "TEST":
         vectorstore_path = "db_test"
 
-    client = AzureOpenAI(
-        azure_endpoint=api_base,
-        api_key=api_key,
-        api_version=api_version
-    )
-
-    response = client.embeddings.create(
-        input=[prompt],
-        model=deployment_name
-    )
-
-    embedding = response.data[0].embedding
+    embedding = get_embedding_provider().embed([prompt])[0]
 
-    db = Chroma(persist_directory=vectorstore_path)
+    db = get_vectorstore(vectorstore_path)
 
     results = db.similarity_search_by_vector(
         embedding,
         k=k,
-        filter={"id": doc_id}
+        filter=doc_filter(doc_id)
     )
 
+    for doc in results:
+        doc.metadata["id"] = doc_id
+
     return results
 
 @tool
@@ -127,31 +113,23 @@ def get_context_by_id_and_fragment(prompt: str, doc_id: str, fragment_id: int) -
     if os.getenv("ENVIRONMENT") == "TEST":
         vectorstore_path = "db_test"
 
-    client = AzureOpenAI(
-        azure_endpoint=api_base,
-        api_key=api_key,
-        api_version=api_version
-    )
-
-    response = client.embeddings.create(
-        input=[prompt],
-        model=deployment_name
-    )
+    embedding = get_embedding_provider().embed([prompt])[0]
 
-    embedding = response.data[0].embedding
-
-    db = Chroma(persist_directory=vectorstore_path)
+    db = get_vectorstore(vectorstore_path)
 
     results = db.similarity_search_by_vector(
         embedding,
         k=k,
         filter={
             "$and": [
-                {"id": doc_id},
+                doc_filter(doc_id),
                 {"fragment": str(fragment_id)}
             ]
         }
     )
+
+    for doc in results:
+        doc.metadata["id"] = doc_id
     return results
 
 def save_pdf_at_vec_db(
@@ -160,12 +138,14 @@ def save_pdf_at_vec_db(
     chunk_size: int = 500,
     chunk_overlap: int = 100,
     batch_size: int = 50,
-    max_retries: int = 5,
-    retry_delay: int = 10
+    max_retries: int = None
 ):
     """
     Procesa una lista de PDFs y guarda sus embeddings en una base de datos vectorial Chroma,
-    manejando automáticamente limitaciones de tasa de Azure OpenAI.
+    con el proveedor de embeddings configurado (get_embedding_provider).
+
+    Los errores transitorios de Azure se reintentan con la política común de call_with_retry;
+    si un batch sigue fallando tras `max_retries` reintentos se descarta y se continúa.
     """
     if not pdf_paths:
         raise ValueError("La lista de pdf_paths está vacía.")
@@ -215,49 +195,28 @@ def save_pdf_at_vec_db(
 
     print(f"Total documentos para indexar: {len(all_documents)}")
 
-    client = AzureOpenAI(
-        api_version=api_version,
-        azure_endpoint=api_base,
-        api_key=api_key
-    )
+    provider = get_embedding_provider()
 
     print(f"Guardando en base vectorial: {vectorstore_path}")
-    db = Chroma(persist_directory=vectorstore_path)
+    db = get_vectorstore(vectorstore_path)
 
     for i in tqdm(range(0, len(all_documents), batch_size), desc="Indexando documentos"):
         batch = all_documents[i:i + batch_size]
 
-        retries = 0
-        while retries <= max_retries:
-            try:
-                texts_batch = [doc.page_content for doc in batch]
-                metadatas_batch = [doc.metadata for doc in batch]
-
-                response = client.embeddings.create(
-                    input=texts_batch,
-                    model=deployment_name
-                )
-                embeddings = [r.embedding for r in response.data]
-
-                db._collection.add(
-                    embeddings=embeddings,
-                    documents=texts_batch,
-                    metadatas=metadatas_batch,
-                    ids=[str(uuid.uuid4()) for _ in range(len(texts_batch))]
-                )
-
+        try:
+            texts_batch = [doc.page_content for doc in batch]
+            metadatas_batch = [doc.metadata for doc in batch]
 
-                break
-            except Exception as e:
-                print(f"Error al indexar batch {i//batch_size + 1}: {str(e)}")
-                retries += 1
-                if retries > max_retries:
-                    print(f"Max reintentos alcanzados para batch {i//batch_size + 1}, continuando con el siguiente.")
-                    break
-                print(f"Esperando {retry_delay} segundos antes de reintentar...")
-                time.sleep(retry_delay)
+            embeddings = provider.embed(texts_batch, max_retries=max_retries)
 
-    db.persist()
+            db._collection.add(
+                embeddings=embeddings,
+                documents=texts_batch,
+                metadatas=metadatas_batch,
+                ids=[str(uuid.uuid4()) for _ in range(len(texts_batch))]
+            )
+        except Exception as e:
+            print(f"Error al indexar batch {i//batch_size + 1}: {str(e)}. Continuando con el siguiente.")
 
     print(f"Base vectorial guardada con {len(all_documents)} documentos.")
 
@@ -1,22 +1,12 @@
 from smolagents import CodeAgent
 from dotenv import load_dotenv
-import os
 from app_crawler.tools.tools import fetch_html_tool, save_json_tool
-from azureOpenAIServerModel import AzureOpenAIServerModel
+from app_crawler.azureOpenAIServerModel import get_chat_model
 
 def crawl_convocatoria(url_objetivo: str, id: str, base_json_path: str):
     load_dotenv()
-    api_key = os.environ["AZURE_OPENAI_KEY"]
-    deployment_name = os.environ["AZURE_OPENAI_MODEL_ID"]
-    api_base = os.environ["AZURE_OPENAI_ENDPOINT"] 
-    api_version = os.environ["AZURE_API_VERSION"] 
-
-    model = AzureOpenAIServerModel(
-        model_id=deployment_name,
-        api_key=api_key,
-        api_version=api_version,
-        azure_endpoint=api_base
-    )
+
+    model = get_chat_model()
 
     agent = CodeAgent(
         model=model,
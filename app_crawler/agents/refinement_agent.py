@@ -1,22 +1,16 @@
 import os
 import json
+import concurrent.futures
 from smolagents import CodeAgent
 from dotenv import load_dotenv
-from app_crawler.tools.tools import save_json_field_tool, add_field_ref_json_tool, get_organismo_context, get_beneficiarios_context, get_presupuesto_minimo_context, get_presupuesto_maximo_context, get_fecha_inicio_context, get_fecha_fin_context, get_objetivos_convocatoria_context, get_anio_context, get_duracion_minima_context, get_duracion_maxima_context, get_tipo_financiacion_context, get_forma_plazo_cobro_context, get_minimis_context, get_region_aplicacion_context, get_intensidad_subvencion_context, get_intensidad_prestamo_context, get_tipo_consorcio_context, get_costes_elegibles_context, get_intensidad_subvencion_context, get_intensidad_prestamo_context, get_costes_elegibles_context
-from app_crawler.azureOpenAIServerModel import AzureOpenAIServerModel
+from app_crawler.tools.tools import prepare_context_embeddings, prefetch_contexts, release_contexts, save_json_field_tool, add_field_ref_json_tool, get_organismo_context, get_beneficiarios_context, get_presupuesto_minimo_context, get_presupuesto_maximo_context, get_fecha_inicio_context, get_fecha_fin_context, get_objetivos_convocatoria_context, get_anio_context, get_duracion_minima_context, get_duracion_maxima_context, get_tipo_financiacion_context, get_forma_plazo_cobro_context, get_minimis_context, get_region_aplicacion_context, get_intensidad_subvencion_context, get_intensidad_prestamo_context, get_tipo_consorcio_context, get_costes_elegibles_context, get_intensidad_subvencion_context, get_intensidad_prestamo_context, get_costes_elegibles_context
+from app_crawler.azureOpenAIServerModel import get_chat_model
+from app_crawler.tools.json_document import open_document, close_document
 
 load_dotenv()
-api_key = os.environ["AZURE_OPENAI_KEY"]
-deployment_name = os.environ["AZURE_OPENAI_MODEL_ID"]
-api_base = os.environ["AZURE_OPENAI_ENDPOINT"] 
-api_version = os.environ["AZURE_API_VERSION"] 
-
-model = AzureOpenAIServerModel(
-    model_id = deployment_name,
-    api_key=api_key,
-    api_version=api_version,
-    azure_endpoint=api_base
-)
+field_workers = int(os.getenv("REFINEMENT_FIELD_WORKERS", 6))
+
+model = get_chat_model()
 
 campos_revisar = [
     {
@@ -148,14 +142,44 @@ campos_revisar = [
 ]
 
 
-def verificar_campo(path_json, field_name_ref):
-    """Verifica si el campo field_name_ref existe en el JSON."""
+def verificar_campo(reference_document, field_name_ref):
+    """Verifica si el campo field_name_ref tiene referencias en el documento de referencias."""
+    return reference_document.has_value(field_name_ref)
+
+def get_output_paths(path_json: str, output_base_path: str):
+    """Devuelve las rutas del JSON refinado y del JSON de referencias para path_json."""
+    refined_dir = os.path.join(output_base_path, "refined")
+    reference_dir = os.path.join(output_base_path, "reference")
+    os.makedirs(refined_dir, exist_ok=True)
+    os.makedirs(reference_dir, exist_ok=True)
+
+    file_name = os.path.basename(path_json)
+    return os.path.join(refined_dir, file_name), os.path.join(reference_dir, file_name)
+
+def run_refinement_agent(path_json: str, vector_path: str, output_base_path: str, doc_id: str = None):
+    """
+    Refina todos los campos de campos_revisar para un JSON. Los campos se procesan en
+    paralelo sobre documentos en memoria (refinado y referencias) que las herramientas
+    modifican bajo lock, y que se escriben a disco una sola vez al terminar.
+
+    Si se indica `doc_id`, `vector_path` es la base vectorial compartida y el contexto se
+    filtra por esa convocatoria. El contexto de todos los campos se recupera al principio
+    con una única búsqueda (prefetch_contexts).
+
+    Returns:
+        dict: {campo: (intentos, éxito)}, para medir los reintentos por documento.
+    """
+    prepare_context_embeddings()
+    prefetched = prefetch_contexts(vector_path, doc_id)
+
     with open(path_json, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return field_name_ref in data and data[field_name_ref] not in [None, "", []]
+        json_data = json.load(f)
+
+    output_path_refined, output_path_reference = get_output_paths(path_json, output_base_path)
+    open_document(output_path_refined)
+    reference_document = open_document(output_path_reference)
 
-def run_refinement_agent(path_json: str, vector_path: str, output_base_path: str):
-    for campo in campos_revisar:
+    def refine_field(campo):
         field_name = campo["field_name"]
         field_name_ref = campo["field_ref_name"]
         topic_description = campo["topic_description"]
@@ -166,7 +190,7 @@ def run_refinement_agent(path_json: str, vector_path: str, output_base_path: str
         exito = False
 
         while intento < max_intentos and not exito:
-            context = context_function(vector_path, intento)
+            context = context_function(vector_path, intento, doc_id)
 
             run_mini_agent(
                 path_json=path_json,
@@ -174,12 +198,35 @@ def run_refinement_agent(path_json: str, vector_path: str, output_base_path: str
                 field_name_ref=field_name_ref,
                 topic_description=topic_description,
                 context=context,
-                output_base_path=output_base_path
+                output_base_path=output_base_path,
+                json_data=json_data
             )
             
-            exito = verificar_campo(path_json, field_name_ref)
+            exito = verificar_campo(reference_document, field_name_ref)
             intento += 1
 
+        return intento, exito
+
+    intentos = {}
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=field_workers) as executor:
+            futures = {executor.submit(refine_field, campo): campo for campo in campos_revisar}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    intentos[futures[future]["field_name"]] = future.result()
+                except Exception as e:
+                    print(f"Error refinando el campo '{futures[future]['field_name']}' de {path_json}: {e}")
+    finally:
+        close_document(output_path_refined)
+        close_document(output_path_reference)
+        if prefetched:
+            release_contexts(vector_path, doc_id)
+
+    reintentos = sum(n - 1 for n, _ in intentos.values())
+    sin_referencias = sum(1 for _, exito in intentos.values() if not exito)
+    print(f"{os.path.basename(path_json)}: {reintentos} reintentos en {len(intentos)} campos, {sin_referencias} sin referencias.")
+    return intentos
+
 
 def run_mini_agent(
     path_json: str,
@@ -187,10 +234,12 @@ def run_mini_agent(
     field_name_ref: str,
     topic_description: str,
     context: str,
-    output_base_path: str
+    output_base_path: str,
+    json_data: dict = None
 ):
-    with open(path_json, "r", encoding="utf-8") as f:
-        json_data = json.load(f)
+    if json_data is None:
+        with open(path_json, "r", encoding="utf-8") as f:
+            json_data = json.load(f)
 
     agent = CodeAgent(
         model=model,
@@ -200,14 +249,7 @@ def run_mini_agent(
         ]
     )
 
-    refined_dir = os.path.join(output_base_path, "refined")
-    reference_dir = os.path.join(output_base_path, "reference")
-    os.makedirs(refined_dir, exist_ok=True)
-    os.makedirs(reference_dir, exist_ok=True)
-
-    file_name = os.path.basename(path_json)
-    output_path_refined = os.path.join(refined_dir, file_name)
-    output_path_reference = os.path.join(reference_dir, file_name)
+    output_path_refined, output_path_reference = get_output_paths(path_json, output_base_path)
 
     prompt = f"""
     Eres un agente especializado en extraer el campo {field_name} relacionado con {topic_description} de convocatorias públicas.
@@ -1,23 +1,12 @@
-import os
 from dotenv import load_dotenv
-from app_crawler.azureOpenAIServerModel import AzureOpenAIServerModel
+from app_crawler.azureOpenAIServerModel import get_chat_model
 from smolagents import CodeAgent
 
 class TestAgent:
     def __init__(self):
         load_dotenv()
 
-        api_key = os.environ["AZURE_OPENAI_KEY"]
-        deployment_name = os.environ["AZURE_OPENAI_MODEL_ID"]
-        api_base = os.environ["AZURE_OPENAI_ENDPOINT"]
-        api_version = os.environ["AZURE_API_VERSION"]
-
-        model = AzureOpenAIServerModel(
-            model_id=deployment_name,
-            api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=api_base
-        )
+        model = get_chat_model()
 
         self.agent = CodeAgent(
             model=model,
@@ -1,5 +1,9 @@
+import os
+import threading
 from typing import Optional, Dict
 from smolagents.models import OpenAIServerModel
+from app_crawler.azure_clients import get_azure_client, call_with_retry
+from app_crawler.tools.rate_limiter import get_chat_rate_limiter, estimate_chat_tokens
 
 class AzureOpenAIServerModel(OpenAIServerModel):
     """This model connects to an Azure OpenAI deployment.
@@ -27,12 +31,42 @@ class AzureOpenAIServerModel(OpenAIServerModel):
         custom_role_conversions: Optional[Dict[str, str]] = None,
         **kwargs,
     ):
-        super().__init__(model_id=model_id, api_key=api_key, custom_role_conversions=custom_role_conversions, **kwargs)
-        
-        import openai
-
-        self.client = openai.AzureOpenAI(
+        client = get_azure_client(
+            azure_endpoint=azure_endpoint,
             api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=azure_endpoint
+            api_version=api_version
         )
+
+        super().__init__(model_id=model_id, api_key=api_key, custom_role_conversions=custom_role_conversions, client=client, **kwargs)
+
+    def __call__(self, messages, *args, **kwargs):
+        return call_with_retry(
+            self.model_id,
+            super().__call__,
+            messages,
+            *args,
+            limiter=get_chat_rate_limiter(self.model_id),
+            estimated_tokens=estimate_chat_tokens(messages),
+            **kwargs
+        )
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_chat_model(model_id: Optional[str] = None) -> AzureOpenAIServerModel:
+    """
+    Devuelve el modelo de chat compartido por el proceso para `model_id` (por defecto
+    AZURE_OPENAI_MODEL_ID), configurado con las variables de entorno de Azure OpenAI.
+    """
+    model_id = model_id or os.environ["AZURE_OPENAI_MODEL_ID"]
+    with _models_lock:
+        if model_id not in _models:
+            _models[model_id] = AzureOpenAIServerModel(
+                model_id=model_id,
+                api_key=os.environ["AZURE_OPENAI_KEY"],
+                api_version=os.environ["AZURE_API_VERSION"],
+                azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"]
+            )
+        return _models[model_id]
@@ -0,0 +1,189 @@
+import os
+import time
+import random
+import threading
+import httpx
+import openai
+from dotenv import load_dotenv
+from app_crawler.tools.rate_limiter import RateLimiter, find_rate_limiter
+
+load_dotenv()
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_http_client = None
+_clients = {}
+_semaphores = {}
+_lock = threading.Lock()
+
+
+# La configuración de reintentos y concurrencia se lee al usarla y no al importar el módulo,
+# que puede cargarse antes de que load_dotenv() haya leído el .env.
+def get_max_retries() -> int:
+    return int(os.getenv("AZURE_MAX_RETRIES", 6))
+
+
+def get_max_concurrency() -> int:
+    return int(os.getenv("AZURE_MAX_CONCURRENCY", 8))
+
+
+def get_backoff_base() -> float:
+    return float(os.getenv("AZURE_BACKOFF_BASE", 1))
+
+
+def get_backoff_max() -> float:
+    return float(os.getenv("AZURE_BACKOFF_MAX", 60))
+
+
+def _deployment_from_path(path: str):
+    # Las rutas de Azure OpenAI tienen la forma /openai/deployments/<despliegue>/...
+    parts = path.strip("/").split("/")
+    if len(parts) > 2 and parts[0] == "openai" and parts[1] == "deployments":
+        return parts[2]
+    return None
+
+
+def _update_rate_limits(response: httpx.Response):
+    """Hook de respuesta: ajusta el limitador del despliegue con las cabeceras de cuota."""
+    deployment = _deployment_from_path(response.request.url.path)
+    limiter = find_rate_limiter(deployment) if deployment else None
+    if limiter is not None:
+        limiter.update_from_headers(response.headers)
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Cliente HTTP compartido por todos los clientes de Azure OpenAI del proceso, con un pool
+    de conexiones keep-alive para no repetir el handshake TLS en cada petición.
+    """
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            concurrency = get_max_concurrency()
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=concurrency * 4,
+                    max_keepalive_connections=concurrency * 2,
+                    keepalive_expiry=60
+                ),
+                timeout=httpx.Timeout(120, connect=10),
+                event_hooks={"response": [_update_rate_limits]}
+            )
+        return _http_client
+
+
+def get_azure_client(azure_endpoint: str, api_key: str, api_version: str) -> openai.AzureOpenAI:
+    """
+    Devuelve un cliente AzureOpenAI compartido para (endpoint, api_version, api_key).
+
+    Los reintentos internos del SDK se desactivan: la política de reintentos es la de
+    call_with_retry, común para chat y embeddings.
+    """
+    key = (azure_endpoint, api_version, api_key)
+    http_client = get_http_client()
+    with _lock:
+        if key not in _clients:
+            _clients[key] = openai.AzureOpenAI(
+                azure_endpoint=azure_endpoint,
+                api_key=api_key,
+                api_version=api_version,
+                http_client=http_client,
+                max_retries=0
+            )
+        return _clients[key]
+
+
+def get_embedding_client() -> openai.AzureOpenAI:
+    """Cliente compartido para el despliegue de embeddings configurado en el entorno."""
+    return get_azure_client(
+        azure_endpoint=os.environ["AZURE_EMBEDDING_ENDPOINT"],
+        api_key=os.environ["AZURE_EMBEDDING_KEY"],
+        api_version=os.environ["AZURE_EMBEDDING_API_VERSION"]
+    )
+
+
+def get_deployment_semaphore(deployment: str) -> threading.BoundedSemaphore:
+    """Semáforo que limita las peticiones simultáneas contra un mismo despliegue."""
+    with _lock:
+        if deployment not in _semaphores:
+            _semaphores[deployment] = threading.BoundedSemaphore(get_max_concurrency())
+        return _semaphores[deployment]
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return False
+
+
+def retry_after_seconds(error: Exception):
+    """Lee las cabeceras retry-after-ms / retry-after de la respuesta de error, si las hay."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def backoff_delay(attempt: int, error: Exception = None) -> float:
+    """
+    Espera antes del reintento `attempt` (empezando en 0): la indicada por Retry-After si el
+    servidor la envía, o un backoff exponencial con jitter completo en caso contrario.
+    """
+    base, maximum = get_backoff_base(), get_backoff_max()
+    retry_after = retry_after_seconds(error) if error is not None else None
+    if retry_after is not None:
+        return min(retry_after, maximum) + random.uniform(0, base)
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+def call_with_retry(
+    deployment: str,
+    fn,
+    *args,
+    limiter: RateLimiter = None,
+    estimated_tokens: int = 0,
+    max_retries: int = None,
+    **kwargs
+):
+    """
+    Ejecuta `fn(*args, **kwargs)` contra el despliegue `deployment` respetando su límite de
+    concurrencia y reintentando los errores transitorios (429, 5xx, timeouts y errores de
+    conexión) con backoff exponencial y jitter.
+
+    Si se indica `limiter`, cada intento consume antes una petición y `estimated_tokens`
+    tokens de su cuota, y los 429 pausan el limitador para todos los hilos del despliegue.
+    Sin `max_retries` se usan los AZURE_MAX_RETRIES reintentos configurados.
+    """
+    if max_retries is None:
+        max_retries = get_max_retries()
+    semaphore = get_deployment_semaphore(deployment)
+    attempt = 0
+
+    while True:
+        if limiter is not None:
+            limiter.acquire(estimated_tokens)
+
+        try:
+            with semaphore:
+                return fn(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"Error transitorio en {deployment} ({type(e).__name__}), reintento {attempt + 1}/{max_retries} en {delay:.1f}s")
+            if limiter is not None and isinstance(e, openai.RateLimitError):
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
@@ -1,6 +1,9 @@
 import uuid
 import os
 import sys
+import threading
+import concurrent.futures
+from urllib.parse import urlparse
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -8,7 +11,7 @@ from agents.crawler_agent import crawl_convocatoria
 from agents.refinement_agent import run_refinement_agent
 from tools.vectorial_db_tools import process_temp_pdfs_batch, process_pdfs_to_shared_db
 from managers.postgres_manager import insert_into_ayudas_batch, insert_into_ayudas_ref_batch, fix_minimis_in_jsons
-from tools.utils import downloadPDFs, listJSONs, validate_convocatoria_json, add_missing_keys_to_json, getVectorialIdFromFile, load_refined_urls, create_json_templates
+from tools.utils import downloadPDFs, listJSONs, validate_convocatoria_json, add_missing_keys_to_json, getVectorialIdFromFile, load_refined_urls, create_json_templates, ProgressTracker
 
 class CrawlingManager:
     def __init__(
@@ -18,7 +21,11 @@ class CrawlingManager:
         pdf_folder_base: str = 'data/pdf',
         db_vec_temp_dir: str = 'data/temp_vec_db',
         db_vec_dir: str = 'db/vec_ayudas_db',
-        insert: bool = True
+        insert: bool = True,
+        crawl_workers: int = 4,
+        max_per_domain: int = 2,
+        refinement_workers: int = 4,
+        use_temp_vec_db: bool = False
     ):
         self.urls_path = urls_path
         self.json_folder_base = json_folder_base
@@ -26,9 +33,19 @@ class CrawlingManager:
         self.db_vec_temp_dir = db_vec_temp_dir
         self.db_vec_dir = db_vec_dir
         self.insert = insert
+        self.crawl_workers = crawl_workers
+        self.max_per_domain = max_per_domain
+        self.refinement_workers = refinement_workers
+        self.use_temp_vec_db = use_temp_vec_db
 
     
     def run(self):
+        """
+        Ejecuta el pipeline completo. Los PDFs se indexan una sola vez en la base vectorial
+        compartida (`db_vec_dir`) antes del refinamiento, que la consulta filtrando por
+        convocatoria. Con `use_temp_vec_db=True` se mantiene el esquema anterior: una base
+        temporal por convocatoria en `db_vec_temp_dir` y la compartida al insertar.
+        """
         links = load_refined_urls(self.urls_path) 
 
         if not links:
@@ -41,7 +58,10 @@ class CrawlingManager:
             add_missing_keys_to_json(json)
         downloadPDFs(json_results, self.pdf_folder_base)
         create_json_templates(json_results, self.json_folder_base)
-        process_temp_pdfs_batch(self.pdf_folder_base, self.db_vec_temp_dir)
+        if self.use_temp_vec_db:
+            process_temp_pdfs_batch(self.pdf_folder_base, self.db_vec_temp_dir)
+        else:
+            process_pdfs_to_shared_db(self.pdf_folder_base, self.db_vec_dir)
 
         self.run_refinement_agents(json_results)
 
@@ -50,12 +70,39 @@ class CrawlingManager:
         if (self.insert):
             insert_into_ayudas_batch(self.json_folder_base)
             insert_into_ayudas_ref_batch(self.json_folder_base)
-            process_pdfs_to_shared_db(self.pdf_folder_base, self.db_vec_dir)
+            if self.use_temp_vec_db:
+                process_pdfs_to_shared_db(self.pdf_folder_base, self.db_vec_dir)
 
     def crawl_urls(self, links):
-
-        for link in links:
-            self.crawl_process_single_url(link)
+        """
+        Procesa los enlaces con un pool de `crawl_workers` hilos, limitando a `max_per_domain`
+        los crawls simultáneos contra un mismo dominio. Cada trabajo escribe en su propia
+        carpeta convo_{uuid}, por lo que no hay interferencias entre ellos.
+        """
+        progress = ProgressTracker(len(links), "Crawling")
+        domain_limits = {}
+        domain_lock = threading.Lock()
+
+        def domain_semaphore(url):
+            domain = urlparse(url).netloc
+            with domain_lock:
+                if domain not in domain_limits:
+                    domain_limits[domain] = threading.BoundedSemaphore(self.max_per_domain)
+                return domain_limits[domain]
+
+        def crawl_single_url(link):
+            ok = True
+            try:
+                with domain_semaphore(link):
+                    self.crawl_process_single_url(link)
+            except Exception as e:
+                ok = False
+                print(f"Error procesando la URL {link}: {e}")
+            finally:
+                progress.step(ok)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.crawl_workers) as executor:
+            list(executor.map(crawl_single_url, interleave_by_domain(links)))
 
     def crawl_process_single_url(self, url):
         """Método privado que procesa una sola URL: crawl + validar"""
@@ -85,10 +132,50 @@ class CrawlingManager:
                 print(f"Regenerando JSON para {url} (ID anterior: {current_id})...")
 
     def run_refinement_agents(self, json_results):
-        def refine_single_json(result):
-            json_name = os.path.splitext(os.path.basename(result))[0]
-            vector_db_path = f"{self.db_vec_temp_dir}/{getVectorialIdFromFile(json_name)}"
-            run_refinement_agent(result, vector_db_path, self.json_folder_base)
+        """
+        Refina varios JSON a la vez con un pool de `refinement_workers` hilos. Las llamadas
+        al LLM y a los embeddings pasan por los limitadores compartidos del proceso, y cada
+        JSON escribe únicamente sus propios ficheros en json/refined y json/reference.
+        """
+        progress = ProgressTracker(len(json_results), "Refinamiento")
+        reintentos = []
 
-        for json in json_results:
-            refine_single_json(json);
\ No newline at end of file
+        def refine_single_json(result):
+            ok = True
+            try:
+                json_name = os.path.splitext(os.path.basename(result))[0]
+                vectorial_id = getVectorialIdFromFile(json_name)
+                if self.use_temp_vec_db:
+                    intentos = run_refinement_agent(result, f"{self.db_vec_temp_dir}/{vectorial_id}", self.json_folder_base)
+                else:
+                    intentos = run_refinement_agent(result, self.db_vec_dir, self.json_folder_base, doc_id=vectorial_id)
+                reintentos.append(sum(n - 1 for n, _ in intentos.values()))
+            except Exception as e:
+                ok = False
+                print(f"Error refinando {result}: {e}")
+            finally:
+                progress.step(ok)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.refinement_workers) as executor:
+            list(executor.map(refine_single_json, json_results))
+
+        if reintentos:
+            print(f"Reintentos de refinamiento por documento: {sum(reintentos) / len(reintentos):.2f} de media en {len(reintentos)} documentos.")
+
+def interleave_by_domain(links):
+    """
+    Reordena los enlaces alternando dominios, para que los hilos del pool no se queden
+    bloqueados esperando el límite de un mismo dominio mientras hay trabajo de otros.
+    """
+    por_dominio = {}
+    for link in links:
+        por_dominio.setdefault(urlparse(link).netloc, []).append(link)
+
+    colas = list(por_dominio.values())
+    resultado = []
+    while colas:
+        for cola in colas:
+            resultado.append(cola.pop(0))
+        colas = [cola for cola in colas if cola]
+
+    return resultado
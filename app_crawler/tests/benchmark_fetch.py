@@ -0,0 +1,86 @@
+"""
+Benchmark de obtención de páginas: Chrome nuevo por URL con espera fija (comportamiento
+anterior) frente al pool de navegadores con espera por disponibilidad.
+
+Uso:
+    python -m app_crawler.tests.benchmark_fetch urls.txt [--pool-size 2] [--limit 20]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from app_crawler.tools.browser_pool import BrowserPool, esperar_pagina_lista
+from app_crawler.tools.utils import load_refined_urls
+
+
+def fetch_legacy(url: str) -> str:
+    # Reproduce el fetch_html_tool anterior al pool: mismas opciones de Chrome, carga
+    # completa de la página (estrategia por defecto) y espera fija de 5 segundos.
+    options = Options()
+    options.headless = True
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.set_page_load_timeout(20)
+        driver.get(url)
+        time.sleep(5)
+        return driver.page_source
+    finally:
+        driver.quit()
+
+
+def fetch_pooled(pool: BrowserPool, url: str) -> str:
+    with pool.driver() as driver:
+        driver.get(url)
+        esperar_pagina_lista(driver)
+        return driver.page_source
+
+
+def medir(nombre: str, fetch, urls: list, workers: int) -> float:
+    errores = 0
+    inicio = time.perf_counter()
+
+    def run(url):
+        try:
+            fetch(url)
+            return True
+        except Exception as e:
+            print(f"[{nombre}] Error en {url}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for ok in executor.map(run, urls):
+            errores += 0 if ok else 1
+
+    duracion = time.perf_counter() - inicio
+    paginas_minuto = len(urls) / duracion * 60
+    print(f"[{nombre}] {len(urls)} páginas en {duracion:.1f}s ({errores} errores) -> {paginas_minuto:.1f} páginas/minuto")
+    return paginas_minuto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de fetch_html_tool")
+    parser.add_argument("urls_path", help="Fichero de texto con una URL por línea")
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    urls = load_refined_urls(args.urls_path)[:args.limit]
+
+    antes = medir("antes", fetch_legacy, urls, workers=args.pool_size)
+
+    pool = BrowserPool(size=args.pool_size)
+    try:
+        despues = medir("después", lambda url: fetch_pooled(pool, url), urls, workers=args.pool_size)
+    finally:
+        pool.close()
+
+    print(f"Mejora: x{despues / antes:.2f} páginas/minuto")
+
+
+if __name__ == "__main__":
+    main()
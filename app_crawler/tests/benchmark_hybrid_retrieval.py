@@ -0,0 +1,85 @@
+"""
+Benchmark de la recuperación de contexto vectorial frente a la híbrida (vectorial + BM25).
+
+Para los campos de importes, fechas y porcentajes mide, en cada convocatoria de una base
+vectorial compartida, si el contexto del primer prompt ya contiene un fragmento con el
+dato literal (€, fecha o %). Si no, cuenta cuántos prompts alternativos harían falta hasta
+encontrarlo, como aproximación de los reintentos (max_intentos) por documento sin tener
+que llamar al LLM.
+
+Uso:
+    python -m app_crawler.tests.benchmark_hybrid_retrieval db/vec_ayudas_db [--docs id1,id2] [--k 4]
+"""
+import argparse
+import sqlite3
+from app_crawler.tools.index_manifest import manifest_path
+from app_crawler.tools.lexical_index import tokenize
+from app_crawler.tools.tools import CONTEXT_PROMPTS, lexical_query
+from app_crawler.tools.vectorial_db_tools import ensure_lexical_index, search_many_from_context_vec_db, select_context
+
+CAMPOS = {
+    "presupuesto_minimo": "€",
+    "presupuesto_maximo": "€",
+    "fecha_inicio": "<fecha>",
+    "fecha_fin": "<fecha>",
+    "intensidad_subvencion": "%",
+    "intensidad_prestamo": "%",
+}
+
+
+def convocatorias(db_dir: str) -> list:
+    conn = sqlite3.connect(manifest_path(db_dir))
+    try:
+        return [fila[0] for fila in conn.execute("SELECT DISTINCT convocatoria_id FROM files ORDER BY convocatoria_id")]
+    finally:
+        conn.close()
+
+
+def medir(db_dir: str, doc_ids: list, k: int, mode: str):
+    aciertos = 0
+    reintentos = 0
+    for doc_id in doc_ids:
+        for campo, patron in CAMPOS.items():
+            prompts = CONTEXT_PROMPTS[campo]
+            resultados = search_many_from_context_vec_db(
+                prompts, db_dir, n_results=k, doc_id=doc_id, mode=mode,
+                lexical_queries=[lexical_query(prompt) for prompt in prompts]
+            )
+
+            intento = len(prompts)
+            for i, (textos, tablas) in enumerate(resultados):
+                contexto = select_context(textos, tablas, k)
+                if any(patron in tokenize(doc.page_content) for doc in contexto):
+                    intento = i
+                    break
+
+            aciertos += intento == 0
+            reintentos += min(intento, len(prompts) - 1)
+
+    total = len(doc_ids) * len(CAMPOS)
+    print(
+        f"[{mode}] acierto al primer intento: {aciertos / total * 100:.1f}% ({aciertos}/{total}), "
+        f"reintentos estimados por documento: {reintentos / len(doc_ids):.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de recuperación vectorial frente a híbrida")
+    parser.add_argument("db_dir", help="Base vectorial compartida (con su manifiesto de indexación)")
+    parser.add_argument("--docs", help="IDs de convocatoria separados por comas (por defecto, todas)")
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    doc_ids = args.docs.split(",") if args.docs else convocatorias(args.db_dir)
+    if not doc_ids:
+        print(f"No hay convocatorias en {args.db_dir}.")
+        return
+
+    ensure_lexical_index(args.db_dir)
+    print(f"{len(doc_ids)} convocatorias, {len(CAMPOS)} campos, k={args.k}")
+    for mode in ["vector", "hybrid"]:
+        medir(args.db_dir, doc_ids, args.k, mode)
+
+
+if __name__ == "__main__":
+    main()
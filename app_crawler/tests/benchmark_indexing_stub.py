@@ -0,0 +1,61 @@
+"""
+Benchmark de la indexación contra el stub local de Azure OpenAI (tests/azure_stub.py), sin
+credenciales ni red y con tiempos repetibles.
+
+Indexa los PDFs indicados en una base vectorial temporal dos veces: con la caché de embeddings
+vacía y con la caché ya llena. Para cada pasada muestra el tiempo, las peticiones que recibe
+el stub, los 429 inyectados y la concurrencia máxima alcanzada, de modo que se puede comparar
+el efecto de AZURE_MAX_CONCURRENCY, EMBEDDING_BATCH_MAX_TOKENS o la caché.
+
+Uso:
+    python -m app_crawler.tests.benchmark_indexing_stub [pdf ...] [--latency 0.2] [--rate-limit-every 10]
+"""
+import os
+import time
+import argparse
+import tempfile
+
+# Las cachés y registros persistentes van a un directorio temporal para no tocar los de data/.
+_tmp = tempfile.mkdtemp(prefix="benchmark_indexing_")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(_tmp, "embeddings.sqlite3")
+os.environ["PROMPT_EMBEDDINGS_DIR"] = os.path.join(_tmp, "prompt_embeddings")
+
+from app_crawler.tests.azure_stub import AzureStub, stub_env
+from app_crawler.tools.pdf_parsing import iter_pdfs_pages
+from app_crawler.tools.vectorial_db_tools import save_pdf_at_vec_db
+
+FIXTURE_PDF = os.path.join(os.path.dirname(__file__), "..", "..", "app_chat", "tests", "id1.pdf")
+
+
+def medir(stub: AzureStub, pdfs: list, nombre: str):
+    stub.reset_stats()
+    inicio = time.perf_counter()
+    save_pdf_at_vec_db(pdfs, os.path.join(_tmp, f"vec_db_{nombre}"))
+    duracion = time.perf_counter() - inicio
+    print(
+        f"[{nombre}] {duracion:.2f}s, peticiones: {dict(stub.requests)}, 429: {stub.rate_limited}, "
+        f"concurrencia máxima: {stub.max_in_flight}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de indexación contra el stub de Azure OpenAI")
+    parser.add_argument("pdfs", nargs="*", default=[FIXTURE_PDF])
+    parser.add_argument("--latency", type=float, default=0.2, help="Segundos por respuesta del stub")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Responder 429 a una de cada N peticiones")
+    args = parser.parse_args()
+
+    with AzureStub(latency=args.latency, rate_limit_every=args.rate_limit_every) as stub:
+        os.environ.update(stub_env(stub))
+
+        # La extracción se hace antes para que las dos pasadas midan solo los embeddings y la escritura.
+        for _ in iter_pdfs_pages(args.pdfs):
+            pass
+
+        print(f"{len(args.pdfs)} PDFs, latencia {args.latency}s, 429 cada {args.rate_limit_every or '-'} peticiones")
+        medir(stub, args.pdfs, "cache_vacia")
+        medir(stub, args.pdfs, "cache_llena")
+
+
+if __name__ == "__main__":
+    main()
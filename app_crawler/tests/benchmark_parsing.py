@@ -0,0 +1,70 @@
+"""
+Benchmark del parseo de PDFs: páginas por segundo según el número de procesos del pool
+de pdf_parsing, sobre una carpeta de PDFs reales (p. ej. órdenes de bases).
+
+Comprueba además que la salida con varios procesos es idéntica a la secuencial.
+
+Uso:
+    python -m app_crawler.tests.benchmark_parsing data/pdf [--workers 1,2,4,8] [--limit 20]
+"""
+import os
+import argparse
+import time
+from app_crawler.tools.pdf_parsing import iter_pdfs_pages, shutdown_parse_pool, get_pages_per_task
+
+
+def listar_pdfs(carpeta: str, limit: int) -> list:
+    pdfs = []
+    for root, _, files in os.walk(carpeta):
+        for filename in sorted(files):
+            if filename.lower().endswith(".pdf"):
+                pdfs.append(os.path.join(root, filename))
+    return sorted(pdfs)[:limit]
+
+
+def medir(pdfs: list, workers: int, pages_per_task: int):
+    # El arranque del pool no se cuenta: en el pipeline el pool se reutiliza entre llamadas.
+    if workers > 1:
+        list(iter_pdfs_pages(pdfs[:1], workers=workers, pages_per_task=pages_per_task, use_cache=False))
+
+    inicio = time.perf_counter()
+    paginas = list(iter_pdfs_pages(pdfs, workers=workers, pages_per_task=pages_per_task, use_cache=False))
+    duracion = time.perf_counter() - inicio
+
+    print(f"[{workers} procesos] {len(paginas)} páginas en {duracion:.1f}s -> {len(paginas) / duracion:.2f} páginas/s")
+    return paginas, len(paginas) / duracion
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    por_defecto = ",".join(str(n) for n in sorted({1, 2, 4, 8, cpus}) if n <= cpus)
+
+    parser = argparse.ArgumentParser(description="Benchmark del parseo de PDFs con pool de procesos")
+    parser.add_argument("carpeta", help="Carpeta con PDFs (se recorre recursivamente)")
+    parser.add_argument("--workers", default=por_defecto, help="Lista de números de procesos separados por comas")
+    parser.add_argument("--pages-per-task", type=int, default=get_pages_per_task())
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    pdfs = listar_pdfs(args.carpeta, args.limit)
+    if not pdfs:
+        print(f"No hay PDFs en {args.carpeta}.")
+        return
+
+    print(f"{len(pdfs)} PDFs, {cpus} CPUs disponibles")
+
+    referencia = None
+    base = None
+    for workers in [int(n) for n in args.workers.split(",")]:
+        paginas, velocidad = medir(pdfs, workers, args.pages_per_task)
+        shutdown_parse_pool()
+
+        if referencia is None:
+            referencia, base = paginas, velocidad
+        else:
+            identico = "idéntica" if paginas == referencia else "DISTINTA"
+            print(f"    x{velocidad / base:.2f} respecto a {args.workers.split(',')[0]} proceso(s), salida {identico}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark de la precomprobación de tablas: extrae cada PDF con y sin may_contain_table()
+antes de page.extract_tables(), comprueba que la salida es idéntica e informa del tiempo
+ahorrado por documento.
+
+Uso:
+    python -m app_crawler.tests.benchmark_table_precheck data/pdf [--limit 20]
+"""
+import argparse
+import time
+import pdfplumber
+from app_crawler.tests.benchmark_parsing import listar_pdfs
+from app_crawler.tools.pdf_parsing import parse_pages_sequential, may_contain_table
+
+
+def medir(pdf_path: str, table_precheck: bool):
+    inicio = time.perf_counter()
+    paginas = list(parse_pages_sequential(pdf_path, table_precheck))
+    return paginas, time.perf_counter() - inicio
+
+
+def paginas_saltadas(pdf_path: str):
+    with pdfplumber.open(pdf_path) as pdf:
+        saltadas = sum(1 for page in pdf.pages if not may_contain_table(page))
+        return saltadas, len(pdf.pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la precomprobación de tablas")
+    parser.add_argument("carpeta", help="Carpeta con PDFs (se recorre recursivamente)")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    pdfs = listar_pdfs(args.carpeta, args.limit)
+    if not pdfs:
+        print(f"No hay PDFs en {args.carpeta}.")
+        return
+
+    total_antes = 0
+    total_despues = 0
+    diferencias = 0
+
+    for pdf_path in pdfs:
+        sin_precheck, antes = medir(pdf_path, table_precheck=False)
+        con_precheck, despues = medir(pdf_path, table_precheck=True)
+        saltadas, total = paginas_saltadas(pdf_path)
+
+        identico = sin_precheck == con_precheck
+        diferencias += 0 if identico else 1
+        total_antes += antes
+        total_despues += despues
+
+        print(
+            f"{pdf_path}: {antes:.2f}s -> {despues:.2f}s (ahorro {antes - despues:.2f}s), "
+            f"{saltadas}/{total} páginas sin extract_tables, salida {'idéntica' if identico else 'DISTINTA'}"
+        )
+
+    print(
+        f"Total {len(pdfs)} PDFs: {total_antes:.1f}s -> {total_despues:.1f}s, "
+        f"ahorro medio {(total_antes - total_despues) / len(pdfs):.2f}s por documento, {diferencias} diferencias"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import httpx
+import openai
+import pytest
+from app_crawler import azure_clients
+from app_crawler.azure_clients import call_with_retry, backoff_delay, get_deployment_semaphore
+
+
+def rate_limit_error(headers=None):
+    request = httpx.Request("POST", "https://example.openai.azure.com/")
+    response = httpx.Response(429, headers=headers or {}, request=request)
+    return openai.RateLimitError("429", response=response, body=None)
+
+
+@pytest.fixture(autouse=True)
+def sin_esperas(monkeypatch):
+    esperas = []
+    monkeypatch.setattr(azure_clients.time, "sleep", esperas.append)
+    return esperas
+
+
+def test_reintenta_errores_transitorios(sin_esperas):
+    errores = [rate_limit_error(), rate_limit_error()]
+
+    def llamada():
+        if errores:
+            raise errores.pop()
+        return "ok"
+
+    assert call_with_retry("test", llamada, max_retries=3) == "ok"
+    assert len(sin_esperas) == 2
+
+
+def test_no_reintenta_errores_permanentes(sin_esperas):
+    llamadas = []
+
+    def llamada():
+        llamadas.append(1)
+        raise ValueError("error de programación")
+
+    with pytest.raises(ValueError):
+        call_with_retry("test", llamada, max_retries=3)
+
+    assert len(llamadas) == 1
+    assert sin_esperas == []
+
+
+def test_agota_reintentos(sin_esperas):
+    def llamada():
+        raise rate_limit_error()
+
+    with pytest.raises(openai.RateLimitError):
+        call_with_retry("test", llamada, max_retries=2)
+
+    assert len(sin_esperas) == 2
+
+
+def test_backoff_respeta_retry_after():
+    delay = backoff_delay(0, rate_limit_error({"retry-after-ms": "2500"}))
+    assert 2.5 <= delay <= 2.5 + azure_clients.get_backoff_base()
+
+
+def test_backoff_exponencial_acotado():
+    for attempt in range(20):
+        assert 0 <= backoff_delay(attempt) <= azure_clients.get_backoff_max()
+
+
+def test_configuracion_leida_del_entorno_al_usarla(monkeypatch):
+    monkeypatch.setenv("AZURE_BACKOFF_BASE", "0.5")
+    monkeypatch.setenv("AZURE_BACKOFF_MAX", "2")
+    monkeypatch.setenv("AZURE_MAX_CONCURRENCY", "3")
+    monkeypatch.setenv("AZURE_MAX_RETRIES", "1")
+
+    assert all(0 <= backoff_delay(attempt) <= 2 for attempt in range(20))
+    assert get_deployment_semaphore("despliegue-entorno")._value == 3
+
+    llamadas = []
+
+    def llamada():
+        llamadas.append(1)
+        raise rate_limit_error()
+
+    with pytest.raises(openai.RateLimitError):
+        call_with_retry("test", llamada)
+    assert len(llamadas) == 2
@@ -0,0 +1,68 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+import openai
+import pytest
+from app_crawler import azure_clients
+from app_crawler.azureOpenAIServerModel import get_chat_model
+from app_crawler.tools.embedding_provider import get_embedding_provider, HashingEmbeddingProvider
+
+
+@pytest.fixture(autouse=True)
+def backoff_corto(monkeypatch):
+    monkeypatch.setenv("AZURE_BACKOFF_BASE", "0.01")
+
+
+def test_embeddings_deterministas(azure_stub):
+    textos = ["Presupuesto máximo de 200.000 euros", "Plazo de solicitud"]
+    embeddings = get_embedding_provider().embed(textos)
+
+    esperados = HashingEmbeddingProvider().embed(textos)
+    assert len(embeddings) == 2
+    assert all(math.isclose(a, b, abs_tol=1e-6) for e, r in zip(embeddings, esperados) for a, b in zip(e, r))
+    assert azure_stub.requests["embeddings"] == 1
+
+
+def test_respuestas_de_chat_programadas(azure_stub):
+    azure_stub.script("stub-chat", "primera", "segunda")
+    modelo = get_chat_model()
+    mensajes = [{"role": "user", "content": [{"type": "text", "text": "hola"}]}]
+
+    assert modelo(mensajes).content == "primera"
+    assert modelo(mensajes).content == "segunda"
+    assert modelo(mensajes).content == "OK"
+    assert azure_stub.requests["chat"] == 3
+
+
+def test_los_429_se_reintentan(azure_stub):
+    azure_stub.script("stub-embeddings", 429, 429)
+
+    assert len(get_embedding_provider().embed(["texto"])) == 1
+    assert azure_stub.requests["embeddings"] == 3
+
+
+def test_inyeccion_periodica_de_429(azure_stub):
+    azure_stub.rate_limit_every = 3
+    proveedor = get_embedding_provider()
+    for i in range(6):
+        proveedor.embed([f"texto {i}"])
+
+    # Las peticiones 3 y 6 reciben un 429 y se reintentan.
+    assert azure_stub.rate_limited == 2
+    assert azure_stub.requests["embeddings"] == 8
+
+
+def test_errores_no_transitorios(azure_stub):
+    azure_stub.script("stub-embeddings", 400)
+
+    with pytest.raises(openai.BadRequestError):
+        get_embedding_provider().embed(["texto"])
+    assert azure_stub.requests["embeddings"] == 1
+
+
+def test_latencia_y_concurrencia(azure_stub):
+    azure_stub.latency = 0.1
+    proveedor = get_embedding_provider()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda i: proveedor.embed([f"texto {i}"]), range(8)))
+
+    assert 1 < azure_stub.max_in_flight <= min(4, azure_clients.get_max_concurrency())
@@ -0,0 +1,99 @@
+import threading
+import pytest
+from app_crawler.tools.browser_pool import BrowserPool, esperar_pagina_lista
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+        self.window_handles = ["main"]
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("driver muerto")
+        if "readyState" in script:
+            return ["complete", 3]
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_pool_reuses_and_recycles_drivers():
+    created = []
+
+    def factory():
+        driver = FakeDriver()
+        created.append(driver)
+        return driver
+
+    pool = BrowserPool(size=1, max_pages=2, driver_factory=factory)
+
+    with pool.driver() as d1:
+        pass
+    with pool.driver() as d2:
+        pass
+    with pool.driver() as d3:
+        pass
+
+    assert d1 is d2, "[ERROR] El driver debería reutilizarse entre llamadas"
+    assert d2.quit_called, "[ERROR] El driver debería reciclarse tras max_pages"
+    assert d3 is not d2
+    assert len(created) == 2
+
+    pool.close()
+    assert d3.quit_called
+
+
+def test_pool_replaces_unhealthy_driver():
+    pool = BrowserPool(size=1, driver_factory=FakeDriver)
+
+    with pool.driver() as d1:
+        d1.alive = False
+
+    with pool.driver() as d2:
+        pass
+
+    assert d2 is not d1, "[ERROR] Un driver que no responde no debe volver a prestarse"
+    pool.close()
+
+
+def test_pool_is_bounded():
+    pool = BrowserPool(size=2, driver_factory=FakeDriver, acquire_timeout=5)
+    in_use = []
+    max_in_use = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(4)
+
+    def worker():
+        barrier.wait()
+        with pool.driver() as driver:
+            with lock:
+                in_use.append(driver)
+                max_in_use.append(len(in_use))
+            threading.Event().wait(0.05)
+            with lock:
+                in_use.remove(driver)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert max(max_in_use) <= 2, f"[ERROR] Se han usado {max(max_in_use)} navegadores a la vez con un pool de 2"
+    pool.close()
+
+
+def test_acquire_times_out_when_pool_exhausted():
+    pool = BrowserPool(size=1, driver_factory=FakeDriver, acquire_timeout=0.1)
+    pooled = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    pool.release(pooled)
+    pool.close()
+
+
+def test_esperar_pagina_lista_returns_when_quiet():
+    assert esperar_pagina_lista(FakeDriver(), timeout=2, quiet_period=0.1, poll=0.01)
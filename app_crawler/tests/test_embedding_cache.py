@@ -0,0 +1,56 @@
+import os
+import time
+import pytest
+from app_crawler.tools.embedding_cache import EmbeddingCache
+
+
+def test_cache_roundtrip_and_hit_rate(tmp_path):
+    cache = EmbeddingCache(os.path.join(tmp_path, "cache.sqlite3"))
+
+    assert cache.get_many("emb-deployment", ["hola", "adiós"]) == [None, None]
+
+    cache.put_many("emb-deployment", ["hola"], [[0.25, -1.5, 3.0]])
+    results = cache.get_many("emb-deployment", ["hola", "adiós"])
+
+    assert results[0] == pytest.approx([0.25, -1.5, 3.0])
+    assert results[1] is None
+    assert cache.hits == 1 and cache.misses == 3
+
+    assert cache.get_many("otro-deployment", ["hola"]) == [None], "[ERROR] La caché debe separar por despliegue"
+    cache.close()
+
+
+def test_cache_persists_between_instances(tmp_path):
+    path = os.path.join(tmp_path, "cache.sqlite3")
+    cache = EmbeddingCache(path)
+    cache.put_many("emb", ["texto"], [[1.0, 2.0]])
+    cache.close()
+
+    assert EmbeddingCache(path).get_many("emb", ["texto"]) == [[1.0, 2.0]]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(os.path.join(tmp_path, "cache.sqlite3"), max_entries=10)
+
+    for i in range(10):
+        cache.put_many("emb", [f"t{i}"], [[float(i)]])
+        time.sleep(0.01)
+    cache.get_many("emb", ["t0"])
+    cache.put_many("emb", ["t10"], [[10.0]])
+
+    assert len(cache) <= 10
+    assert cache.get_many("emb", ["t0"])[0] is not None, "[ERROR] La entrada usada recientemente no debe expulsarse"
+    assert cache.get_many("emb", ["t1"])[0] is None
+    cache.close()
+
+
+def test_configuracion_leida_al_abrir_la_cache(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, "entorno", "cache.sqlite3")
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", path)
+    monkeypatch.setenv("EMBEDDING_CACHE_MAX_ENTRIES", "20")
+
+    cache = EmbeddingCache()
+
+    assert cache.path == path and os.path.exists(path)
+    assert cache.max_entries == 20
+    cache.close()
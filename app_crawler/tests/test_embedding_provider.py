@@ -0,0 +1,85 @@
+import math
+import pytest
+from app_crawler.tools import vectorial_db_tools
+from app_crawler.tools.embedding_provider import EmbeddingProvider, HashingEmbeddingProvider, get_embedding_provider, set_embedding_provider
+from app_crawler.tools.vector_store_registry import get_vectorstore, invalidate_vectorstore
+
+
+@pytest.fixture
+def proveedor_por_entorno(monkeypatch):
+    set_embedding_provider(None)
+    yield monkeypatch
+    set_embedding_provider(None)
+
+
+def coseno(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_hashing_es_determinista_y_normalizado():
+    proveedor = HashingEmbeddingProvider(dim=64)
+    a, b = proveedor.embed(["Presupuesto máximo de 200.000 euros", "Presupuesto máximo de 200.000 euros"])
+
+    assert a == b
+    assert len(a) == 64
+    assert math.isclose(sum(x * x for x in a), 1.0)
+    assert HashingEmbeddingProvider(dim=64).embed(["Presupuesto máximo de 200.000 euros"]) == [a]
+
+
+def test_hashing_acerca_textos_con_vocabulario_comun():
+    proveedor = HashingEmbeddingProvider()
+    consulta, cercano, lejano = proveedor.embed([
+        "plazo de presentación de solicitudes",
+        "El plazo de presentacion de las solicitudes finaliza el 30 de junio",
+        "Intensidad de la subvención para pequeñas empresas",
+    ])
+
+    assert coseno(consulta, cercano) > coseno(consulta, lejano)
+
+
+def test_un_proveedor_sin_embed_no_se_puede_instanciar():
+    class SinEmbed(EmbeddingProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        SinEmbed("sin-embed")
+
+
+def test_elige_el_proveedor_por_configuracion(proveedor_por_entorno):
+    proveedor_por_entorno.setenv("EMBEDDING_PROVIDER", "hashing")
+    proveedor = get_embedding_provider()
+
+    assert isinstance(proveedor, HashingEmbeddingProvider)
+    assert get_embedding_provider() is proveedor
+
+
+def test_proveedor_desconocido(proveedor_por_entorno):
+    proveedor_por_entorno.setenv("EMBEDDING_PROVIDER", "otro")
+
+    with pytest.raises(ValueError):
+        get_embedding_provider()
+
+
+def test_busqueda_sin_red_con_hashing(tmp_path, monkeypatch):
+    proveedor = HashingEmbeddingProvider()
+    monkeypatch.setattr(vectorial_db_tools, "get_embedding_provider", lambda: proveedor)
+    monkeypatch.setattr(vectorial_db_tools, "get_prompt_registry", lambda name: _RegistroVacio())
+
+    path = str(tmp_path / "vec_db")
+    textos = ["El plazo de solicitud termina el 30 de junio", "La intensidad de la ayuda es del 50%"]
+    get_vectorstore(path)._collection.add(
+        ids=["t1", "t2"],
+        embeddings=proveedor.embed(textos),
+        documents=textos,
+        metadatas=[{"id": "A_bases", "fragment": f"{i}", "tipo": "texto", "convocatoria_id": "A"} for i in (1, 2)]
+    )
+    try:
+        resultados = vectorial_db_tools.search_from_context_vec_db("plazo de solicitud", path, k=1, doc_id="A")
+        assert [doc.page_content for doc in resultados] == [textos[0]]
+    finally:
+        invalidate_vectorstore(path)
+
+
+class _RegistroVacio:
+    def get(self, prompt):
+        return None
@@ -0,0 +1,64 @@
+import os
+import json
+import threading
+from app_crawler.tools.json_document import JsonDocument, open_document, get_open_document, close_document
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    path = os.path.join(tmp_path, "refined", "conv_1.json")
+    document = open_document(path)
+
+    def worker(i):
+        document.set_field(f"campo_{i}", f"valor_{i}")
+        document.add_refs("Campo_ref", "doc_id", [f"{i}-1", f"{i}-2"])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not os.path.exists(path), "[ERROR] El documento no debe escribirse hasta cerrarlo"
+
+    close_document(path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    assert all(data[f"campo_{i}"] == f"valor_{i}" for i in range(20))
+    assert len(data["Campo_ref"]) == 40, f"[ERROR] Se esperaban 40 referencias, hay {len(data['Campo_ref'])}"
+    assert get_open_document(path) is None
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_load_existing_document_and_has_value(tmp_path):
+    path = os.path.join(tmp_path, "conv.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"Minimis": "", "Anio": "2024"}, f)
+
+    document = JsonDocument.load(path)
+
+    assert document.has_value("Anio")
+    assert not document.has_value("Minimis")
+    assert not document.has_value("Beneficiarios")
+
+
+def test_tools_use_open_document(tmp_path):
+    from app_crawler.tools.tools import save_json_field_tool, add_field_ref_json_tool
+
+    refined = os.path.join(tmp_path, "refined.json")
+    reference = os.path.join(tmp_path, "reference.json")
+    open_document(refined)
+    open_document(reference)
+
+    save_json_field_tool(refined, "Anio", "2025")
+    add_field_ref_json_tool(reference, "Anio_ref", "abc_bases", ["3-1"])
+
+    assert get_open_document(refined).get("Anio") == "2025"
+    assert not os.path.exists(refined)
+
+    close_document(refined)
+    close_document(reference)
+
+    with open(reference, "r", encoding="utf-8") as f:
+        assert json.load(f) == {"Anio_ref": [{"id": "abc_bases", "fragment": "3-1"}]}
@@ -0,0 +1,100 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app_crawler.tools.page_fetcher import FetchStats, RENDER_ONLY_AFTER, fetch_http, html_charset, parece_shell_js
+
+PARRAFO = "<p>Convocatoria de ayudas a la innovación tecnológica para pymes de Andalucía, con subvención del 50 %.</p>"
+
+PAGINA_SERVIDOR = f"""<!DOCTYPE html>
+<html lang="es">
+<head><meta charset="utf-8"><title>Ayudas</title><script src="/app.js"></script></head>
+<body><h1>Línea de ayudas I+D</h1>{PARRAFO * 10}</body>
+</html>"""
+
+SHELL_SPA = """<!DOCTYPE html>
+<html>
+<head><title>Portal de ayudas</title><script src="/static/js/main.js"></script></head>
+<body><noscript>Habilite JavaScript para usar esta aplicación.</noscript><div id="root"></div></body>
+</html>"""
+
+
+def test_pagina_renderizada_en_servidor():
+    assert not parece_shell_js(PAGINA_SERVIDOR)
+
+
+def test_cascara_spa_vacia():
+    assert parece_shell_js(SHELL_SPA)
+    assert parece_shell_js("")
+
+
+def test_estadisticas_se_guardan_y_se_recargan(tmp_path):
+    path = str(tmp_path / "fetch_stats.json")
+    stats = FetchStats(path)
+    for _ in range(RENDER_ONLY_AFTER):
+        stats.record("spa.example.com", "render")
+    stats.record("www.example.com", "http")
+    stats.flush()
+
+    recargadas = FetchStats(path)
+    assert recargadas.get("spa.example.com") == {"http": 0, "render": RENDER_ONLY_AFTER}
+    assert recargadas.needs_render("spa.example.com")
+    assert not recargadas.needs_render("www.example.com")
+    assert not recargadas.needs_render("nuevo.example.com")
+
+
+def test_estadisticas_se_escriben_periodicamente(tmp_path):
+    path = tmp_path / "fetch_stats.json"
+    stats = FetchStats(str(path), save_interval=3600)
+    stats.record("www.example.com", "http")
+
+    # Registrar no escribe en disco hasta el siguiente intervalo o el flush final.
+    assert not path.exists()
+    stats.flush()
+    assert FetchStats(str(path)).get("www.example.com") == {"http": 1, "render": 0}
+
+    stats.save_interval = 0
+    stats.record("www.example.com", "render")
+    assert FetchStats(str(path)).get("www.example.com") == {"http": 1, "render": 1}
+
+
+def test_charset_de_cabecera_o_meta():
+    assert html_charset(b"<html></html>", "text/html; charset=windows-1252") == "windows-1252"
+    assert html_charset(b'<meta http-equiv="Content-Type" content="text/html; charset=iso-8859-1">', "text/html") == "iso-8859-1"
+    assert html_charset(b"<html><body>sin declarar</body></html>", "text/html") is None
+
+
+PAGINAS = {
+    "/utf8": ("text/html", PAGINA_SERVIDOR.encode("utf-8")),
+    "/utf8_sin_meta": ("text/html", f"<html><body>{PARRAFO}</body></html>".encode("utf-8")),
+    "/latin1": ("text/html", f'<html><head><meta charset="iso-8859-1"></head><body>{PARRAFO}</body></html>'.encode("iso-8859-1")),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        content_type, body = PAGINAS[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("ruta", ["/utf8", "/utf8_sin_meta", "/latin1"])
+def test_decodifica_sin_charset_en_la_cabecera(servidor, ruta):
+    html = fetch_http(f"{servidor}{ruta}")
+
+    assert "innovación tecnológica" in html
+    assert "Andalucía" in html
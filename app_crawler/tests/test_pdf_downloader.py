@@ -0,0 +1,69 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app_crawler.tools import pdf_downloader
+from app_crawler.tools.pdf_downloader import descargar_pdf
+
+PDF = b"%PDF-1.4 " + b"x" * 200_000
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Last-Modified", "Mon, 06 Jan 2025 10:00:00 GMT")
+        if self.path != "/sin_longitud.pdf":
+            self.send_header("Content-Length", str(len(PDF)))
+        self.end_headers()
+        self.wfile.write(PDF)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_descarga_en_streaming_y_guarda_validadores(servidor, tmp_path):
+    ruta = tmp_path / "bases.pdf"
+    resultado = descargar_pdf(f"{servidor}/bases.pdf", str(ruta))
+
+    assert resultado["status"] == "downloaded"
+    assert resultado["etag"] == '"v1"'
+    assert ruta.read_bytes() == PDF
+    assert list(tmp_path.iterdir()) == [ruta]
+
+
+def test_peticion_condicional(servidor, tmp_path):
+    ruta = tmp_path / "bases.pdf"
+    resultado = descargar_pdf(f"{servidor}/bases.pdf", str(ruta), validators={"etag": '"v1"', "last_modified": None})
+
+    assert resultado["status"] == "not_modified"
+    assert not ruta.exists()
+
+
+@pytest.mark.parametrize("path", ["/bases.pdf", "/sin_longitud.pdf"])
+def test_limite_de_tamano(servidor, tmp_path, path):
+    ruta = tmp_path / "bases.pdf"
+    resultado = descargar_pdf(f"{servidor}{path}", str(ruta), max_bytes=100_000)
+
+    assert resultado["status"] == "failed"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_semaforo_por_host(monkeypatch):
+    monkeypatch.setattr(pdf_downloader, "_host_semaphores", {})
+    a = pdf_downloader.get_host_semaphore("https://www.cdti.es/a.pdf")
+    assert pdf_downloader.get_host_semaphore("https://WWW.cdti.es/b.pdf") is a
+    assert pdf_downloader.get_host_semaphore("https://sede.gob.es/a.pdf") is not a
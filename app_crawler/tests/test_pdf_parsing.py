@@ -0,0 +1,113 @@
+import os
+from itertools import islice
+import pytest
+from app_crawler.tools import pdf_parsing
+from app_crawler.tools.extraction_cache import ExtractionCache
+from app_crawler.tools.pdf_parsing import iter_pdfs_pages, parse_page_range, parse_pages_sequential
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "..", "app_chat", "tests")
+PDF_LARGO = os.path.join(FIXTURES, "id1.pdf")
+PDF_CORTO = os.path.join(FIXTURES, "id2.pdf")
+
+pytestmark = pytest.mark.skipif(
+    not (os.path.exists(PDF_LARGO) and os.path.exists(PDF_CORTO)),
+    reason="Faltan los PDFs de ejemplo"
+)
+
+
+def test_rango_de_paginas_igual_que_en_secuencial():
+    secuencial = list(islice(parse_pages_sequential(PDF_LARGO), 3))
+    assert parse_page_range(PDF_LARGO, 0, 3) == secuencial
+
+
+def test_pool_de_procesos_mantiene_el_orden():
+    pdfs = [PDF_CORTO, PDF_CORTO, PDF_CORTO]
+
+    secuencial = list(iter_pdfs_pages(pdfs, workers=1, use_cache=False))
+    en_paralelo = list(iter_pdfs_pages(pdfs, workers=2, pages_per_task=1, use_cache=False))
+
+    assert en_paralelo == secuencial
+    assert [page_number for _, page_number, _ in en_paralelo] == [0, 0, 0]
+
+
+def test_precomprobacion_de_tablas_no_cambia_la_salida():
+    # Páginas 7-10 de id1: una con tabla, otras con pocas líneas y otras solo con texto.
+    con_precomprobacion = parse_page_range(PDF_LARGO, 6, 10, table_precheck=True)
+    sin_precomprobacion = parse_page_range(PDF_LARGO, 6, 10, table_precheck=False)
+
+    assert con_precomprobacion == sin_precomprobacion
+    assert any(chunk["tipo"] == "tabla" for page in con_precomprobacion for chunk in page)
+
+    assert parse_page_range(PDF_CORTO, 0, 1, table_precheck=True) == parse_page_range(PDF_CORTO, 0, 1, table_precheck=False)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cache_de_extraccion(tmp_path, monkeypatch, workers):
+    cache = ExtractionCache(str(tmp_path))
+    monkeypatch.setattr(pdf_parsing, "get_extraction_cache", lambda: cache)
+
+    copia = tmp_path / "otra_carpeta" / "copia.pdf"
+    copia.parent.mkdir()
+    copia.write_bytes(open(PDF_CORTO, "rb").read())
+
+    primera = list(iter_pdfs_pages([PDF_CORTO], workers=workers))
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # El mismo contenido con otro nombre se sirve desde la caché.
+    segunda = list(iter_pdfs_pages([str(copia)], workers=workers))
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [pagina for _, _, pagina in segunda] == [pagina for _, _, pagina in primera]
+
+    monkeypatch.setattr(pdf_parsing, "EXTRACTOR_VERSION", "otra-version")
+    list(iter_pdfs_pages([PDF_CORTO], workers=workers))
+    assert cache.misses == 2
+
+
+def test_leer_pdf_igual_con_y_sin_cache(tmp_path, monkeypatch):
+    from app_crawler.tools.tools import leer_pdf
+
+    cache = ExtractionCache(str(tmp_path / "extraction_cache"))
+    monkeypatch.setattr(pdf_parsing, "get_extraction_cache", lambda: cache)
+
+    sin_indexar = leer_pdf(file_path=PDF_LARGO)
+    assert cache.misses == 2
+
+    # La segunda lectura sale de la caché de las primeras páginas.
+    assert leer_pdf(file_path=PDF_LARGO) == sin_indexar
+    assert cache.hits == 1
+
+    # Una vez extraído el PDF completo para indexarlo, el contenido es el mismo.
+    list(iter_pdfs_pages([PDF_LARGO], workers=1))
+    assert leer_pdf(file_path=PDF_LARGO) == sin_indexar
+    assert sin_indexar == "\n".join(chunk["content"] for page in parse_page_range(PDF_LARGO, 0, 3) for chunk in page)
+
+
+def test_leer_pdf_incluye_las_tablas(tmp_path, monkeypatch):
+    from app_crawler.tools.tools import leer_pdf
+
+    monkeypatch.setattr(pdf_parsing, "get_extraction_cache", lambda: ExtractionCache(str(tmp_path / "extraction_cache")))
+    monkeypatch.setattr(pdf_parsing, "parse_page_range", lambda pdf_path, start, end: [[
+        {"content": "Intensidad de la ayuda", "tipo": "texto"},
+        {"content": "Pequeña empresa | 50 %", "tipo": "tabla"},
+    ]])
+
+    assert leer_pdf(file_path=PDF_CORTO) == "Intensidad de la ayuda\nPequeña empresa | 50 %"
+
+
+class PaginaSinLineas:
+    edges = []
+
+    def extract_text(self):
+        return "texto"
+
+    def extract_tables(self):
+        return [[["a", "b"]]]
+
+
+def test_precomprobacion_configurable_por_entorno(monkeypatch):
+    # La variable se lee al parsear, después de que load_dotenv() haya cargado el .env.
+    monkeypatch.setenv("PDF_TABLE_PRECHECK", "FALSE")
+    assert pdf_parsing.extract_page_chunks(PaginaSinLineas())[-1] == {"content": "a | b", "tipo": "tabla"}
+
+    monkeypatch.setenv("PDF_TABLE_PRECHECK", "TRUE")
+    assert pdf_parsing.extract_page_chunks(PaginaSinLineas()) == [{"content": "texto", "tipo": "texto"}]
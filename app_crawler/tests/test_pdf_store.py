@@ -0,0 +1,272 @@
+import os
+import shutil
+import pytest
+from pypdf import PdfReader, PdfWriter
+from app_crawler.tools import pdf_parsing, vectorial_db_tools
+from app_crawler.tools.extraction_cache import ExtractionCache
+from app_crawler.tools.embedding_cache import EmbeddingCache
+from app_crawler.tools.embedding_provider import HashingEmbeddingProvider
+from app_crawler.tools.pdf_store import PdfStore
+from app_crawler.tools.vector_store_registry import get_vectorstore, invalidate_vectorstore
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "..", "app_chat", "tests")
+FIXTURE_PDF = os.path.join(FIXTURES, "id2.pdf")
+FIXTURE_PDF_LARGO = os.path.join(FIXTURES, "id1.pdf")
+
+
+def descarga_local(contenidos):
+    descargas = []
+
+    def descargar(url, ruta, validators=None):
+        descargas.append((url, validators))
+        if validators and validators.get("etag") == f"v{len(contenidos[url])}":
+            return {"status": "not_modified", **validators}
+        with open(ruta, "wb") as f:
+            f.write(contenidos[url])
+        return {"status": "downloaded", "etag": f"v{len(contenidos[url])}", "last_modified": None}
+
+    return descargar, descargas
+
+
+def test_descarga_cada_url_una_vez_y_deduplica_contenido(tmp_path):
+    store = PdfStore(str(tmp_path / "pdf_blobs"))
+    descargar, descargas = descarga_local({
+        "https://a/bases.pdf": b"%PDF orden de bases",
+        "https://b/bases.pdf": b"%PDF orden de bases",
+    })
+
+    sha_a = store.fetch("https://a/bases.pdf", descargar)
+    assert store.fetch("https://a/bases.pdf", descargar) == sha_a
+    sha_b = store.fetch("https://b/bases.pdf", descargar)
+
+    assert [url for url, _ in descargas] == ["https://a/bases.pdf", "https://b/bases.pdf"]
+    assert sha_a == sha_b
+    assert os.listdir(os.path.join(store.blob_dir, sha_a[:2])) == [f"{sha_a}.pdf"]
+
+    # El índice url -> sha sobrevive entre ejecuciones
+    assert PdfStore(store.blob_dir).sha_for_url("https://b/bases.pdf") == sha_a
+
+
+def test_las_carpetas_por_convocatoria_enlazan_al_blob(tmp_path):
+    store = PdfStore(str(tmp_path / "pdf_blobs"))
+    descargar, _ = descarga_local({"https://a/bases.pdf": b"%PDF orden de bases"})
+    sha = store.fetch("https://a/bases.pdf", descargar)
+
+    ruta_1 = tmp_path / "pdf" / "linea1" / "linea1_bases.pdf"
+    ruta_2 = tmp_path / "pdf" / "linea2" / "linea2_bases.pdf"
+    store.link(sha, str(ruta_1))
+    store.link(sha, str(ruta_2))
+
+    assert os.path.samefile(ruta_1, store.blob_path(sha))
+    assert os.path.samefile(ruta_2, store.blob_path(sha))
+
+
+def test_descarga_fallida(tmp_path):
+    store = PdfStore(str(tmp_path / "pdf_blobs"))
+    assert store.fetch("https://a/roto.pdf", lambda url, ruta, validators: {"status": "failed"}) is None
+    assert store.sha_for_url("https://a/roto.pdf") is None
+
+
+def test_revalida_con_peticion_condicional_en_la_siguiente_ejecucion(tmp_path):
+    contenidos = {"https://a/bases.pdf": b"%PDF orden de bases"}
+    descargar, descargas = descarga_local(contenidos)
+    sha = PdfStore(str(tmp_path / "pdf_blobs")).fetch("https://a/bases.pdf", descargar)
+
+    # Nueva ejecución: se envían los validadores guardados y un 304 conserva el blob.
+    store = PdfStore(str(tmp_path / "pdf_blobs"))
+    assert store.fetch("https://a/bases.pdf", descargar) == sha
+    assert descargas[-1][1]["etag"] == f"v{len(contenidos['https://a/bases.pdf'])}"
+
+    # Si el documento cambia, la siguiente ejecución descarga el nuevo contenido.
+    contenidos["https://a/bases.pdf"] = b"%PDF orden de bases corregida"
+    store = PdfStore(str(tmp_path / "pdf_blobs"))
+    nuevo_sha = store.fetch("https://a/bases.pdf", descargar)
+    assert nuevo_sha != sha
+    assert store.fetch("https://a/bases.pdf", descargar) == nuevo_sha
+    assert len(descargas) == 3
+
+
+@pytest.fixture
+def indexador(tmp_path, monkeypatch):
+    """Embeddings de prueba (sin Azure) y cachés en tmp_path; devuelve la lista de llamadas."""
+    llamadas = []
+
+    class ProveedorContado(HashingEmbeddingProvider):
+        def embed(self, texts, max_retries=None):
+            llamadas.append(len(texts))
+            return super().embed(texts)
+
+    monkeypatch.setattr(vectorial_db_tools, "get_embedding_provider", lambda: ProveedorContado(dim=16))
+    monkeypatch.setattr(vectorial_db_tools, "get_embedding_cache", lambda: EmbeddingCache(str(tmp_path / "emb.sqlite3")))
+    extraction_cache = ExtractionCache(str(tmp_path / "extraction"))
+    monkeypatch.setattr(pdf_parsing, "get_extraction_cache", lambda: extraction_cache)
+
+    db_dir = str(tmp_path / "vec_db")
+    yield llamadas, db_dir
+    invalidate_vectorstore(db_dir)
+
+
+def otro_pdf(destino, paginas=slice(0, 2)):
+    """Escribe en `destino` un PDF distinto del de ejemplo (por defecto, las dos primeras páginas de id1)."""
+    lector = PdfReader(FIXTURE_PDF_LARGO)
+    escritor = PdfWriter()
+    for pagina in lector.pages[paginas]:
+        escritor.add_page(pagina)
+    with open(destino, "wb") as f:
+        escritor.write(f)
+
+
+@pytest.mark.skipif(not os.path.exists(FIXTURE_PDF), reason="Falta el PDF de ejemplo")
+def test_indexa_cada_blob_una_vez_con_todas_sus_convocatorias(tmp_path, indexador):
+    llamadas, db_dir = indexador
+    pdf_dir = tmp_path / "pdf"
+    for linea in ["linea1", "linea2"]:
+        (pdf_dir / linea).mkdir(parents=True)
+        shutil.copyfile(FIXTURE_PDF, pdf_dir / linea / f"{linea}_bases.pdf")
+
+    vectorial_db_tools.process_pdfs_to_shared_db(str(pdf_dir), db_dir)
+    collection = get_vectorstore(db_dir)._collection
+    fragmentos = collection.count()
+    llamadas_iniciales = len(llamadas)
+
+    metadatas = collection.get(include=["metadatas"])["metadatas"]
+    assert all(m["convocatoria_linea1"] and m["convocatoria_linea2"] for m in metadatas)
+
+    # Una línea nueva que comparte la orden de bases solo se añade a los metadatos.
+    (pdf_dir / "linea3").mkdir()
+    shutil.copyfile(FIXTURE_PDF, pdf_dir / "linea3" / "linea3_bases.pdf")
+    vectorial_db_tools.process_pdfs_to_shared_db(str(pdf_dir), db_dir)
+
+    assert collection.count() == fragmentos
+    assert len(llamadas) == llamadas_iniciales
+    encontrados = collection.get(where=vectorial_db_tools.convocatoria_filter("linea3"))
+    assert len(encontrados["ids"]) == fragmentos
+    encontrados = collection.get(where=vectorial_db_tools.doc_filter("linea3_bases"))
+    assert len(encontrados["ids"]) == fragmentos
+
+
+@pytest.mark.skipif(not os.path.exists(FIXTURE_PDF_LARGO), reason="Faltan los PDFs de ejemplo")
+def test_reindexar_no_duplica_y_elimina_fragmentos_obsoletos(tmp_path, indexador):
+    llamadas, db_dir = indexador
+    carpeta = tmp_path / "pdf" / "linea1"
+    carpeta.mkdir(parents=True)
+    pdf = carpeta / "linea1_bases.pdf"
+    shutil.copyfile(FIXTURE_PDF, pdf)
+
+    vectorial_db_tools.save_pdf_at_vec_db([str(pdf)], db_dir)
+    collection = get_vectorstore(db_dir)._collection
+    ids_iniciales = set(collection.get()["ids"])
+    llamadas_iniciales = len(llamadas)
+
+    # El mismo PDF otra vez: mismos ids, sin embeddings nuevos.
+    vectorial_db_tools.save_pdf_at_vec_db([str(pdf)], db_dir)
+    assert set(collection.get()["ids"]) == ids_iniciales
+    assert len(llamadas) == llamadas_iniciales
+
+    # Nueva versión del PDF: solo quedan sus fragmentos.
+    otro_pdf(pdf)
+    vectorial_db_tools.save_pdf_at_vec_db([str(pdf)], db_dir)
+    documentos = list(vectorial_db_tools.iter_pdf_documents([str(pdf)]))
+    esperados = {
+        vectorial_db_tools.chunk_id(doc.metadata["id"], doc.metadata["fragment"], doc.page_content)
+        for doc in documentos
+    }
+    assert set(collection.get()["ids"]) == esperados
+
+
+@pytest.mark.skipif(not os.path.exists(FIXTURE_PDF_LARGO), reason="Faltan los PDFs de ejemplo")
+def test_fragmentos_obsoletos_compartidos_se_desasocian(tmp_path, indexador):
+    _, db_dir = indexador
+    pdf_dir = tmp_path / "pdf"
+    for linea in ["linea1", "linea2"]:
+        (pdf_dir / linea).mkdir(parents=True)
+        shutil.copyfile(FIXTURE_PDF, pdf_dir / linea / "bases.pdf")
+
+    vectorial_db_tools.process_pdfs_to_shared_db(str(pdf_dir), db_dir)
+    collection = get_vectorstore(db_dir)._collection
+    compartidos = collection.count()
+
+    # linea1 cambia su orden de bases; la de linea2 sigue siendo la antigua.
+    otro_pdf(pdf_dir / "linea1" / "bases.pdf")
+    vectorial_db_tools.process_pdfs_to_shared_db(str(pdf_dir), db_dir)
+
+    de_linea2 = collection.get(where=vectorial_db_tools.convocatoria_filter("linea2"))
+    assert len(de_linea2["ids"]) == compartidos
+    de_linea1 = collection.get(where=vectorial_db_tools.convocatoria_filter("linea1"))
+    assert not set(de_linea1["ids"]) & set(de_linea2["ids"])
+
+
+@pytest.mark.skipif(not os.path.exists(FIXTURE_PDF_LARGO), reason="Faltan los PDFs de ejemplo")
+def test_manifiesto_calcula_el_delta_incremental(tmp_path, indexador, capsys):
+    llamadas, db_dir = indexador
+    pdf_dir = tmp_path / "pdf"
+    (pdf_dir / "linea1").mkdir(parents=True)
+    (pdf_dir / "linea2").mkdir(parents=True)
+    shutil.copyfile(FIXTURE_PDF, pdf_dir / "linea1" / "linea1_bases.pdf")
+    otro_pdf(pdf_dir / "linea2" / "linea2_bases.pdf")
+
+    vectorial_db_tools.process_pdfs_to_shared_db(str(pdf_dir), db_dir)
+    collection = get_vectorstore(db_dir)._collection
+    llamadas_iniciales = len(llamadas)
+    capsys.readouterr()
+
+    # Sin cambios: no se recalculan hashes ni se indexa nada.
+    vectorial_db_tools.process_pdfs_to_shared_db(str(pdf_dir), db_dir)
+    assert "2 PDFs (0 con hash recalculado): 0 contenidos por indexar" in capsys.readouterr().out
+    assert len(llamadas) == llamadas_iniciales
+
+    # Un PDF modificado con el mismo nombre se reindexa sin dejar duplicados.
+    otro_pdf(pdf_dir / "linea1" / "linea1_bases.pdf", paginas=slice(2, 3))
+    vectorial_db_tools.process_pdfs_to_shared_db(str(pdf_dir), db_dir)
+    de_linea1 = collection.get(where=vectorial_db_tools.convocatoria_filter("linea1"))
+    de_linea2 = collection.get(where=vectorial_db_tools.convocatoria_filter("linea2"))
+    esperados = {
+        vectorial_db_tools.chunk_id(doc.metadata["id"], doc.metadata["fragment"], doc.page_content)
+        for doc in vectorial_db_tools.iter_pdf_documents([str(pdf_dir / "linea1" / "linea1_bases.pdf")])
+    }
+    assert set(de_linea1["ids"]) == esperados
+    assert collection.count() == len(de_linea1["ids"]) + len(de_linea2["ids"])
+
+    # Una convocatoria eliminada desaparece de la base vectorial.
+    shutil.rmtree(pdf_dir / "linea2")
+    vectorial_db_tools.process_pdfs_to_shared_db(str(pdf_dir), db_dir)
+    assert collection.count() == len(de_linea1["ids"])
+    assert not collection.get(where=vectorial_db_tools.convocatoria_filter("linea2"))["ids"]
+
+
+@pytest.mark.skipif(not os.path.exists(FIXTURE_PDF), reason="Falta el PDF de ejemplo")
+def test_pdf_compartido_se_busca_por_el_id_de_cada_convocatoria(tmp_path, indexador, monkeypatch):
+    from app_chat.tools import vectorial_tools, vector_store_registry as chat_registry
+    from app_chat.tools.embedding_provider import HashingEmbeddingProvider as ChatHashingEmbeddingProvider
+
+    pdf_dir = tmp_path / "pdf"
+    for linea in ["linea1", "linea2"]:
+        (pdf_dir / linea).mkdir(parents=True)
+        shutil.copyfile(FIXTURE_PDF, pdf_dir / linea / f"{linea}_bases.pdf")
+
+    # app_chat busca en db_test cuando ENVIRONMENT=TEST.
+    db_dir = str(tmp_path / "db_test")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ENVIRONMENT", "TEST")
+    monkeypatch.setattr(vectorial_tools, "get_embedding_provider", lambda: ChatHashingEmbeddingProvider(dim=16))
+
+    vectorial_db_tools.process_pdfs_to_shared_db(str(pdf_dir), db_dir)
+    try:
+        collection = get_vectorstore(db_dir)._collection
+        fragmentos = collection.count()
+        for doc_id in ["linea1_bases", "linea2_bases"]:
+            assert len(collection.get(where=vectorial_db_tools.doc_filter(doc_id))["ids"]) == fragmentos
+
+            resultados = vectorial_tools.get_context_by_id(prompt="plazo de solicitud", doc_id=doc_id)
+            assert resultados and {doc.metadata["id"] for doc in resultados} == {doc_id}
+
+            fragmento = resultados[0].metadata["fragment"]
+            resultados = vectorial_tools.get_context_by_id_and_fragment(prompt="plazo", doc_id=doc_id, fragment_id=fragmento)
+            assert [doc.metadata["fragment"] for doc in resultados] == [fragmento]
+
+        # En el refinamiento cada convocatoria ve el PDF con el nombre de su propio fichero.
+        (textos, tablas), = vectorial_db_tools.search_many_from_context_vec_db(["plazo de solicitud"], db_dir, n_results=2, doc_id="linea2")
+        assert {doc.metadata["id"] for doc, _ in textos + tablas} == {"linea2_bases"}
+    finally:
+        chat_registry.invalidate_vectorstore(db_dir)
+        invalidate_vectorstore(db_dir)
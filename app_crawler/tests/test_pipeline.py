@@ -0,0 +1,101 @@
+import os
+import time
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+from app_crawler.tools import pdf_parsing, embedding_provider
+from app_crawler.tools.extraction_cache import ExtractionCache
+from app_crawler.tools.pipeline import in_background, token_batched
+from app_crawler.tools.pdf_parsing import extract_text_and_tables
+from app_crawler.tools.vectorial_db_tools import iter_pdf_documents, embed_with_split
+
+FIXTURE_PDF = os.path.join(os.path.dirname(__file__), "..", "..", "app_chat", "tests", "id2.pdf")
+
+
+@pytest.fixture(autouse=True)
+def cache_temporal(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path / "extraction_cache"))
+    monkeypatch.setattr(pdf_parsing, "get_extraction_cache", lambda: cache)
+
+
+def test_mantiene_el_orden():
+    assert list(in_background(range(100), maxsize=3)) == list(range(100))
+
+
+def test_la_cola_acota_la_ventaja_del_productor():
+    producidos = []
+
+    def productor():
+        for i in range(50):
+            producidos.append(i)
+            yield i
+
+    for consumidos, _ in enumerate(in_background(productor(), maxsize=4), start=1):
+        time.sleep(0.001)
+        # la cola, el elemento que el productor intenta encolar y el que se está consumiendo
+        assert len(producidos) - consumidos <= 4 + 1
+
+
+def test_propaga_las_excepciones_del_productor():
+    def productor():
+        yield 1
+        raise RuntimeError("PDF corrupto")
+
+    with pytest.raises(RuntimeError):
+        list(in_background(productor(), maxsize=2))
+
+
+def test_parar_de_consumir_cierra_el_productor():
+    cerrado = []
+
+    def productor():
+        try:
+            for i in range(1000):
+                yield i
+        finally:
+            cerrado.append(True)
+
+    for item in in_background(productor(), maxsize=2):
+        if item == 3:
+            break
+
+    assert cerrado == [True]
+
+
+def test_token_batched():
+    textos = ["a" * 10, "b" * 10, "c" * 50, "d" * 10, "e" * 10, "f" * 10]
+    lotes = list(token_batched(textos, max_tokens=25, max_items=2, token_count=len))
+
+    # La tabla de 50 va sola y ningún lote supera los 25 tokens ni los 2 elementos.
+    assert lotes == [["a" * 10, "b" * 10], ["c" * 50], ["d" * 10, "e" * 10], ["f" * 10]]
+
+
+def test_embed_with_split_divide_los_batches_rechazados(monkeypatch):
+    peticiones = []
+
+    def create(input, model):
+        peticiones.append(len(input))
+        if len(input) > 2 or "roto" in input:
+            response = httpx.Response(400, request=httpx.Request("POST", "https://example.openai.azure.com/"))
+            raise openai.BadRequestError("too many tokens", response=response, body=None)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t))]) for t in input])
+
+    monkeypatch.setattr(embedding_provider, "get_embedding_client", lambda: SimpleNamespace(embeddings=SimpleNamespace(create=create)))
+    proveedor = embedding_provider.AzureEmbeddingProvider("test-embeddings")
+    embeddings, llamadas = embed_with_split(proveedor, ["uno", "dos", "roto", "cuatro", "cinco"], max_retries=0)
+
+    assert embeddings == [[3.0], [3.0], None, [6.0], [5.0]]
+    assert peticiones == [5, 2, 3, 1, 2]
+    assert llamadas == len(peticiones)
+
+
+@pytest.mark.skipif(not os.path.exists(FIXTURE_PDF), reason="Falta el PDF de ejemplo")
+def test_documentos_en_streaming_numerados_como_la_extraccion_completa():
+    chunks = extract_text_and_tables(FIXTURE_PDF)
+    documentos = list(iter_pdf_documents([FIXTURE_PDF]))
+
+    fragmentos = {doc.metadata["fragment"].split("-")[0] for doc in documentos}
+    assert fragmentos == {str(i + 1) for i, chunk in enumerate(chunks) if chunk["tipo"] == "tabla" or chunk["content"].strip()}
+    assert all(doc.metadata["id"] == "id2" for doc in documentos)
+    assert all(doc.metadata["convocatoria_id"] == "tests" for doc in documentos)
@@ -0,0 +1,76 @@
+import time
+import httpx
+from app_crawler.azure_clients import _update_rate_limits
+from app_crawler.tools.rate_limiter import RateLimiter, get_rate_limiter, get_chat_rate_limiter, estimate_tokens, estimate_chat_tokens
+
+
+def test_limite_de_tokens_bloquea_hasta_recuperar_cuota():
+    # 6000 tokens/min -> bucket de 1000 tokens que se recupera a 100 tokens/s
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=6000)
+
+    inicio = time.monotonic()
+    limiter.acquire(1000)
+    limiter.acquire(20)
+    transcurrido = time.monotonic() - inicio
+
+    assert 0.15 <= transcurrido < 1
+
+
+def test_limite_de_peticiones():
+    # 600 peticiones/min -> bucket de 100 peticiones que se recupera a 10 por segundo
+    limiter = RateLimiter(requests_per_minute=600)
+
+    inicio = time.monotonic()
+    for _ in range(102):
+        limiter.acquire()
+    transcurrido = time.monotonic() - inicio
+
+    assert 0.15 <= transcurrido < 1
+
+
+def test_pausa_tras_429():
+    limiter = RateLimiter(requests_per_minute=6000)
+    limiter.pause(0.2)
+
+    inicio = time.monotonic()
+    limiter.acquire()
+
+    assert time.monotonic() - inicio >= 0.19
+
+
+def test_cabeceras_reducen_la_cuota_disponible():
+    limiter = get_rate_limiter("despliegue-test", requests_per_minute=6000, tokens_per_minute=60000)
+
+    request = httpx.Request("POST", "https://example.openai.azure.com/openai/deployments/despliegue-test/embeddings")
+    response = httpx.Response(
+        200,
+        headers={"x-ratelimit-remaining-requests": "3", "x-ratelimit-remaining-tokens": "50"},
+        request=request
+    )
+    _update_rate_limits(response)
+
+    assert limiter.requests.tokens <= 3
+    assert limiter.tokens.tokens <= 50
+
+
+def test_estimaciones_de_tokens():
+    assert estimate_tokens(["a" * 400]) == 101
+
+    mensajes = [
+        {"role": "system", "content": "a" * 40},
+        {"role": "user", "content": [{"type": "text", "text": "b" * 40}]}
+    ]
+    assert estimate_chat_tokens(mensajes, completion_tokens=100) == 11 + 11 + 8 + 100
+
+
+def test_cuotas_leidas_del_entorno_al_crear_el_limitador(monkeypatch):
+    # Los valores del .env se cargan después de importar el módulo: deben leerse al crear el limitador.
+    monkeypatch.setenv("AZURE_CHAT_RPM", "600")
+    monkeypatch.setenv("AZURE_CHAT_TPM", "6000")
+    monkeypatch.setenv("AZURE_CHAT_COMPLETION_TOKENS", "10")
+
+    limiter = get_chat_rate_limiter("despliegue-chat-entorno")
+
+    assert limiter.requests.rate == 10
+    assert limiter.tokens.rate == 100
+    assert estimate_chat_tokens([{"role": "user", "content": "a" * 40}]) == 11 + 4 + 10
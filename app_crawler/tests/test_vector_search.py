@@ -0,0 +1,227 @@
+import pytest
+from app_crawler.tools import vectorial_db_tools
+from app_crawler.tools.embedding_provider import EmbeddingProvider, set_embedding_provider
+from app_crawler.tools.prompt_embeddings import PromptEmbeddingRegistry
+from app_crawler.tools.vector_store_registry import get_vectorstore, invalidate_vectorstore
+
+
+class ProveedorFijo(EmbeddingProvider):
+    """Proveedor sin red que devuelve `vectores` en orden (o [1, 0]) y registra las peticiones."""
+
+    def __init__(self, vectores: list = None):
+        super().__init__("test-fijo")
+        self.vectores = vectores
+        self.peticiones = []
+
+    def embed(self, texts, max_retries=None):
+        self.peticiones.append(list(texts))
+        if self.vectores:
+            return self.vectores[:len(texts)]
+        return [[1.0, 0.0] for _ in texts]
+
+
+@pytest.fixture
+def vectorstore_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "vec_db")
+    db = get_vectorstore(path)
+
+    db._collection.add(
+        ids=["a1", "a2", "b1", "b2"],
+        embeddings=[[1.0, 0.0], [0.9, 0.1], [1.0, 0.01], [0.0, 1.0]],
+        documents=["texto a1", "tabla a2", "texto b1", "tabla b2"],
+        metadatas=[
+            {"id": "A_ficha", "fragment": "1-1", "tipo": "texto", "convocatoria_id": "A"},
+            {"id": "A_bases", "fragment": "2", "tipo": "tabla", "convocatoria_id": "A"},
+            {"id": "B_ficha", "fragment": "1-1", "tipo": "texto", "convocatoria_id": "B"},
+            {"id": "B_bases", "fragment": "2", "tipo": "tabla", "convocatoria_id": "B"},
+        ]
+    )
+
+    set_embedding_provider(ProveedorFijo())
+    monkeypatch.setattr(vectorial_db_tools, "get_prompt_registry", lambda name: PromptEmbeddingRegistry(name, str(tmp_path)))
+    yield path
+    set_embedding_provider(None)
+    invalidate_vectorstore(path)
+
+
+def test_filtra_por_convocatoria(vectorstore_path):
+    resultados = vectorial_db_tools.search_from_context_vec_db("consulta", vectorstore_path, k=2, doc_id="B")
+
+    assert resultados
+    assert {doc.metadata["convocatoria_id"] for doc in resultados} == {"B"}
+
+
+def test_sin_filtro_busca_en_toda_la_base(vectorstore_path):
+    resultados = vectorial_db_tools.search_from_context_vec_db("consulta", vectorstore_path, k=4)
+
+    assert {doc.metadata["convocatoria_id"] for doc in resultados} == {"A", "B"}
+
+
+def test_solo_tablas(vectorstore_path):
+    resultados = vectorial_db_tools.search_from_context_vec_db("consulta", vectorstore_path, k=1, find_table=True, doc_id="A")
+
+    assert [doc.page_content for doc in resultados] == ["tabla a2"]
+
+
+def test_busqueda_multiple_igual_que_individual(vectorstore_path):
+    proveedor = ProveedorFijo([[1.0, 0.0], [0.0, 1.0]])
+    set_embedding_provider(proveedor)
+
+    varios = vectorial_db_tools.search_many_from_context_vec_db(["p1", "p2"], vectorstore_path, n_results=2, doc_id="A")
+
+    assert proveedor.peticiones == [["p1", "p2"]]
+    (textos_1, tablas_1), (textos_2, tablas_2) = varios
+    assert [doc.page_content for doc, _ in textos_1] == ["texto a1"]
+    assert [doc.page_content for doc, _ in tablas_2] == ["tabla a2"]
+    assert vectorial_db_tools.select_context(textos_2, tablas_2, k=1, find_table=True) == \
+        vectorial_db_tools.search_from_context_vec_db("p2", vectorstore_path, k=1, find_table=True, doc_id="A")
+
+
+def test_tablas_lejanas_se_encuentran(vectorstore_path):
+    # Con k*2 vecinos y filtrado posterior no saldría ninguna tabla: los dos más cercanos son textos.
+    resultados = vectorial_db_tools.search_from_context_vec_db("consulta", vectorstore_path, k=1, find_table=True)
+
+    assert [doc.page_content for doc in resultados] == ["tabla a2"]
+    resultados = vectorial_db_tools.search_from_context_vec_db("consulta", vectorstore_path, k=2, find_table=True)
+    assert [doc.page_content for doc in resultados] == ["tabla a2", "tabla b2"]
+
+
+def test_cupo_de_textos_y_tablas(vectorstore_path):
+    resultados = vectorial_db_tools.search_from_context_vec_db("consulta", vectorstore_path, k=2)
+
+    # int(2 * 0.8) = 1 texto y 1 tabla, aunque los dos textos estén más cerca que las tablas.
+    assert [doc.page_content for doc in resultados] == ["texto a1", "tabla a2"]
+
+    resultados = vectorial_db_tools.search_from_context_vec_db("consulta", vectorstore_path, k=4, doc_id="A")
+    assert [doc.page_content for doc in resultados] == ["texto a1", "tabla a2"]
+
+
+def test_contexto_precargado(vectorstore_path, monkeypatch):
+    from app_crawler.tools import tools
+
+    directo = tools.get_costes_elegibles_context(vectorstore_path, 0, "A")
+    assert tools.prefetch_contexts(vectorstore_path, "A")
+    monkeypatch.setattr(tools, "search_from_context_vec_db", lambda *args, **kwargs: pytest.fail("no debería buscar"))
+
+    try:
+        assert tools.get_costes_elegibles_context(vectorstore_path, 0, "A") == directo
+    finally:
+        tools.release_contexts(vectorstore_path, "A")
+
+
+def test_busqueda_hibrida_encuentra_importes_literales(vectorstore_path):
+    collection = get_vectorstore(vectorstore_path)._collection
+    collection.add(
+        ids=["a3"],
+        embeddings=[[0.0, 1.0]],
+        documents=["La cuantía máxima de la ayuda es de 200.000 euros por proyecto."],
+        metadatas=[{"id": "A_bases", "fragment": "3-1", "tipo": "texto", "convocatoria_id": "A"}]
+    )
+    consulta = "¿Cuál es el presupuesto máximo? €"
+
+    # Sin índice léxico solo hay búsqueda vectorial, y el fragmento con el importe queda lejos.
+    vectorial = vectorial_db_tools.search_from_context_vec_db(consulta, vectorstore_path, k=2, doc_id="A")
+    assert [doc.metadata["fragment"] for doc in vectorial] == ["1-1", "2"]
+
+    vectorial_db_tools.ensure_lexical_index(vectorstore_path)
+    hibrida = vectorial_db_tools.search_from_context_vec_db(consulta, vectorstore_path, k=2, doc_id="A")
+    assert [doc.metadata["fragment"] for doc in hibrida] == ["3-1", "2"]
+
+    solo_vectorial = vectorial_db_tools.search_many_from_context_vec_db([consulta], vectorstore_path, n_results=1, doc_id="A", mode="vector")
+    assert [doc.page_content for doc, _ in solo_vectorial[0][0]] == ["texto a1"]
+
+    # Sin convocatoria, el tipo se filtra en el propio índice léxico: el texto con el importe
+    # no aparece entre las tablas.
+    (textos, tablas), = vectorial_db_tools.search_many_from_context_vec_db([consulta], vectorstore_path, n_results=4)
+    assert {doc.metadata["tipo"] for doc, _ in tablas} == {"tabla"}
+    assert "3-1" in [doc.metadata["fragment"] for doc, _ in textos]
+
+
+def test_bm25(tmp_path):
+    from app_crawler.tools.lexical_index import LexicalIndex, tokenize
+
+    assert tokenize("Plazo: hasta el 15/03/2024, 80 % y 1.000 euros") == ["plazo", "hasta", "<fecha>", "80", "%", "1.000", "€"]
+
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.add(["1", "2", "3"], ["subvención del 80 %", "plazo hasta el 15/03/2024", "objetivos del programa"])
+    assert [chunk_id for chunk_id, _ in index.search("porcentaje de subvención", 3)] == ["1"]
+    assert [chunk_id for chunk_id, _ in index.search("<fecha> plazo", 3, allowed_ids={"1", "3"})] == []
+
+    index.delete(["2"])
+    assert len(index) == 2
+    assert index.search("plazo", 3) == []
+
+
+def test_bm25_restringido_a_candidatos(tmp_path):
+    from app_crawler.tools.lexical_index import LexicalIndex
+
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.add([str(i) for i in range(1200)], [f"convocatoria {i} con presupuesto de {i} euros" for i in range(1200)])
+    index.add(["x"], ["presupuesto máximo de la convocatoria en euros"])
+
+    completa = dict(index.search("presupuesto de la convocatoria en euros", 2000))
+    candidatos = {"x", "7", "900"}
+    restringida = index.search("presupuesto de la convocatoria en euros", 3, allowed_ids=candidatos)
+
+    # Mismas puntuaciones que sobre todo el índice (df y longitud media globales).
+    assert [chunk_id for chunk_id, _ in restringida][0] == "x"
+    assert {chunk_id: score for chunk_id, score in restringida} == {chunk_id: completa[chunk_id] for chunk_id in candidatos}
+    assert index.search("presupuesto", 3, allowed_ids=set()) == []
+
+    # Las estadísticas en memoria se recalculan tras cada escritura.
+    index.add(["y"], ["plazo de presentación"])
+    assert [chunk_id for chunk_id, _ in index.search("plazo", 3, allowed_ids={"y", "x"})] == ["y"]
+    index.close()
+
+
+def test_bm25_filtra_por_tipo(tmp_path):
+    from app_crawler.tools.lexical_index import LexicalIndex
+
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.add(["t", "x"], ["presupuesto de 1.000 euros", "presupuesto | 1.000 euros"], ["texto", "tabla"])
+    index.add(["sin_tipo"], ["presupuesto"])
+
+    assert [chunk_id for chunk_id, _ in index.search("presupuesto", 5, tablas=True)] == ["x"]
+    assert {chunk_id for chunk_id, _ in index.search("presupuesto", 5, tablas=False)} == {"t", "sin_tipo"}
+    assert len(index.search("presupuesto", 5)) == 3
+    index.close()
+
+
+def test_indice_sin_tipo_se_vacia_para_reconstruirlo(tmp_path):
+    import sqlite3
+    from app_crawler.tools.lexical_index import LexicalIndex
+
+    path = str(tmp_path / "lexical.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE chunks (chunk_id TEXT PRIMARY KEY, length INTEGER NOT NULL);
+        CREATE TABLE postings (term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, chunk_id));
+        INSERT INTO chunks VALUES ('1', 1);
+        INSERT INTO postings VALUES ('plazo', '1', 1);
+    """)
+    conn.close()
+
+    index = LexicalIndex(path)
+    assert len(index) == 0
+    index.add(["1"], ["plazo"], ["texto"])
+    assert [chunk_id for chunk_id, _ in index.search("plazo", 1, tablas=False)] == ["1"]
+    index.close()
+
+
+def test_bm25_cierra_las_conexiones_de_hilos_terminados(tmp_path):
+    import gc
+    from concurrent.futures import ThreadPoolExecutor
+    from app_crawler.tools.lexical_index import LexicalIndex
+
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.add(["1"], ["plazo de solicitud"], ["texto"])
+
+    # Como en run_refinement_agent, un pool nuevo por documento.
+    for _ in range(3):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert all(list(executor.map(lambda _: index.search("plazo", 1), range(8))))
+        del executor
+    gc.collect()
+
+    assert len(index._readers) == 0
+    index.close()
@@ -0,0 +1,212 @@
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 2))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", 50))
+
+
+def crear_driver(page_load_timeout: int = 20) -> webdriver.Chrome:
+    """
+    Crea un Chrome headless con la configuración usada por el crawler.
+
+    Se usa la estrategia de carga 'eager' para que driver.get vuelva en cuanto el DOM
+    está construido; la espera real la hace esperar_pagina_lista.
+    """
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.page_load_strategy = "eager"
+
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(page_load_timeout)
+    return driver
+
+
+def esperar_pagina_lista(driver, timeout: float = 10, quiet_period: float = 0.5, poll: float = 0.1):
+    """
+    Espera a que la página esté lista en lugar de dormir un tiempo fijo.
+
+    La espera termina cuando el DOM ya no está en estado 'loading' y la red lleva
+    `quiet_period` segundos sin registrar nuevos recursos (performance API), o cuando
+    se agota `timeout`.
+
+    Args:
+        driver: Driver de Selenium con la página ya solicitada.
+        timeout (float): Tiempo máximo de espera en segundos.
+        quiet_period (float): Segundos sin peticiones nuevas para considerar la red tranquila.
+        poll (float): Intervalo de sondeo en segundos.
+
+    Returns:
+        bool: True si la página quedó lista antes del timeout, False en caso contrario.
+    """
+    script = "return [document.readyState, performance.getEntriesByType('resource').length];"
+    deadline = time.monotonic() + timeout
+    last_count = -1
+    stable_since = time.monotonic()
+
+    while time.monotonic() < deadline:
+        try:
+            ready_state, resource_count = driver.execute_script(script)
+        except Exception:
+            ready_state, resource_count = "loading", last_count
+
+        now = time.monotonic()
+        if resource_count != last_count:
+            last_count = resource_count
+            stable_since = now
+
+        if ready_state != "loading" and now - stable_since >= quiet_period:
+            return True
+
+        time.sleep(poll)
+
+    return False
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+class BrowserPool:
+    """
+    Pool acotado de drivers de Selenium de larga duración.
+
+    Cada llamada toma un driver en exclusiva, lo devuelve al terminar y el pool se encarga
+    de comprobar su salud y de reciclarlo tras `max_pages` páginas.
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_pages: int = BROWSER_MAX_PAGES,
+        acquire_timeout: float = 300,
+        driver_factory=crear_driver
+    ):
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1.")
+
+        self.size = size
+        self.max_pages = max_pages
+        self.acquire_timeout = acquire_timeout
+        self.driver_factory = driver_factory
+
+        self._idle = []
+        self._created = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def acquire(self) -> _PooledDriver:
+        deadline = time.monotonic() + self.acquire_timeout
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("El pool de navegadores está cerrado.")
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+
+                if self._created < self.size:
+                    self._created += 1
+                    pooled = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("No hay navegadores libres en el pool.")
+                self._condition.wait(remaining)
+
+        if pooled is not None and self._is_healthy(pooled.driver):
+            return pooled
+
+        if pooled is not None:
+            self._quit(pooled.driver)
+
+        try:
+            return _PooledDriver(self.driver_factory())
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, pooled: _PooledDriver, healthy: bool = True):
+        pooled.pages += 1
+        recycle = not healthy or pooled.pages >= self.max_pages
+
+        with self._condition:
+            if self._closed or recycle:
+                self._created -= 1
+            else:
+                self._idle.append(pooled)
+            self._condition.notify()
+
+        if self._closed or recycle:
+            self._quit(pooled.driver)
+
+    @contextmanager
+    def driver(self):
+        """
+        Context manager que presta un driver del pool.
+
+        Si el bloque lanza una excepción, el driver se revisa antes de devolverlo al pool
+        y se descarta si ya no responde.
+        """
+        pooled = self.acquire()
+        healthy = True
+        try:
+            yield pooled.driver
+        except Exception:
+            healthy = self._is_healthy(pooled.driver)
+            raise
+        finally:
+            self.release(pooled, healthy=healthy)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._condition.notify_all()
+
+        for pooled in idle:
+            self._quit(pooled.driver)
+
+    @staticmethod
+    def _is_healthy(driver) -> bool:
+        try:
+            driver.execute_script("return 1;")
+            return len(driver.window_handles) > 0
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error al cerrar el navegador: {e}")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Devuelve el pool de navegadores compartido por todo el proceso, creándolo si no existe."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
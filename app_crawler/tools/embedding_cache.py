@@ -0,0 +1,131 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Caché persistente de embeddings en SQLite, indexada por (despliegue del modelo, hash del texto).
+
+    Los vectores se guardan como float32 y, cuando se supera `max_entries`, se eliminan
+    las entradas usadas hace más tiempo. Por defecto la ruta y el tamaño se leen de
+    EMBEDDING_CACHE_PATH y EMBEDDING_CACHE_MAX_ENTRIES al abrir la caché.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None):
+        if path is None:
+            path = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache/embeddings.sqlite3")
+        if max_entries is None:
+            max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500000))
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model: str, texts: list) -> list:
+        """
+        Devuelve, en el mismo orden que `texts`, el embedding cacheado de cada texto o None
+        si no está en la caché.
+        """
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found]
+                )
+                self._conn.commit()
+
+            results = [array("f", found[h]).tolist() if h in found else None for h in hashes]
+            hits = sum(1 for r in results if r is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+
+        return results
+
+    def put_many(self, model: str, texts: list, embeddings: list):
+        now = time.time()
+        rows = [
+            (model, text_hash(text), array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if total <= self.max_entries:
+            return
+
+        sobrantes = total - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (sobrantes,)
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Devuelve la caché de embeddings compartida por el proceso."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
@@ -0,0 +1,81 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "data/extraction_cache")
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 del contenido de un fichero, leído por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Caché en disco de la extracción de PDFs, indexada por el SHA-256 del PDF y la versión
+    del extractor, de modo que un PDF ya parseado no se vuelve a parsear aunque cambie de
+    nombre o de carpeta, y cualquier cambio en el extractor invalida las entradas antiguas.
+
+    Cada entrada es un JSON comprimido con gzip con la lista de páginas, y cada página es
+    una lista de pares [tipo, contenido].
+    """
+
+    def __init__(self, directory: str = EXTRACTION_CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, sha256: str, version: str) -> str:
+        return os.path.join(self.directory, sha256[:2], f"{sha256}-{version}.json.gz")
+
+    def get(self, sha256: str, version: str):
+        """Devuelve las páginas [[{content, tipo}, ...], ...] cacheadas, o None si no están."""
+        path = self._path(sha256, version)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                pages = json.load(f)
+        except FileNotFoundError:
+            pages = None
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            print(f"Entrada de caché de extracción corrupta {path}: {e}")
+            pages = None
+
+        with self._lock:
+            if pages is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if pages is None:
+            return None
+        return [[{"content": content, "tipo": tipo} for tipo, content in page] for page in pages]
+
+    def put(self, sha256: str, version: str, pages: list):
+        path = self._path(sha256, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        compact = [[[chunk["tipo"], chunk["content"]] for chunk in page] for page in pages]
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(compact, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Devuelve la caché de extracción compartida por el proceso."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
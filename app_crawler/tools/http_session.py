@@ -0,0 +1,33 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 10))
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/90.0.4430.85 Safari/537.36",
+    "Accept-Language": "es-ES,es;q=0.9"
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Devuelve una sesión de requests compartida por el proceso, con un pool de conexiones
+    keep-alive por host, para no abrir una conexión TCP/TLS nueva en cada petición.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _session = session
+        return _session
@@ -0,0 +1,127 @@
+import os
+import time
+import sqlite3
+import threading
+
+MANIFEST_FILENAME = "index_manifest.sqlite3"
+
+
+class IndexManifest:
+    """
+    Manifiesto de la indexación incremental de PDFs, guardado en SQLite junto a la base vectorial.
+
+    Registra:
+      - files: cada PDF de la carpeta de origen (ruta, convocatoria, sha256, tamaño y mtime),
+        para saber sin volver a calcular el hash qué ficheros no han cambiado.
+      - blobs: cada contenido indexado, con la versión del extractor y la fecha de indexación.
+      - chunks: los ids de los fragmentos de la base vectorial de cada contenido.
+
+    Con esta información process_pdfs_to_shared_db calcula en una pasada qué hay que añadir,
+    actualizar y borrar.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                convocatoria_id TEXT NOT NULL,
+                blob_sha TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                blob_sha TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                extractor_version TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT NOT NULL,
+                blob_sha TEXT NOT NULL,
+                PRIMARY KEY (blob_sha, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_chunk_id ON chunks (chunk_id);
+            """
+        )
+        self._conn.commit()
+
+    def files(self) -> dict:
+        """Devuelve {ruta: (convocatoria_id, blob_sha, size, mtime)} de los PDFs registrados."""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, convocatoria_id, blob_sha, size, mtime FROM files").fetchall()
+        return {path: (convocatoria_id, blob_sha, size, mtime) for path, convocatoria_id, blob_sha, size, mtime in rows}
+
+    def blobs(self) -> dict:
+        """Devuelve {blob_sha: extractor_version} de los contenidos indexados."""
+        with self._lock:
+            rows = self._conn.execute("SELECT blob_sha, extractor_version FROM blobs").fetchall()
+        return dict(rows)
+
+    def chunk_ids(self, blob_sha: str) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT chunk_id FROM chunks WHERE blob_sha = ?", (blob_sha,)).fetchall()
+        return [chunk_id for chunk_id, in rows]
+
+    def set_files(self, files: dict):
+        """Sustituye el registro de ficheros por `files` ({ruta: (convocatoria_id, blob_sha, size, mtime)})."""
+        with self._lock:
+            self._conn.execute("DELETE FROM files")
+            self._conn.executemany(
+                "INSERT INTO files (path, convocatoria_id, blob_sha, size, mtime) VALUES (?, ?, ?, ?, ?)",
+                [(path, *entry) for path, entry in files.items()]
+            )
+            self._conn.commit()
+
+    def record_blob(self, blob_sha: str, doc_id: str, extractor_version: str, chunk_ids):
+        """Registra un contenido recién indexado y los ids de sus fragmentos."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blobs (blob_sha, doc_id, extractor_version, indexed_at) VALUES (?, ?, ?, ?)",
+                (blob_sha, doc_id, extractor_version, time.time())
+            )
+            self._conn.execute("DELETE FROM chunks WHERE blob_sha = ?", (blob_sha,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunks (chunk_id, blob_sha) VALUES (?, ?)",
+                [(chunk_id, blob_sha) for chunk_id in chunk_ids]
+            )
+            self._conn.commit()
+
+    def remove_blob(self, blob_sha: str) -> list:
+        """
+        Elimina un contenido del manifiesto.
+
+        Returns:
+            list: Ids de sus fragmentos que no comparte con ningún otro contenido indexado,
+            es decir, los que hay que borrar de la base vectorial.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT chunk_id FROM chunks AS c
+                WHERE c.blob_sha = ?
+                  AND NOT EXISTS (SELECT 1 FROM chunks AS o WHERE o.chunk_id = c.chunk_id AND o.blob_sha != c.blob_sha)
+                """,
+                (blob_sha,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM chunks WHERE blob_sha = ?", (blob_sha,))
+            self._conn.execute("DELETE FROM blobs WHERE blob_sha = ?", (blob_sha,))
+            self._conn.commit()
+        return [chunk_id for chunk_id, in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def manifest_path(db_dir: str) -> str:
+    return os.path.join(db_dir, MANIFEST_FILENAME)
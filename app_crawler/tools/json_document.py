@@ -0,0 +1,92 @@
+import os
+import json
+import threading
+
+
+class JsonDocument:
+    """
+    Documento JSON mantenido en memoria y protegido por un lock, para que varias
+    herramientas puedan modificarlo a la vez sin releer ni reescribir el fichero en
+    cada cambio. Los cambios se vuelcan a disco de forma atómica con flush().
+    """
+
+    def __init__(self, path: str, data: dict = None):
+        self.path = path
+        self.data = data if data is not None else {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "JsonDocument":
+        """Carga el documento desde disco, o crea uno vacío si el fichero no existe."""
+        if not os.path.exists(path):
+            return cls(path)
+
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(path, json.load(f))
+
+    def set_field(self, field_name: str, value):
+        with self._lock:
+            self.data[field_name] = value
+
+    def add_refs(self, field_name_ref: str, id_doc: str, fragments: list):
+        with self._lock:
+            refs = self.data.setdefault(field_name_ref, [])
+            for fragment in fragments:
+                refs.append({
+                    "id": id_doc,
+                    "fragment": fragment
+                })
+
+    def get(self, field_name: str, default=None):
+        with self._lock:
+            return self.data.get(field_name, default)
+
+    def has_value(self, field_name: str) -> bool:
+        """Indica si el campo existe y no está vacío."""
+        with self._lock:
+            return field_name in self.data and self.data[field_name] not in [None, "", []]
+
+    def flush(self):
+        """Escribe el documento en un fichero temporal y lo renombra sobre el definitivo."""
+        with self._lock:
+            contenido = json.dumps(self.data, indent=4, ensure_ascii=False)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        os.replace(tmp_path, self.path)
+
+
+_open_documents = {}
+_open_documents_lock = threading.Lock()
+
+
+def open_document(path: str) -> JsonDocument:
+    """
+    Abre un documento en memoria y lo registra por su ruta, de modo que las herramientas
+    que reciban esa ruta trabajen sobre él en lugar de sobre el fichero.
+    """
+    key = os.path.abspath(path)
+    with _open_documents_lock:
+        if key not in _open_documents:
+            _open_documents[key] = JsonDocument.load(path)
+        return _open_documents[key]
+
+
+def get_open_document(path: str):
+    """Devuelve el documento abierto para `path`, o None si no hay ninguno."""
+    with _open_documents_lock:
+        return _open_documents.get(os.path.abspath(path))
+
+
+def close_document(path: str, flush: bool = True):
+    """Deja de registrar el documento y, por defecto, lo vuelca a disco."""
+    with _open_documents_lock:
+        document = _open_documents.pop(os.path.abspath(path), None)
+
+    if document is not None and flush:
+        document.flush()
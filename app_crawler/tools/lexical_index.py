@@ -0,0 +1,256 @@
+import os
+import re
+import math
+import sqlite3
+import weakref
+import threading
+import unicodedata
+from collections import Counter
+
+LEXICAL_INDEX_FILENAME = "lexical_index.sqlite3"
+BM25_K1 = float(os.getenv("BM25_K1", 1.2))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+# Fechas (12/03/2024, 1-1-25) y cantidades se normalizan a tokens propios para que una
+# consulta sobre plazos o importes encuentre los fragmentos que los contienen literalmente.
+TOKEN_RE = re.compile(r"<fecha>|\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d+(?:[.,]\d+)*|[€%]|\w+")
+DATE_RE = re.compile(r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}$")
+SYNONYMS = {"euros": "€", "euro": "€", "eur": "€", "porcentaje": "%"}
+STOPWORDS = {
+    "a", "al", "como", "con", "cual", "cuales", "de", "del", "el", "en", "es", "esta", "este",
+    "hay", "la", "las", "lo", "los", "o", "para", "por", "que", "se", "si", "su", "sus", "un",
+    "una", "y"
+}
+
+
+def _sin_acentos(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list:
+    """
+    Tokens de un texto para el índice léxico: en minúsculas y sin acentos, sin palabras
+    vacías, con las fechas como `<fecha>` y "euros"/"€" y "porcentaje"/"%" unificados.
+    """
+    tokens = []
+    for token in TOKEN_RE.findall(_sin_acentos(text.lower())):
+        if token == "<fecha>" or DATE_RE.match(token):
+            tokens.append("<fecha>")
+        elif token not in STOPWORDS:
+            tokens.append(SYNONYMS.get(token, token))
+    return tokens
+
+
+class LexicalIndex:
+    """
+    Índice invertido BM25 de los fragmentos de una base vectorial, en SQLite junto a ella.
+
+    Se mantiene a la vez que la colección de Chroma (mismos ids de fragmento) y permite
+    buscar por coincidencia literal de términos, importes, porcentajes y fechas, que la
+    búsqueda por embeddings a veces no prioriza.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._readers = weakref.WeakKeyDictionary()
+        self._readers_lock = threading.Lock()
+        self._invalidate_stats()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+        columnas = [row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")]
+        if columnas and "tipo" not in columnas:
+            # Índices anteriores a guardar el tipo: se vacían y ensure_lexical_index los
+            # reconstruye desde Chroma en la siguiente indexación.
+            self._conn.executescript("DROP TABLE chunks; DROP TABLE IF EXISTS postings;")
+
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                length INTEGER NOT NULL,
+                tipo TEXT
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_postings_chunk_id ON postings (chunk_id);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, ids: list, texts: list, tipos: list = None):
+        """Añade (o sustituye) los fragmentos `ids` con sus textos y su tipo ('texto' o 'tabla')."""
+        tipos = tipos or [None] * len(ids)
+        with self._lock:
+            self._invalidate_stats()
+            self._delete(ids)
+            for chunk_id, text, tipo in zip(ids, texts, tipos):
+                tokens = Counter(tokenize(text))
+                self._conn.execute(
+                    "INSERT INTO chunks (chunk_id, length, tipo) VALUES (?, ?, ?)",
+                    (chunk_id, sum(tokens.values()), tipo)
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)",
+                    [(term, chunk_id, tf) for term, tf in tokens.items()]
+                )
+            self._conn.commit()
+
+    def delete(self, ids: list):
+        with self._lock:
+            self._invalidate_stats()
+            self._delete(ids)
+            self._conn.commit()
+
+    def _delete(self, ids: list):
+        for start in range(0, len(ids), 500):
+            chunk = list(ids[start:start + 500])
+            placeholders = ",".join("?" * len(chunk))
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", chunk)
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", chunk)
+
+    def _invalidate_stats(self):
+        self._corpus = None
+        self._df = {}
+
+    def _reader(self) -> sqlite3.Connection:
+        # Una conexión de lectura por hilo: en modo WAL las búsquedas de varios workers de
+        # refinamiento no se esperan entre sí ni a la conexión de escritura. Se indexan por
+        # el objeto del hilo con referencias débiles, así que la conexión se cierra cuando el
+        # hilo termina y se libera (p. ej. al cerrar el pool de cada documento).
+        thread = threading.current_thread()
+        with self._readers_lock:
+            conn = self._readers.get(thread)
+            if conn is None:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._readers[thread] = conn
+        return conn
+
+    def _stats(self, terms: list):
+        """
+        Número de fragmentos, longitud media y frecuencia documental de `terms`. Se calculan
+        una vez y se guardan en memoria hasta la siguiente escritura en el índice.
+        """
+        with self._lock:
+            if self._corpus is None:
+                self._corpus = self._conn.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            missing = [term for term in terms if term not in self._df]
+            if missing:
+                placeholders = ",".join("?" * len(missing))
+                df = dict(self._conn.execute(
+                    f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", missing
+                ).fetchall())
+                for term in missing:
+                    self._df[term] = df.get(term, 0)
+            total, avgdl = self._corpus
+            return total, avgdl, {term: self._df[term] for term in terms}
+
+    def search(self, query: str, n_results: int, allowed_ids=None, tablas: bool = None) -> list:
+        """
+        Busca los fragmentos con mayor puntuación BM25 para `query`.
+
+        Las estadísticas del corpus (ver _stats) son las de todo el índice, pero los filtros
+        por `allowed_ids` y por tipo se aplican en la consulta a SQLite, de modo que solo se
+        leen las entradas de los fragmentos que pueden devolverse.
+
+        Args:
+            query (str): Texto de la consulta.
+            n_results (int): Número máximo de resultados.
+            allowed_ids (set, optional): Si se indica, solo se devuelven fragmentos de este conjunto.
+            tablas (bool, optional): True para buscar solo tablas, False para excluirlas y
+                None para no filtrar por tipo (como tipo_filter en vectorial_db_tools).
+
+        Returns:
+            list: Pares (chunk_id, puntuación) ordenados de mayor a menor puntuación.
+        """
+        terms = Counter(tokenize(query))
+        if not terms or (allowed_ids is not None and not allowed_ids):
+            return []
+
+        total, avgdl, df = self._stats(list(terms))
+        if not total:
+            return []
+
+        terms = {term: count for term, count in terms.items() if df[term]}
+        if not terms:
+            return []
+
+        term_placeholders = ",".join("?" * len(terms))
+        sql = f"""
+            SELECT p.term, p.chunk_id, p.tf, c.length FROM postings AS p
+            JOIN chunks AS c ON c.chunk_id = p.chunk_id
+            WHERE p.term IN ({term_placeholders})
+            """
+        if tablas is not None:
+            sql += " AND c.tipo = 'tabla'" if tablas else " AND c.tipo IS NOT 'tabla'"
+        conn = self._reader()
+        if allowed_ids is None:
+            rows = conn.execute(sql, list(terms)).fetchall()
+        else:
+            ids = list(allowed_ids)
+            rows = []
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows += conn.execute(
+                    f"{sql} AND p.chunk_id IN ({','.join('?' * len(chunk))})", list(terms) + chunk
+                ).fetchall()
+
+        scores = Counter()
+        for term, chunk_id, tf, length in rows:
+            idf = math.log(1 + (total - df[term] + 0.5) / (df[term] + 0.5))
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / (avgdl or 1))
+            scores[chunk_id] += terms[term] * idf * tf * (BM25_K1 + 1) / norm
+
+        return scores.most_common(n_results)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        with self._readers_lock:
+            for conn in list(self._readers.values()):
+                conn.close()
+            self._readers.clear()
+        with self._lock:
+            self._conn.close()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def lexical_index_path(vectorstore_path: str) -> str:
+    return os.path.join(vectorstore_path, LEXICAL_INDEX_FILENAME)
+
+
+def get_lexical_index(vectorstore_path: str, create: bool = True):
+    """
+    Devuelve el índice léxico compartido de la base vectorial `vectorstore_path`. Con
+    `create=False` devuelve None si la base todavía no tiene índice léxico.
+    """
+    path = os.path.abspath(lexical_index_path(vectorstore_path))
+    with _indexes_lock:
+        if path not in _indexes:
+            if not create and not os.path.exists(path):
+                return None
+            _indexes[path] = LexicalIndex(path)
+        return _indexes[path]
+
+
+def invalidate_lexical_index(vectorstore_path: str):
+    path = os.path.abspath(lexical_index_path(vectorstore_path))
+    with _indexes_lock:
+        index = _indexes.pop(path, None)
+    if index is not None:
+        index.close()
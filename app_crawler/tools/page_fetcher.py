@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import time
+import atexit
+import threading
+from urllib.parse import urlparse
+from bs4 import BeautifulSoup
+from app_crawler.tools.http_session import get_http_session
+from app_crawler.tools.browser_pool import get_browser_pool, esperar_pagina_lista
+
+FETCH_MODE = os.getenv("FETCH_MODE", "auto")
+FETCH_STATS_PATH = os.getenv("FETCH_STATS_PATH", "data/fetch_stats.json")
+
+MIN_VISIBLE_TEXT = 500
+RENDER_ONLY_AFTER = 3
+FETCH_STATS_SAVE_INTERVAL = 60
+
+CHARSET_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+SPA_MARKERS = [
+    '<div id="root"></div>',
+    '<div id="app"></div>',
+    '<app-root></app-root>',
+    'ng-app',
+    'data-reactroot',
+    'window.__NUXT__',
+    'enable javascript',
+    'habilite javascript',
+    'activar javascript',
+]
+
+
+def texto_visible(html: str) -> str:
+    """Devuelve el texto visible de un HTML, sin scripts, estilos ni plantillas."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(['script', 'style', 'noscript', 'template', 'head']):
+        tag.decompose()
+    return ' '.join(soup.get_text(separator=' ').split())
+
+
+def parece_shell_js(html: str, min_visible_text: int = MIN_VISIBLE_TEXT) -> bool:
+    """
+    Heurística para decidir si un HTML obtenido por HTTP es una cáscara vacía que necesita
+    ejecutar JavaScript para mostrar el contenido.
+
+    Args:
+        html (str): HTML devuelto por el servidor.
+        min_visible_text (int): Longitud mínima de texto visible para considerarlo renderizado.
+
+    Returns:
+        bool: True si hace falta renderizar la página con el navegador.
+    """
+    if not html:
+        return True
+
+    visible = len(texto_visible(html))
+    if visible < min_visible_text:
+        return True
+
+    html_lower = html.lower()
+    return visible < min_visible_text * 4 and any(marker in html_lower for marker in SPA_MARKERS)
+
+
+class FetchStats:
+    """
+    Estadísticas persistidas por dominio de qué camino se ha usado para obtener las páginas
+    ('http' o 'render'), para saltarse la prueba HTTP en dominios que siempre necesitan navegador.
+
+    record() solo actualiza la memoria: el fichero se reescribe como mucho una vez cada
+    `save_interval` segundos y al terminar el proceso (flush), fuera del lock de los contadores,
+    para que los hilos del crawler no se esperen entre sí por la escritura en disco.
+    """
+
+    def __init__(self, path: str = FETCH_STATS_PATH, save_interval: float = FETCH_STATS_SAVE_INTERVAL):
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._stats = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._stats = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"No se pudieron leer las estadísticas de {path}: {e}")
+
+    def record(self, domain: str, path_taken: str):
+        with self._lock:
+            entry = self._stats.setdefault(domain, {"http": 0, "render": 0})
+            entry[path_taken] = entry.get(path_taken, 0) + 1
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= self.save_interval
+
+        if due:
+            self.flush(wait=False)
+
+    def needs_render(self, domain: str) -> bool:
+        with self._lock:
+            entry = self._stats.get(domain, {})
+        return entry.get("http", 0) == 0 and entry.get("render", 0) >= RENDER_ONLY_AFTER
+
+    def get(self, domain: str) -> dict:
+        with self._lock:
+            return dict(self._stats.get(domain, {"http": 0, "render": 0}))
+
+    def flush(self, wait: bool = True):
+        """
+        Escribe las estadísticas en disco si han cambiado desde la última escritura. Con
+        `wait=False` no hace nada si otro hilo ya está escribiendo.
+        """
+        if not self._save_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = {domain: dict(entry) for domain, entry in self._stats.items()}
+                self._dirty = False
+                self._last_save = time.monotonic()
+
+            try:
+                self._save(snapshot)
+            except OSError as e:
+                print(f"No se pudieron guardar las estadísticas en {self.path}: {e}")
+                with self._lock:
+                    self._dirty = True
+        finally:
+            self._save_lock.release()
+
+    def _save(self, stats: dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_fetch_stats() -> FetchStats:
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = FetchStats()
+            atexit.register(_stats.flush)
+        return _stats
+
+
+def html_charset(content: bytes, content_type: str):
+    """
+    Codificación declarada de un HTML: la de la cabecera Content-Type o, si no la indica, la
+    del `<meta charset>` / `<meta http-equiv="Content-Type">` del propio documento.
+
+    Returns:
+        str | None: El nombre de la codificación, o None si no se declara.
+    """
+    match = CHARSET_RE.search(content_type or "")
+    if match:
+        return match.group(1)
+    match = META_CHARSET_RE.search(content[:4096])
+    if match:
+        return match.group(1).decode("ascii")
+    return None
+
+
+def decode_html(content: bytes, charset: str) -> str:
+    try:
+        return content.decode(charset, errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+
+def fetch_http(url: str, timeout: int = 20):
+    """
+    Obtiene el HTML con un GET simple usando la sesión HTTP compartida.
+
+    El cuerpo se decodifica con la codificación declarada (html_charset) o, si no hay, con la
+    detectada por requests: con `response.text` una página UTF-8 servida como `text/html`
+    sin charset se leería como ISO-8859-1.
+
+    Returns:
+        str | None: El HTML si la respuesta es una página HTML válida, None en caso contrario.
+    """
+    try:
+        response = get_http_session().get(url, timeout=timeout)
+    except Exception as e:
+        print(f"Error en GET HTTP de {url}: {e}")
+        return None
+
+    content_type = response.headers.get('Content-Type', '')
+    if response.status_code != 200 or 'html' not in content_type:
+        print(f"GET HTTP no válido para {url}. Status: {response.status_code}, Content-Type: {content_type}")
+        return None
+
+    charset = html_charset(response.content, content_type) or response.apparent_encoding or "utf-8"
+    return decode_html(response.content, charset)
+
+
+def fetch_rendered(url: str) -> str:
+    """Obtiene el HTML renderizado con un navegador del pool."""
+    with get_browser_pool().driver() as driver:
+        driver.get(url)
+        esperar_pagina_lista(driver)
+        return driver.page_source
+
+
+def fetch_html(url: str, mode: str = None) -> str:
+    """
+    Obtiene el HTML de una página intentando primero un GET HTTP y renderizando con Selenium
+    solo cuando el resultado parece una cáscara JavaScript vacía.
+
+    Args:
+        url (str): La URL de la página.
+        mode (str): 'auto' (HTTP primero), 'http' (solo HTTP) o 'render' (siempre navegador).
+                    Por defecto se usa la variable de entorno FETCH_MODE.
+
+    Returns:
+        str: El HTML de la página.
+    """
+    mode = mode or FETCH_MODE
+    domain = urlparse(url).netloc
+    stats = get_fetch_stats()
+
+    if mode == "render":
+        return fetch_rendered(url)
+
+    if mode == "auto" and stats.needs_render(domain):
+        html = fetch_rendered(url)
+        stats.record(domain, "render")
+        return html
+
+    html = fetch_http(url)
+
+    if mode == "http":
+        if html is None:
+            raise RuntimeError(f"No se pudo obtener {url} por HTTP.")
+        return html
+
+    if html is not None and not parece_shell_js(html):
+        stats.record(domain, "http")
+        return html
+
+    print(f"La página {url} necesita renderizado, usando Selenium.")
+    html = fetch_rendered(url)
+    stats.record(domain, "render")
+    return html
@@ -0,0 +1,108 @@
+import os
+import time
+import threading
+from urllib.parse import urlsplit
+from app_crawler.tools.http_session import get_http_session
+
+PDF_DOWNLOAD_MAX_BYTES = int(os.getenv("PDF_DOWNLOAD_MAX_BYTES", 100 * 1024 * 1024))
+PDF_DOWNLOAD_PER_HOST = int(os.getenv("PDF_DOWNLOAD_PER_HOST", 4))
+PDF_DOWNLOAD_WORKERS = int(os.getenv("PDF_DOWNLOAD_WORKERS", 32))
+PDF_DOWNLOAD_TIMEOUT = int(os.getenv("PDF_DOWNLOAD_TIMEOUT", 30))
+PDF_DOWNLOAD_RETRIES = int(os.getenv("PDF_DOWNLOAD_RETRIES", 3))
+CHUNK_SIZE = 64 * 1024
+
+DOWNLOADED = "downloaded"
+NOT_MODIFIED = "not_modified"
+FAILED = "failed"
+
+
+class DownloadTooLarge(Exception):
+    pass
+
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def get_host_semaphore(url: str) -> threading.Semaphore:
+    """Semáforo que limita las descargas simultáneas contra un mismo host."""
+    host = urlsplit(url).netloc.lower()
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(PDF_DOWNLOAD_PER_HOST)
+        return _host_semaphores[host]
+
+
+def conditional_headers(validators: dict) -> dict:
+    """Cabeceras If-None-Match / If-Modified-Since a partir del ETag y Last-Modified guardados."""
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _stream_to_file(response, ruta_destino: str, max_bytes: int):
+    content_length = response.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise DownloadTooLarge(f"Content-Length {content_length} supera el máximo de {max_bytes} bytes")
+
+    tmp_path = f"{ruta_destino}.{threading.get_ident()}.part"
+    escritos = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            for block in response.iter_content(chunk_size=CHUNK_SIZE):
+                escritos += len(block)
+                if escritos > max_bytes:
+                    raise DownloadTooLarge(f"La descarga supera el máximo de {max_bytes} bytes")
+                f.write(block)
+        os.replace(tmp_path, ruta_destino)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def descargar_pdf(url, ruta_destino, validators: dict = None, max_bytes: int = PDF_DOWNLOAD_MAX_BYTES,
+                  max_retries: int = PDF_DOWNLOAD_RETRIES) -> dict:
+    """
+    Descarga un PDF en streaming con la sesión HTTP compartida, escribiendo en un fichero
+    temporal que se renombra de forma atómica al terminar.
+
+    Si se pasan `validators` ({"etag", "last_modified"} de una descarga anterior) la petición
+    es condicional y un 304 no descarga nada. Las descargas contra un mismo host se limitan
+    con PDF_DOWNLOAD_PER_HOST y las que superan `max_bytes` se abortan.
+
+    Returns:
+        dict: {"status": downloaded | not_modified | failed, "etag", "last_modified"}
+    """
+    for intento in range(1, max_retries + 1):
+        try:
+            with get_host_semaphore(url):
+                with get_http_session().get(url, headers=conditional_headers(validators),
+                                            timeout=PDF_DOWNLOAD_TIMEOUT, stream=True) as response:
+                    if response.status_code == 304:
+                        return {"status": NOT_MODIFIED, **(validators or {})}
+
+                    content_type = response.headers.get('Content-Type', '')
+                    if response.status_code != 200 or 'application/pdf' not in content_type:
+                        raise Exception(f"Respuesta inesperada. Status: {response.status_code}, Content-Type: {content_type}")
+
+                    _stream_to_file(response, ruta_destino, max_bytes)
+                    print(f"✅ Descarga completada y guardada en: {ruta_destino}")
+                    return {
+                        "status": DOWNLOADED,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+        except DownloadTooLarge as e:
+            print(f"Se omite {url}: {e}")
+            break
+        except Exception as e:
+            print(f"Error al descargar {url} (intento {intento}/{max_retries}): {e}")
+            if intento < max_retries:
+                time.sleep(2 ** (intento - 1))
+    else:
+        print(f"Fallo definitivo al descargar {url}. Se omite este archivo.")
+
+    return {"status": FAILED}
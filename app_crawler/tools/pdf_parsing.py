@@ -0,0 +1,279 @@
+import os
+import atexit
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pdfplumber
+from app_crawler.tools.extraction_cache import get_extraction_cache, file_sha256
+
+# Forma parte de la clave de la caché de extracción: cambiarla invalida lo ya extraído.
+EXTRACTOR_VERSION = f"pdfplumber-{pdfplumber.__version__}-1"
+
+
+# La configuración se lee al parsear y no al importar el módulo, que puede cargarse antes de
+# que load_dotenv() haya leído el .env.
+def get_parse_workers() -> int:
+    return int(os.getenv("PDF_PARSE_WORKERS", os.cpu_count() or 1))
+
+
+def get_pages_per_task() -> int:
+    return int(os.getenv("PDF_PAGES_PER_TASK", 8))
+
+
+def table_precheck_enabled() -> bool:
+    return os.getenv("PDF_TABLE_PRECHECK", "TRUE").upper() == "TRUE"
+
+
+def extraction_cache_enabled() -> bool:
+    return os.getenv("PDF_EXTRACTION_CACHE", "TRUE").upper() == "TRUE"
+
+
+def may_contain_table(page) -> bool:
+    """
+    Comprobación barata de si una página puede tener tablas según extract_tables().
+
+    Con la estrategia por defecto ("lines") cada celda se delimita con dos aristas
+    horizontales y dos verticales distintas, sacadas de las líneas, rectángulos y curvas de
+    la página. Si no hay al menos dos de cada orientación no puede salir ninguna tabla, y la
+    página se puede saltar sin cambiar el resultado.
+    """
+    horizontales = 0
+    verticales = 0
+    for edge in page.edges:
+        if edge["orientation"] == "h":
+            horizontales += 1
+        else:
+            verticales += 1
+        if horizontales >= 2 and verticales >= 2:
+            return True
+    return False
+
+
+def extract_page_chunks(page, table_precheck: bool = None) -> list:
+    """
+    Devuelve los fragmentos {content, tipo} (texto y tablas) de una página de pdfplumber.
+    Sin `table_precheck` se usa PDF_TABLE_PRECHECK.
+    """
+    if table_precheck is None:
+        table_precheck = table_precheck_enabled()
+    page_chunks = []
+
+    text = page.extract_text()
+    if text:
+        page_chunks.append({"content": text, "tipo": "texto"})
+
+    if table_precheck and not may_contain_table(page):
+        return page_chunks
+
+    tables = page.extract_tables()
+    for table in tables:
+        table_string = "\n".join([" | ".join([str(cell) if cell is not None else "" for cell in row]) for row in table if row])
+        page_chunks.append({"content": table_string, "tipo": "tabla"})
+
+    return page_chunks
+
+
+def parse_page_range(pdf_path: str, start: int, end: int, table_precheck: bool = None) -> list:
+    """
+    Extrae las páginas [start, end) de un PDF. Es la unidad de trabajo que se envía a los
+    procesos del pool, así que abre el PDF por su cuenta.
+    """
+    if table_precheck is None:
+        table_precheck = table_precheck_enabled()
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:end]:
+            results.append(extract_page_chunks(page, table_precheck))
+            page.close()
+    return results
+
+
+def count_pages(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Devuelve el pool de procesos de parseo compartido, recreándolo si cambia el número de
+    workers. Se usa "spawn" para no heredar por fork los hilos del proceso principal.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+atexit.register(shutdown_parse_pool)
+
+
+def iter_pdfs_pages(
+    pdf_paths: list,
+    workers: int = None,
+    pages_per_task: int = None,
+    table_precheck: bool = None,
+    use_cache: bool = None
+):
+    """
+    Genera (pdf_path, número de página, fragmentos de la página) para todas las páginas de
+    `pdf_paths`, en orden de fichero y de página.
+
+    Si `use_cache` está activo, los PDFs cuyo contenido ya se extrajo con EXTRACTOR_VERSION se
+    leen de la caché de extracción sin parsearlos, y los demás se guardan en ella al acabar.
+
+    Con más de un worker, los PDFs se trocean en rangos de `pages_per_task` páginas que se
+    reparten entre un pool de procesos. Solo se adelantan `workers * 2` rangos, de modo que
+    la memoria sigue acotada aunque la lista de PDFs sea larga.
+
+    Los parámetros que no se indican se leen del entorno en cada llamada (PDF_PARSE_WORKERS,
+    PDF_PAGES_PER_TASK, PDF_TABLE_PRECHECK y PDF_EXTRACTION_CACHE).
+    """
+    workers = get_parse_workers() if workers is None else workers
+    pages_per_task = get_pages_per_task() if pages_per_task is None else pages_per_task
+    table_precheck = table_precheck_enabled() if table_precheck is None else table_precheck
+    use_cache = extraction_cache_enabled() if use_cache is None else use_cache
+
+    cache = get_extraction_cache() if use_cache else None
+
+    def lookup(pdf_path):
+        if cache is None:
+            return None, None
+        sha256 = file_sha256(pdf_path)
+        return sha256, cache.get(sha256, EXTRACTOR_VERSION)
+
+    if workers <= 1:
+        for pdf_path in pdf_paths:
+            sha256, cached = lookup(pdf_path)
+            if cached is not None:
+                for page_number, page_chunks in enumerate(cached):
+                    yield pdf_path, page_number, page_chunks
+                continue
+
+            pages = []
+            for page_number, page_chunks in enumerate(parse_pages_sequential(pdf_path, table_precheck)):
+                pages.append(page_chunks)
+                yield pdf_path, page_number, page_chunks
+
+            if cache is not None:
+                cache.put(sha256, EXTRACTOR_VERSION, pages)
+        return
+
+    def tasks():
+        # (pdf_path, sha256, primera página, última página, total de páginas, páginas cacheadas)
+        for pdf_path in pdf_paths:
+            sha256, cached = lookup(pdf_path)
+            if cached is not None:
+                yield pdf_path, sha256, 0, len(cached), len(cached), cached
+                continue
+
+            total = count_pages(pdf_path)
+            for start in range(0, total, pages_per_task):
+                yield pdf_path, sha256, start, min(start + pages_per_task, total), total, None
+
+    pool = get_parse_pool(workers)
+    pending = deque()
+    task_iter = tasks()
+
+    def submit_next() -> bool:
+        task = next(task_iter, None)
+        if task is None:
+            return False
+        pdf_path, _, start, end, _, cached = task
+        result = cached if cached is not None else pool.submit(parse_page_range, pdf_path, start, end, table_precheck)
+        pending.append((task, result))
+        return True
+
+    for _ in range(workers * 2):
+        if not submit_next():
+            break
+
+    parsed_pages = []
+    try:
+        while pending:
+            (pdf_path, sha256, start, end, total, cached), result = pending.popleft()
+            pages = cached if cached is not None else result.result()
+            submit_next()
+
+            if cached is None and cache is not None:
+                if start == 0:
+                    parsed_pages = []
+                parsed_pages.extend(pages)
+                if end == total:
+                    cache.put(sha256, EXTRACTOR_VERSION, parsed_pages)
+                    parsed_pages = []
+
+            for offset, page_chunks in enumerate(pages):
+                yield pdf_path, start + offset, page_chunks
+    finally:
+        for _, result in pending:
+            if hasattr(result, "cancel"):
+                result.cancel()
+
+
+def parse_pages_sequential(pdf_path: str, table_precheck: bool = None):
+    """Recorre un PDF página a página en el proceso actual, liberando cada página al acabar."""
+    if table_precheck is None:
+        table_precheck = table_precheck_enabled()
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            page_chunks = extract_page_chunks(page, table_precheck)
+            page.close()
+            yield page_chunks
+
+
+def iter_pdf_pages(pdf_path: str, workers: int = None):
+    """
+    Recorre un PDF página a página y genera, para cada una, la lista de fragmentos
+    {content: str, tipo: 'texto' o 'tabla'} que contiene, consultando antes la caché de
+    extracción.
+    """
+    for _, _, page_chunks in iter_pdfs_pages([pdf_path], workers=workers):
+        yield page_chunks
+
+
+def extract_text_and_tables(pdf_path: str, workers: int = None) -> list:
+    """
+    Extrae texto y tablas de un PDF.
+    Retorna una lista de diccionarios {content: str, tipo: 'texto' o 'tabla'}.
+    """
+    return [chunk for page_chunks in iter_pdf_pages(pdf_path, workers=workers) for chunk in page_chunks]
+
+
+def first_pages(pdf_path: str, n_pages: int) -> list:
+    """
+    Devuelve los fragmentos de las primeras `n_pages` páginas de un PDF, extraídas igual que
+    para la indexación. Si el PDF completo ya está en la caché de extracción se toman de ahí;
+    si no, se parsean solo esas páginas y se guardan en la caché con una versión propia
+    (EXTRACTOR_VERSION + número de páginas), para no confundirlas con el PDF completo.
+    """
+    cache = get_extraction_cache()
+    sha256 = file_sha256(pdf_path)
+
+    pages = cache.get(sha256, EXTRACTOR_VERSION)
+    if pages is not None:
+        return pages[:n_pages]
+
+    version = f"{EXTRACTOR_VERSION}-first{n_pages}"
+    pages = cache.get(sha256, version)
+    if pages is None:
+        pages = parse_page_range(pdf_path, 0, min(n_pages, count_pages(pdf_path)))
+        cache.put(sha256, version, pages)
+    return pages
@@ -0,0 +1,171 @@
+import os
+import json
+import shutil
+import threading
+from app_crawler.tools.extraction_cache import file_sha256
+
+PDF_REVALIDATE = os.getenv("PDF_REVALIDATE", "TRUE").upper() == "TRUE"
+
+
+class PdfStore:
+    """
+    Almacén de PDFs direccionado por contenido.
+
+    Cada PDF distinto se guarda una sola vez en `<blob_dir>/<sha[:2]>/<sha256>.pdf`, y un
+    índice url -> {sha256, etag, last_modified} (`<blob_dir>/index.json`) evita descargar dos
+    veces la misma URL: en cada ejecución la primera consulta de una URL conocida es una
+    petición condicional, y las siguientes se sirven directamente del índice.
+    Las rutas por convocatoria (data/pdf/<id>/<id>_bases.pdf) son enlaces al blob, así que
+    varias líneas de un mismo programa comparten la misma orden de bases en disco.
+    """
+
+    def __init__(self, blob_dir: str):
+        self.blob_dir = blob_dir
+        self.index_path = os.path.join(blob_dir, "index.json")
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._checked = set()
+        self._index = {}
+
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+                # Índices antiguos: url -> sha256
+                self._index = {url: entry if isinstance(entry, dict) else {"sha256": entry}
+                               for url, entry in self._index.items()}
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"No se pudo leer el índice de PDFs {self.index_path}: {e}")
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256[:2], f"{sha256}.pdf")
+
+    def sha_for_url(self, url: str):
+        """Devuelve el sha256 del blob descargado para `url`, o None si no está en el almacén."""
+        with self._lock:
+            entry = self._index.get(url) or {}
+        sha256 = entry.get("sha256")
+        if sha256 and os.path.exists(self.blob_path(sha256)):
+            return sha256
+        return None
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def fetch(self, url: str, download_fn, revalidate: bool = PDF_REVALIDATE) -> str:
+        """
+        Devuelve el sha256 del PDF de `url`, descargándolo con
+        `download_fn(url, ruta, validators)` solo cuando hace falta. `download_fn` devuelve un
+        dict con `status` (downloaded, not_modified o failed) y el ETag/Last-Modified recibidos.
+
+        Si la URL ya está en el almacén y `revalidate` es True, la primera vez que se pide en
+        el proceso se hace una petición condicional; si el servidor responde 304 o falla, se
+        mantiene el blob existente. Si el contenido ya existía (otra URL con el mismo fichero)
+        se reutiliza el blob.
+
+        Returns:
+            str: sha256 del blob, o None si la descarga ha fallado y no había copia previa.
+        """
+        with self._url_lock(url):
+            sha256 = self.sha_for_url(url)
+            if sha256 and (not revalidate or url in self._checked):
+                return sha256
+
+            with self._lock:
+                validators = dict(self._index.get(url, {})) if sha256 else None
+
+            tmp_dir = os.path.join(self.blob_dir, "tmp")
+            os.makedirs(tmp_dir, exist_ok=True)
+            tmp_path = os.path.join(tmp_dir, f"{threading.get_ident()}.pdf")
+
+            try:
+                result = download_fn(url, tmp_path, validators) or {}
+                self._checked.add(url)
+                if result.get("status") != "downloaded" or not os.path.exists(tmp_path):
+                    return sha256
+                sha256 = self.add_file(tmp_path, move=True)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            with self._lock:
+                self._index[url] = {
+                    "sha256": sha256,
+                    "etag": result.get("etag"),
+                    "last_modified": result.get("last_modified"),
+                }
+                self._save_index()
+            return sha256
+
+    def adopt(self, url: str, path: str) -> str:
+        """
+        Incorpora al almacén un PDF descargado antes de existir el índice, sin volver a
+        descargarlo en esta ejecución. Como no hay ETag/Last-Modified, la siguiente ejecución
+        hará una descarga completa y guardará los validadores.
+        """
+        with self._url_lock(url):
+            sha256 = self.sha_for_url(url)
+            if sha256:
+                return sha256
+            sha256 = self.add_file(path)
+            with self._lock:
+                self._checked.add(url)
+                self._index[url] = {"sha256": sha256, "etag": None, "last_modified": None}
+                self._save_index()
+            return sha256
+
+    def add_file(self, path: str, move: bool = False) -> str:
+        """Incorpora un fichero al almacén y devuelve su sha256."""
+        sha256 = file_sha256(path)
+        destino = self.blob_path(sha256)
+
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            if move:
+                os.replace(path, destino)
+            else:
+                shutil.copyfile(path, destino)
+        return sha256
+
+    def link(self, sha256: str, dest_path: str):
+        """
+        Hace que `dest_path` apunte al blob `sha256` con un enlace duro, o con una copia si el
+        sistema de ficheros no admite enlaces.
+        """
+        origen = self.blob_path(sha256)
+        if os.path.exists(dest_path):
+            if os.path.samefile(origen, dest_path):
+                return
+            os.remove(dest_path)
+
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        try:
+            os.link(origen, dest_path)
+        except OSError:
+            shutil.copyfile(origen, dest_path)
+
+    def _save_index(self):
+        os.makedirs(self.blob_dir, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+
+def blob_dir_for(pdf_dir: str) -> str:
+    """Carpeta de blobs asociada a una carpeta de PDFs: data/pdf -> data/pdf_blobs."""
+    return f"{os.path.normpath(pdf_dir)}_blobs"
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_pdf_store(pdf_dir: str) -> PdfStore:
+    """Devuelve el almacén de blobs compartido para la carpeta de PDFs `pdf_dir`."""
+    blob_dir = os.path.abspath(blob_dir_for(pdf_dir))
+    with _stores_lock:
+        if blob_dir not in _stores:
+            _stores[blob_dir] = PdfStore(blob_dir)
+        return _stores[blob_dir]
@@ -0,0 +1,82 @@
+import queue
+import threading
+
+_FIN = object()
+
+
+class _Error:
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+def in_background(iterable, maxsize: int, name: str = "pipeline-stage"):
+    """
+    Consume `iterable` en un hilo aparte y devuelve sus elementos a través de una cola
+    acotada a `maxsize` elementos.
+
+    Sirve para encadenar las etapas de un pipeline: la etapa productora avanza mientras la
+    consumidora trabaja, pero nunca lleva más de `maxsize` elementos de ventaja, por lo que
+    la memoria no crece con el tamaño de la entrada. Las excepciones del productor se
+    relanzan en el consumidor, y si el consumidor deja de iterar el productor se detiene.
+    """
+    cola = queue.Queue(maxsize=maxsize)
+    parar = threading.Event()
+
+    def poner(item) -> bool:
+        while not parar.is_set():
+            try:
+                cola.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producir():
+        iterador = iter(iterable)
+        try:
+            for item in iterador:
+                if not poner(item):
+                    return
+        except BaseException as e:
+            poner(_Error(e))
+            return
+        finally:
+            # Cierra también las etapas anteriores si el consumidor ha parado antes de tiempo.
+            if hasattr(iterador, "close"):
+                iterador.close()
+        poner(_FIN)
+
+    hilo = threading.Thread(target=producir, name=name, daemon=True)
+    hilo.start()
+
+    try:
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                return
+            if isinstance(item, _Error):
+                raise item.exception
+            yield item
+    finally:
+        parar.set()
+        hilo.join()
+
+
+def token_batched(iterable, max_tokens: int, max_items: int, token_count):
+    """
+    Agrupa los elementos de `iterable` en listas cuyo coste estimado (`token_count(item)`)
+    no supera `max_tokens`, con como mucho `max_items` elementos. Un elemento que por sí
+    solo supera `max_tokens` sale en una lista propia.
+    """
+    batch = []
+    batch_tokens = 0
+    for item in iterable:
+        tokens = token_count(item)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
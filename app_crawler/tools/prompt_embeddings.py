@@ -0,0 +1,79 @@
+import os
+import json
+import threading
+
+class PromptEmbeddingRegistry:
+    """
+    Registro de embeddings de los prompts fijos de recuperación, calculados una única vez
+    por despliegue de embeddings y persistidos en `<directorio>/<despliegue>.json`.
+
+    Una vez cargado, obtener el embedding de un prompt es una búsqueda en memoria. Por
+    defecto el directorio se lee de PROMPT_EMBEDDINGS_DIR al crear el registro.
+    """
+
+    def __init__(self, deployment: str, directory: str = None):
+        if directory is None:
+            directory = os.getenv("PROMPT_EMBEDDINGS_DIR", "data/prompt_embeddings")
+        self.deployment = deployment
+        self.path = os.path.join(directory, f"{deployment}.json")
+        self._embeddings = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._embeddings = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"No se pudo leer el registro de embeddings {self.path}: {e}")
+
+    def get(self, prompt: str):
+        """Devuelve el embedding registrado del prompt, o None si no está."""
+        with self._lock:
+            return self._embeddings.get(prompt)
+
+    def ensure(self, prompts: list, embed_fn) -> int:
+        """
+        Se asegura de que todos los `prompts` estén registrados, calculando los que falten en
+        una única llamada a `embed_fn(lista_de_textos) -> lista_de_vectores` y persistiendo el
+        resultado.
+
+        Returns:
+            int: Número de prompts que se han tenido que calcular.
+        """
+        with self._lock:
+            missing = list(dict.fromkeys(p for p in prompts if p not in self._embeddings))
+
+        if not missing:
+            return 0
+
+        embeddings = embed_fn(missing)
+
+        with self._lock:
+            self._embeddings.update(zip(missing, embeddings))
+            self._save()
+
+        print(f"Registrados {len(missing)} embeddings de prompts para el despliegue {self.deployment}.")
+        return len(missing)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._embeddings)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._embeddings, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_prompt_registry(deployment: str) -> PromptEmbeddingRegistry:
+    """Devuelve el registro de embeddings de prompts del despliegue indicado."""
+    with _registries_lock:
+        if deployment not in _registries:
+            _registries[deployment] = PromptEmbeddingRegistry(deployment)
+        return _registries[deployment]
@@ -1,14 +1,14 @@
 import json
 import os
+import threading
 from bs4 import BeautifulSoup, NavigableString, Tag
-from selenium.webdriver.chrome.options import Options
 from smolagents import tool
-from selenium import webdriver
-from pypdf import PdfReader
-from app_crawler.tools.vectorial_db_tools import search_from_context_vec_db
+from app_crawler.tools.vectorial_db_tools import search_from_context_vec_db, search_many_from_context_vec_db, select_context, prepare_prompt_embeddings
+from app_crawler.tools.page_fetcher import fetch_html
+from app_crawler.tools.json_document import get_open_document
+from app_crawler.tools.pdf_parsing import first_pages
 from urllib.parse import urlparse, urljoin
 from typing import Dict
-import time
 
 @tool
 def leer_json(file_path: str) -> dict:
@@ -31,10 +31,11 @@ def leer_json(file_path: str) -> dict:
 @tool
 def leer_pdf(file_path: str) -> str:
     """
-    Esta herramienta utiliza PyPDF para extraer texto de un archivo PDF.
+    Esta herramienta utiliza pdfplumber para extraer el texto y las tablas de un archivo PDF.
 
     Lee las primeras páginas de un archivo PDF y devuelve el contenido textual concatenado,
-    permitiendo que el agente lo procese, analice o resuma según se requiera.
+    permitiendo que el agente lo procese, analice o resuma según se requiera. La extracción
+    es la misma que la de la indexación y se guarda en la caché de extracción.
 
     Args:
         file_path (str): La ruta local al archivo PDF que se va a leer.
@@ -42,11 +43,7 @@ def leer_pdf(file_path: str) -> str:
     Returns:
         str: El texto extraído del PDF, sin formato, para su posterior análisis.
     """
-    contenido = ""
-    reader = PdfReader(file_path)
-    for page in reader.pages[:3]:
-        contenido += page.extract_text()
-    return contenido
+    return "\n".join(chunk["content"] for page in first_pages(file_path, 3) for chunk in page)
 
 def simplificar_html(html: str, base_url: str) -> str:
     """
@@ -92,7 +89,9 @@ def simplificar_html(html: str, base_url: str) -> str:
 @tool
 def fetch_html_tool(url: str) -> str:
     """
-    Esta herramienta usa Selenium (headless) para obtener el HTML renderizado de una página protegida.
+    Esta herramienta obtiene el HTML de una página, primero con un GET HTTP y, si la página
+    necesita JavaScript para mostrar su contenido, con Selenium (headless) desde un pool
+    compartido de navegadores.
 
     Args:
         url (str): La URL de la página web que se va a obtener.
@@ -101,32 +100,21 @@ def fetch_html_tool(url: str) -> str:
         str: Una version simplificada del HTML con la informacion relevante de la pagina web.
     """
     try:
-        options = Options()
-        options.headless = True
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-blink-features=AutomationControlled")
+        html = fetch_html(url)
 
-        driver = webdriver.Chrome(options=options)
-        driver.set_page_load_timeout(20)
-        driver.get(url)
-
-        time.sleep(5)
-        html = driver.page_source
-        driver.quit()
-
-        parsed = urlparse(html)
+        parsed = urlparse(url)
         base_url = f"{parsed.scheme}://{parsed.netloc}"
 
         return simplificar_html(html,base_url)
     except Exception as e:
-        return f"Error al obtener HTML con Selenium: {str(e)}"
+        return f"Error al obtener HTML: {str(e)}"
 
 @tool
 def save_json_field_tool(path_json: str, field_name: str, value: str) -> str:
     """
     Guarda o actualiza el valor de un campo específico en un archivo JSON. 
-    Si el archivo no existe, lo crea.
+    Si el archivo no existe, lo crea. Si el documento está abierto en memoria,
+    se modifica ahí y se escribe a disco al cerrarlo.
 
     Args:
         path_json (str): Ruta al archivo JSON.
@@ -137,6 +125,11 @@ def save_json_field_tool(path_json: str, field_name: str, value: str) -> str:
         str: Mensaje de confirmación o de error.
     """
     try:
+        document = get_open_document(path_json)
+        if document is not None:
+            document.set_field(field_name, value)
+            return f"Campo '{field_name}' guardado correctamente en {path_json}."
+
         if not os.path.exists(path_json):
             data = {}
         else:
@@ -157,7 +150,8 @@ def save_json_field_tool(path_json: str, field_name: str, value: str) -> str:
 def add_field_ref_json_tool(path_json: str, field_name_ref: str, id_doc: str, fragments: list) -> str:
     """
     Añade referencias a un campo de referencias en un archivo JSON. 
-    Si el archivo no existe, lo crea.
+    Si el archivo no existe, lo crea. Si el documento está abierto en memoria,
+    se modifica ahí y se escribe a disco al cerrarlo.
 
     Args:
         path_json (str): Ruta al archivo JSON.
@@ -169,6 +163,11 @@ def add_field_ref_json_tool(path_json: str, field_name_ref: str, id_doc: str, fr
         str: Mensaje de confirmación o de error.
     """
     try:
+        document = get_open_document(path_json)
+        if document is not None:
+            document.add_refs(field_name_ref, id_doc, fragments)
+            return f"Referencias añadidas correctamente al campo '{field_name_ref}' en {path_json}."
+
         if not os.path.exists(path_json):
             data = {}
         else:
@@ -226,335 +225,486 @@ def save_json_tool(carpeta_base: str, datos: Dict, nombre_archivo: str) -> str:
         return f"Error al guardar JSON: {str(e)}"
 
 
-def get_organismo_context(vector_path: str, idx: int) -> str:
+# Prompts fijos con los que se recupera el contexto de cada campo. Están centralizados
+# para poder precalcular sus embeddings una sola vez por despliegue.
+CONTEXT_PROMPTS = {
+    "organismo": [
+        "¿Cual es el nombre del organismo o entidad que propone la convocatoria?",
+        "¿Quién es el responsable de emitir esta convocatoria pública?"
+    ],
+    "beneficiarios": [
+        "¿Quiénes pueden solicitar la ayuda? ¿Cuáles son los beneficiarios de la convocatoria?",
+        "¿A qué personas, empresas o entidades está dirigida esta convocatoria?"
+    ],
+    "presupuesto_minimo": [
+        "¿Qué importe mínimo se requiere para participar en la convocatoria?",
+        "¿Cuál es la cantidad mínima de fondos que se pueden solicitar en esta ayuda?"
+    ],
+    "presupuesto_maximo": [
+        "¿Qué importe máximo se puede financiar en esta ayuda?",
+        "¿Cuál es la cantidad máxima de fondos que se pueden otorgar en esta convocatoria?"
+    ],
+    "fecha_inicio": [
+        "¿Cuándo comienza el plazo de solicitud de la convocatoria?",
+        "¿A partir de qué fecha se pueden presentar solicitudes para esta convocatoria?"
+    ],
+    "fecha_fin": [
+        "¿Cuál es la fecha límite para la presentación de solicitudes?",
+        "¿Hasta qué día se pueden presentar solicitudes para esta convocatoria?"
+    ],
+    "objetivos_convocatoria": [
+        "¿Cuáles son los objetivos y finalidades de la convocatoria?",
+        "¿Qué pretende conseguir esta convocatoria? ¿Cuáles son sus principales metas?"
+    ],
+    "anio": [
+        "¿En qué año se publica, abre o cuál es la vigencia de esta convocatoria?",
+        "¿A qué año corresponde esta convocatoria?"
+    ],
+    "duracion_minima": [
+        "¿Cuál es la duración mínima exigida para los proyectos?",
+        "¿Qué duración mínima deben cumplir los proyectos financiados?"
+    ],
+    "duracion_maxima": [
+        "¿Cuál es la duración máxima permitida para los proyectos?",
+        "¿Qué duración máxima pueden tener los proyectos subvencionados?"
+    ],
+    "tipo_financiacion": [
+        "¿Qué tipo de financiación ofrece esta convocatoria? ¿Es una subvención, un préstamo u otra modalidad?",
+        "¿Se trata de una ayuda económica directa, un crédito, o un incentivo fiscal?",
+        "¿Qué modalidad de financiación está prevista en esta convocatoria?",
+        "¿Se especifica si la ayuda es reembolsable o no reembolsable?"
+    ],
+    "forma_plazo_cobro": [
+        "¿Cómo y cuándo se realiza el cobro o desembolso de la ayuda? ¿Cuál es el calendario de pagos?",
+        "¿En qué plazos y de qué forma se recibe el dinero de la convocatoria?",
+        "¿Cuál es el procedimiento de pago establecido para las ayudas?",
+        "¿Se anticipa el pago total, se realiza en varios tramos o depende de hitos?"
+    ],
+    "minimis": [
+        "¿La ayuda está sujeta al régimen de minimis según la normativa de la UE?",
+        "¿Se menciona que la ayuda se acoge a la normativa europea de minimis?",
+        "¿La ayuda requiere notificación previa a la Comisión Europea o está exenta?",
+        "¿Se especifica el cumplimiento de los límites establecidos para ayudas de minimis?"
+    ],
+    "tipo_consorcio": [
+        "¿Qué requisitos existen sobre la composición del consorcio en esta convocatoria? Número mínimo de socios, tipos de entidades, condiciones de colaboración, etc.",
+        "¿Se exige participación en consorcio? ¿Qué características deben tener los consorcios?",
+        "¿Cuántos participantes debe tener el consorcio y qué tipo de entidades deben formar parte?",
+        "¿Qué condiciones específicas deben cumplir los consorcios en esta convocatoria?"
+    ],
+    "region_aplicacion": [
+        "¿En qué regiones, comunidades autónomas o zonas geográficas aplica esta convocatoria? ¿Dónde es válida la ayuda?",
+        "¿A qué territorios se dirige esta convocatoria?",
+        "¿La ayuda está limitada a una región específica o es de ámbito nacional?",
+        "¿Qué áreas geográficas cubre la ayuda ofrecida en esta convocatoria?"
+    ],
+    "intensidad_subvencion": [
+        "¿Cuál es el porcentaje máximo de ayuda a fondo perdido que ofrece la convocatoria? Detallar diferencias según tipo de empresa, región o categoría del proyecto.",
+        "¿Qué intensidades de ayuda aplican dependiendo de si se trata de investigación industrial, desarrollo experimental o innovación?",
+        "¿Cómo varía el porcentaje de subvención según el tamaño de la empresa (pequeña, mediana, grande) y la localización geográfica?",
+        "¿Qué condiciones específicas afectan la intensidad de la subvención? ¿Hay incrementos por colaboración en consorcio o participación de pymes?"
+    ],
+    "intensidad_prestamo": [
+        "¿Qué porcentaje del proyecto es financiado mediante préstamo reembolsable? Indicar variaciones por tipo de actividad y tamaño de empresa.",
+        "¿Cómo se estructura el tramo reembolsable frente al tramo no reembolsable en la convocatoria?",
+        "¿Qué condiciones específicas (plazos, tipos de interés, carencia) regulan el tramo de préstamo en esta ayuda?",
+        "¿Existen diferencias en el préstamo otorgado según localización territorial, sector o tamaño de la empresa?"
+    ],
+    "costes_elegibles": [
+        "¿Qué tipos de gasto están considerados elegibles para esta convocatoria? ¿Hay limitaciones en los tipos de gasto financiables?",
+        "¿Cuáles son los gastos que pueden ser financiados por la ayuda? ¿Incluye costes indirectos, equipamiento o subcontrataciones?",
+        "¿Qué restricciones existen en relación con los gastos financiables? ¿Cuáles son los límites en cada categoría de gasto?",
+        "¿Cuáles son las condiciones de elegibilidad de los costes para la ayuda? ¿Se aplican exclusiones para ciertos tipos de gasto?"
+    ]
+}
+
+
+# Términos que se añaden a la parte léxica de la búsqueda híbrida de cada campo: importes,
+# porcentajes y fechas aparecen literalmente en los fragmentos aunque los prompts no los
+# mencionen (ver lexical_index.tokenize para "<fecha>", "€" y "%").
+MESES = "enero febrero marzo abril mayo junio julio agosto septiembre octubre noviembre diciembre"
+LEXICAL_HINTS = {
+    "presupuesto_minimo": "€ importe mínimo cuantía presupuesto",
+    "presupuesto_maximo": "€ importe máximo cuantía presupuesto",
+    "fecha_inicio": f"<fecha> plazo presentación solicitudes inicio {MESES}",
+    "fecha_fin": f"<fecha> plazo presentación solicitudes fin finaliza {MESES}",
+    "anio": "convocatoria año ejercicio",
+    "duracion_minima": "meses años duración mínima",
+    "duracion_maxima": "meses años duración máxima",
+    "intensidad_subvencion": "% intensidad subvención fondo perdido",
+    "intensidad_prestamo": "% préstamo reembolsable tipo interés",
+    "minimis": "minimis 1407/2013 2831/2023",
+    "costes_elegibles": "gastos costes subvencionables elegibles €",
+}
+PROMPT_FIELDS = {prompt: field for field, prompts in CONTEXT_PROMPTS.items() for prompt in prompts}
+
+
+def lexical_query(prompt: str) -> str:
+    """Consulta léxica de un prompt de contexto: el prompt más las pistas de su campo."""
+    hints = LEXICAL_HINTS.get(PROMPT_FIELDS.get(prompt))
+    return f"{prompt} {hints}" if hints else prompt
+
+
+def prepare_context_embeddings() -> int:
+    """
+    Precalcula los embeddings de todos los prompts de CONTEXT_PROMPTS. Solo llama a Azure
+    la primera vez para cada despliegue; después los embeddings se leen del registro.
+
+    Returns:
+        int: Número de prompts que se han tenido que calcular.
+    """
+    return prepare_prompt_embeddings([prompt for prompts in CONTEXT_PROMPTS.values() for prompt in prompts])
+
+
+# Mayor k que piden las funciones get_*_context; la búsqueda precargada recupera ese
+# número de candidatos de texto y de tabla por prompt.
+CONTEXT_MAX_K = 6
+
+_prefetched = {}
+_prefetched_lock = threading.Lock()
+
+
+def prefetch_contexts(vector_path: str, doc_id: str = None) -> bool:
+    """
+    Recupera de una vez el contexto de todos los prompts de CONTEXT_PROMPTS para un
+    documento (un solo embedding batch, o ninguno si están en el registro, y una sola
+    consulta multi-vector), para que las funciones get_*_context lo sirvan desde memoria.
+    Si devuelve True hay que liberarlo con release_contexts; si falla, las funciones
+    get_*_context buscan cada prompt por separado.
+    """
+    key = (vector_path, doc_id)
+    with _prefetched_lock:
+        if key in _prefetched:
+            _prefetched[key][0] += 1
+            return True
+
+    prompts = list(dict.fromkeys(prompt for prompts in CONTEXT_PROMPTS.values() for prompt in prompts))
+    try:
+        resultados = search_many_from_context_vec_db(
+            prompts, vector_path, n_results=CONTEXT_MAX_K, doc_id=doc_id,
+            lexical_queries=[lexical_query(prompt) for prompt in prompts]
+        )
+    except Exception as e:
+        print(f"No se ha podido precargar el contexto de {doc_id or vector_path}: {e}")
+        return False
+
+    with _prefetched_lock:
+        if key in _prefetched:
+            _prefetched[key][0] += 1
+        else:
+            _prefetched[key] = [1, dict(zip(prompts, resultados))]
+    return True
+
+
+def release_contexts(vector_path: str, doc_id: str = None):
+    """Libera el contexto precargado con prefetch_contexts."""
+    key = (vector_path, doc_id)
+    with _prefetched_lock:
+        if key in _prefetched:
+            _prefetched[key][0] -= 1
+            if _prefetched[key][0] <= 0:
+                del _prefetched[key]
+
+
+def search_context(prompt: str, vector_path: str, doc_id: str = None, k: int = 4, find_table: bool = False) -> list:
+    """
+    Contexto de un prompt: se toma del precargado con prefetch_contexts si lo hay y, si no,
+    se busca en la base vectorial con search_from_context_vec_db.
+    """
+    with _prefetched_lock:
+        entrada = _prefetched.get((vector_path, doc_id))
+        resultados = entrada[1].get(prompt) if entrada else None
+
+    if resultados is None or k > CONTEXT_MAX_K:
+        return search_from_context_vec_db(prompt, vectorstore_path=vector_path, doc_id=doc_id, k=k, find_table=find_table,
+                                          lexical_query=lexical_query(prompt))
+
+    return select_context(*resultados, k=k, find_table=find_table)
+
+
+def get_organismo_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Extrae información sobre el organismo que convoca la ayuda.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con el organismo convocante.
     """
-    prompts = ["¿Cual es el nombre del organismo o entidad que propone la convocatoria?",
-               "¿Quién es el responsable de emitir esta convocatoria pública?"]
+    prompts = CONTEXT_PROMPTS["organismo"]
  
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
-def get_beneficiarios_context(vector_path: str, idx: int) -> str:
+def get_beneficiarios_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Identifica quiénes pueden solicitar la ayuda (beneficiarios).
     
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con los beneficiarios de la convocatoria.
     """
-    prompts = [
-        "¿Quiénes pueden solicitar la ayuda? ¿Cuáles son los beneficiarios de la convocatoria?",
-        "¿A qué personas, empresas o entidades está dirigida esta convocatoria?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["beneficiarios"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
-def get_presupuesto_minimo_context(vector_path: str, idx: int) -> str:
+def get_presupuesto_minimo_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Obtiene el presupuesto mínimo exigido para acceder a la ayuda.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con el presupuesto mínimo exigido.
     """
-    prompts = [
-        "¿Qué importe mínimo se requiere para participar en la convocatoria?",
-        "¿Cuál es la cantidad mínima de fondos que se pueden solicitar en esta ayuda?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["presupuesto_minimo"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
-def get_presupuesto_maximo_context(vector_path: str, idx: int) -> str:
+def get_presupuesto_maximo_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Obtiene el presupuesto máximo permitido por la convocatoria.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con el presupuesto máximo permitido.
     """
-    prompts = [
-        "¿Qué importe máximo se puede financiar en esta ayuda?",
-        "¿Cuál es la cantidad máxima de fondos que se pueden otorgar en esta convocatoria?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["presupuesto_maximo"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
 
-def get_fecha_inicio_context(vector_path: str, idx: int) -> str:
+def get_fecha_inicio_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Extrae la fecha de apertura del plazo de solicitud.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con la fecha de inicio del plazo de solicitud.
     """
-    prompts = [
-        "¿Cuándo comienza el plazo de solicitud de la convocatoria?",
-        "¿A partir de qué fecha se pueden presentar solicitudes para esta convocatoria?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["fecha_inicio"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
-def get_fecha_fin_context(vector_path: str, idx: int) -> str:
+def get_fecha_fin_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Extrae la fecha de cierre del plazo de solicitud.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con la fecha de fin del plazo de solicitud.
     """
-    prompts = [
-        "¿Cuál es la fecha límite para la presentación de solicitudes?",
-        "¿Hasta qué día se pueden presentar solicitudes para esta convocatoria?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["fecha_fin"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
-def get_objetivos_convocatoria_context(vector_path: str, idx: int) -> str:
+def get_objetivos_convocatoria_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Recupera los objetivos o fines que persigue la convocatoria.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con los objetivos de la convocatoria.
     """
-    prompts = [
-        "¿Cuáles son los objetivos y finalidades de la convocatoria?",
-        "¿Qué pretende conseguir esta convocatoria? ¿Cuáles son sus principales metas?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["objetivos_convocatoria"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
 
 
-def get_anio_context(vector_path: str, idx: int) -> str:
+def get_anio_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Identifica el año de publicación o vigencia de la convocatoria.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con el año de publicación o vigencia.
     """
-    prompts = [
-        "¿En qué año se publica, abre o cuál es la vigencia de esta convocatoria?",
-        "¿A qué año corresponde esta convocatoria?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["anio"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
-def get_duracion_minima_context(vector_path: str, idx: int) -> str:
+def get_duracion_minima_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Obtiene la duración mínima que deben tener los proyectos subvencionados.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con la duración mínima permitida.
     """
-    prompts = [
-        "¿Cuál es la duración mínima exigida para los proyectos?",
-        "¿Qué duración mínima deben cumplir los proyectos financiados?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["duracion_minima"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
-def get_duracion_maxima_context(vector_path: str, idx: int) -> str:
+def get_duracion_maxima_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Obtiene la duración máxima permitida para los proyectos o ayudas.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con la duración máxima permitida.
     """
-    prompts = [
-        "¿Cuál es la duración máxima permitida para los proyectos?",
-        "¿Qué duración máxima pueden tener los proyectos subvencionados?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["duracion_maxima"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
 
-def get_tipo_financiacion_context(vector_path: str, idx: int) -> str:
+def get_tipo_financiacion_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Determina el tipo de financiación ofrecida (subvención, préstamo, etc.).
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con el tipo de financiación ofrecida.
     """
-    prompts = [
-        "¿Qué tipo de financiación ofrece esta convocatoria? ¿Es una subvención, un préstamo u otra modalidad?",
-        "¿Se trata de una ayuda económica directa, un crédito, o un incentivo fiscal?",
-        "¿Qué modalidad de financiación está prevista en esta convocatoria?",
-        "¿Se especifica si la ayuda es reembolsable o no reembolsable?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["tipo_financiacion"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
 
-def get_forma_plazo_cobro_context(vector_path: str, idx: int) -> str:
+def get_forma_plazo_cobro_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Recupera la forma de pago y el calendario de cobro de la ayuda.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes relacionados con la forma y plazos de cobro de la ayuda.
     """
-    prompts = [
-        "¿Cómo y cuándo se realiza el cobro o desembolso de la ayuda? ¿Cuál es el calendario de pagos?",
-        "¿En qué plazos y de qué forma se recibe el dinero de la convocatoria?",
-        "¿Cuál es el procedimiento de pago establecido para las ayudas?",
-        "¿Se anticipa el pago total, se realiza en varios tramos o depende de hitos?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["forma_plazo_cobro"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
 
-def get_minimis_context(vector_path: str, idx: int) -> str:
+def get_minimis_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Recupera fragmentos relacionados con si la ayuda se considera minimis según la normativa europea.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes sobre si la ayuda está sujeta al régimen de minimis.
     """
-    prompts = [
-        "¿La ayuda está sujeta al régimen de minimis según la normativa de la UE?",
-        "¿Se menciona que la ayuda se acoge a la normativa europea de minimis?",
-        "¿La ayuda requiere notificación previa a la Comisión Europea o está exenta?",
-        "¿Se especifica el cumplimiento de los límites establecidos para ayudas de minimis?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["minimis"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
 
-def get_tipo_consorcio_context(vector_path: str, idx: int) -> str:
+def get_tipo_consorcio_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Recupera fragmentos relacionados con el tipo de consorcio requerido o permitido en la convocatoria.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes que describen los requisitos o características del consorcio en la ayuda.
     """
-    prompts = [
-        "¿Qué requisitos existen sobre la composición del consorcio en esta convocatoria? Número mínimo de socios, tipos de entidades, condiciones de colaboración, etc.",
-        "¿Se exige participación en consorcio? ¿Qué características deben tener los consorcios?",
-        "¿Cuántos participantes debe tener el consorcio y qué tipo de entidades deben formar parte?",
-        "¿Qué condiciones específicas deben cumplir los consorcios en esta convocatoria?"
-    ]
+    prompts = CONTEXT_PROMPTS["tipo_consorcio"]
 
     results = []
     
-    results.extend(search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=1, find_table=True))
-    results.extend(search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=5))
+    results.extend(search_context(prompts[idx], vector_path, doc_id, k=1, find_table=True))
+    results.extend(search_context(prompts[idx], vector_path, doc_id, k=5))
     
     return results
 
 
-def get_region_aplicacion_context(vector_path: str, idx: int) -> str:
+def get_region_aplicacion_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Recupera fragmentos relacionados con la región o regiones donde aplica la ayuda o convocatoria.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes que mencionan zonas geográficas donde es aplicable la ayuda.
     """
-    prompts = [
-        "¿En qué regiones, comunidades autónomas o zonas geográficas aplica esta convocatoria? ¿Dónde es válida la ayuda?",
-        "¿A qué territorios se dirige esta convocatoria?",
-        "¿La ayuda está limitada a una región específica o es de ámbito nacional?",
-        "¿Qué áreas geográficas cubre la ayuda ofrecida en esta convocatoria?"
-    ]
-    return search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=4)
+    prompts = CONTEXT_PROMPTS["region_aplicacion"]
+    return search_context(prompts[idx], vector_path, doc_id, k=4)
 
 
-def get_intensidad_subvencion_context(vector_path: str, idx: int) -> str:
+def get_intensidad_subvencion_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Recupera fragmentos relacionados con la intensidad de la subvención (o tramo no reembolsable) desde una base de datos vectorial.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes que incluyen tablas, porcentajes u otras estructuras que describen la parte no reembolsable de la ayuda.
     """
-    prompts = [
-        "¿Cuál es el porcentaje máximo de ayuda a fondo perdido que ofrece la convocatoria? Detallar diferencias según tipo de empresa, región o categoría del proyecto.",
-        "¿Qué intensidades de ayuda aplican dependiendo de si se trata de investigación industrial, desarrollo experimental o innovación?",
-        "¿Cómo varía el porcentaje de subvención según el tamaño de la empresa (pequeña, mediana, grande) y la localización geográfica?",
-        "¿Qué condiciones específicas afectan la intensidad de la subvención? ¿Hay incrementos por colaboración en consorcio o participación de pymes?"
-    ]
+    prompts = CONTEXT_PROMPTS["intensidad_subvencion"]
     
     results = []
-    results.extend(search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=1, find_table=True))
-    results.extend(search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=6))
+    results.extend(search_context(prompts[idx], vector_path, doc_id, k=1, find_table=True))
+    results.extend(search_context(prompts[idx], vector_path, doc_id, k=6))
     
     return results
 
 
-def get_intensidad_prestamo_context(vector_path: str, idx: int) -> str:
+def get_intensidad_prestamo_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Recupera fragmentos relacionados con la intensidad del préstamo (o tramo reembolsable) desde una base de datos vectorial.
 
     Args:
         vector_path (str): Ruta a la base de datos vectorial.
         idx (int): Índice del intento para variar el prompt.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes que incluyen información estructurada sobre las condiciones de devolución del préstamo.
     """
-    prompts = [
-        "¿Qué porcentaje del proyecto es financiado mediante préstamo reembolsable? Indicar variaciones por tipo de actividad y tamaño de empresa.",
-        "¿Cómo se estructura el tramo reembolsable frente al tramo no reembolsable en la convocatoria?",
-        "¿Qué condiciones específicas (plazos, tipos de interés, carencia) regulan el tramo de préstamo en esta ayuda?",
-        "¿Existen diferencias en el préstamo otorgado según localización territorial, sector o tamaño de la empresa?"
-    ]
+    prompts = CONTEXT_PROMPTS["intensidad_prestamo"]
     
     results = []
-    results.extend(search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=1, find_table=True))
-    results.extend(search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=6))
+    results.extend(search_context(prompts[idx], vector_path, doc_id, k=1, find_table=True))
+    results.extend(search_context(prompts[idx], vector_path, doc_id, k=6))
     
     return results
 
 
-def get_costes_elegibles_context(vector_path: str, idx: int) -> str:
+def get_costes_elegibles_context(vector_path: str, idx: int, doc_id: str = None) -> str:
     """
     Recupera información sobre los costes elegibles dentro de una convocatoria, es decir, aquellos gastos que son financiables.
 
@@ -565,21 +715,17 @@ def get_costes_elegibles_context(vector_path: str, idx: int) -> str:
     Args:
         vector_path (str): Ruta al archivo de la base de datos vectorial.
         idx (int): Índice para variar las consultas sobre costes elegibles.
+        doc_id (str, optional): ID de la convocatoria por la que filtrar cuando la base vectorial es compartida.
 
     Returns:
         str: Fragmentos relevantes sobre los tipos de gastos financiables y las condiciones que los acompañan.
     """
-    prompts = [
-        "¿Qué tipos de gasto están considerados elegibles para esta convocatoria? ¿Hay limitaciones en los tipos de gasto financiables?",
-        "¿Cuáles son los gastos que pueden ser financiados por la ayuda? ¿Incluye costes indirectos, equipamiento o subcontrataciones?",
-        "¿Qué restricciones existen en relación con los gastos financiables? ¿Cuáles son los límites en cada categoría de gasto?",
-        "¿Cuáles son las condiciones de elegibilidad de los costes para la ayuda? ¿Se aplican exclusiones para ciertos tipos de gasto?"
-    ]
+    prompts = CONTEXT_PROMPTS["costes_elegibles"]
     
     results = []
     
-    results.extend(search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=1, find_table=True))
-    results.extend(search_from_context_vec_db(prompts[idx], vectorstore_path=vector_path, k=6))
+    results.extend(search_context(prompts[idx], vector_path, doc_id, k=1, find_table=True))
+    results.extend(search_context(prompts[idx], vector_path, doc_id, k=6))
     
     return results
 
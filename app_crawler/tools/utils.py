@@ -1,8 +1,11 @@
 import os
 import json
 import shutil
-import requests
+import time
+import threading
 import concurrent.futures
+from app_crawler.tools.pdf_store import get_pdf_store
+from app_crawler.tools.pdf_downloader import descargar_pdf, PDF_DOWNLOAD_WORKERS
 
 def getIdFromFile(file_path: str) -> str:
     """
@@ -98,13 +101,36 @@ def create_json_templates(jsons: list[str], base_path: str, max_workers=10):
         executor.map(copy_single_json, jsons)
 
 
-def downloadPDFs(json_file_paths, pdf_dest_path, max_workers=10):
+def downloadPDFs(json_file_paths, pdf_dest_path, max_workers=PDF_DOWNLOAD_WORKERS):
     """
     Descarga PDFs desde 'Link ficha técnica' y 'Link orden de bases' en cada JSON.
     Crea una carpeta por ID y guarda los PDFs como <id>_ficha.pdf y <id>_bases.pdf.
-    Si ya existen, no se vuelven a descargar.
+
+    Cada URL se descarga una sola vez al almacén de blobs por contenido (pdf_store), y los
+    ficheros de cada carpeta son enlaces a esos blobs, de modo que las líneas que comparten
+    documento no lo descargan ni lo guardan varias veces. En ejecuciones posteriores las URLs
+    conocidas se revalidan con peticiones condicionales (ETag/Last-Modified) y solo se
+    vuelven a descargar si han cambiado.
+
+    La concurrencia real la limita pdf_downloader por host (PDF_DOWNLOAD_PER_HOST);
+    `max_workers` solo fija cuántos JSON se procesan a la vez.
     """
     os.makedirs(pdf_dest_path, exist_ok=True)
+    store = get_pdf_store(pdf_dest_path)
+
+    def enlazar_pdf(url, ruta, descripcion):
+        if store.sha_for_url(url) is None:
+            if os.path.exists(ruta):
+                print(f"{descripcion} ya existe: {os.path.basename(ruta)}")
+                store.link(store.adopt(url, ruta), ruta)
+                return
+            print(f"Descargando {descripcion.lower()} desde: {url}")
+        else:
+            print(f"{descripcion} ya descargada desde {url}: {os.path.basename(ruta)}")
+
+        sha256 = store.fetch(url, descargar_pdf)
+        if sha256:
+            store.link(sha256, ruta)
 
     def process_single_json(json_path):
         try:
@@ -117,27 +143,15 @@ def downloadPDFs(json_file_paths, pdf_dest_path, max_workers=10):
 
             ficha_url = contenido.get('Link ficha técnica')
             if ficha_url and ficha_url.endswith('.pdf'):
-                nombre_ficha = f"{id_convocatoria}_ficha.pdf"
-                ruta_ficha = os.path.join(carpeta_id, nombre_ficha)
-
-                if not os.path.exists(ruta_ficha):
-                    print(f"Descargando ficha técnica desde: {ficha_url}")
-                    descargar_pdf(ficha_url, ruta_ficha)
-                else:
-                    print(f"Ficha técnica ya existe: {nombre_ficha}")
+                ruta_ficha = os.path.join(carpeta_id, f"{id_convocatoria}_ficha.pdf")
+                enlazar_pdf(ficha_url, ruta_ficha, "Ficha técnica")
             else:
                 print(f"No hay ficha técnica válida en: {json_path}")
 
             bases_url = contenido.get('Link orden de bases')
             if bases_url and bases_url.endswith('.pdf'):
-                nombre_bases = f"{id_convocatoria}_bases.pdf"
-                ruta_bases = os.path.join(carpeta_id, nombre_bases)
-
-                if not os.path.exists(ruta_bases):
-                    print(f"Descargando orden de bases desde: {bases_url}")
-                    descargar_pdf(bases_url, ruta_bases)
-                else:
-                    print(f"Orden de bases ya existe: {nombre_bases}")
+                ruta_bases = os.path.join(carpeta_id, f"{id_convocatoria}_bases.pdf")
+                enlazar_pdf(bases_url, ruta_bases, "Orden de bases")
             else:
                 print(f"No hay orden de bases válida en: {json_path}")
 
@@ -148,33 +162,6 @@ def downloadPDFs(json_file_paths, pdf_dest_path, max_workers=10):
         executor.map(process_single_json, json_file_paths)
 
 
-def descargar_pdf(url, ruta_destino):
-    """Descarga un PDF usando requests con reintentos."""
-    intentos = 0
-    exito = False
-
-    while intentos < 3 and not exito:
-        try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                              "AppleWebKit/537.36 (KHTML, like Gecko) "
-                              "Chrome/90.0.4430.85 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers, timeout=30)
-            if response.status_code == 200 and 'application/pdf' in response.headers.get('Content-Type', ''):
-                with open(ruta_destino, 'wb') as f:
-                    f.write(response.content)
-                print(f"✅ Descarga completada y guardada en: {ruta_destino}")
-                exito = True
-            else:
-                raise Exception(f"Respuesta inesperada. Status: {response.status_code}, Content-Type: {response.headers.get('Content-Type')}")
-        except Exception as e:
-            intentos += 1
-            print(f"Error al descargar {url} (intento {intentos}/3): {e}")
-            if intentos >= 3:
-                print(f"Fallo definitivo al descargar {url}. Se omite este archivo.")
-
-
 def validate_convocatoria_json(json_path):
     """
     Dado el path de un archivo JSON, esta función verifica si contiene todos los campos
@@ -279,3 +266,49 @@ def load_refined_urls(path: str) -> list:
 
     return links
 
+
+
+
+class ProgressTracker:
+    """
+    Contador de progreso seguro entre hilos que imprime el avance agregado de una etapa
+    junto con el tiempo transcurrido y una estimación del tiempo restante (ETA).
+    """
+
+    def __init__(self, total: int, etapa: str):
+        self.total = total
+        self.etapa = etapa
+        self.completadas = 0
+        self.fallidas = 0
+        self.inicio = time.monotonic()
+        self._lock = threading.Lock()
+
+    def step(self, ok: bool = True):
+        with self._lock:
+            self.completadas += 1
+            if not ok:
+                self.fallidas += 1
+            completadas = self.completadas
+            fallidas = self.fallidas
+
+        transcurrido = time.monotonic() - self.inicio
+        restante = transcurrido / completadas * (self.total - completadas)
+        porcentaje = completadas / self.total * 100 if self.total else 100
+
+        print(
+            f"[{self.etapa}] {completadas}/{self.total} ({porcentaje:.0f}%), {fallidas} con error - "
+            f"transcurrido {format_duration(transcurrido)} - ETA {format_duration(restante)}"
+        )
+
+
+def format_duration(seconds: float) -> str:
+    """Formatea una duración en segundos como '1h02m03s', '2m03s' o '3s'."""
+    seconds = int(round(seconds))
+    horas, resto = divmod(seconds, 3600)
+    minutos, segundos = divmod(resto, 60)
+
+    if horas:
+        return f"{horas}h{minutos:02d}m{segundos:02d}s"
+    if minutos:
+        return f"{minutos}m{segundos:02d}s"
+    return f"{segundos}s"
@@ -1,39 +1,310 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
 import os
-import pdfplumber
 from langchain_community.docstore.document import Document
-from openai import AzureOpenAI
 from dotenv import load_dotenv
-import time
 from tqdm import tqdm  
-import uuid
+import time
+import hashlib
+from app_crawler.tools.rate_limiter import estimate_tokens, CHARS_PER_TOKEN
+from app_crawler.tools.embedding_cache import get_embedding_cache
+from app_crawler.tools.prompt_embeddings import get_prompt_registry
+from app_crawler.tools.vector_store_registry import get_vectorstore
+from app_crawler.tools.embedding_provider import get_embedding_provider
+from app_crawler.tools.pipeline import in_background, token_batched
+from app_crawler.tools.pdf_parsing import iter_pdfs_pages, EXTRACTOR_VERSION
+from app_crawler.tools.extraction_cache import file_sha256
+from app_crawler.tools.index_manifest import IndexManifest, manifest_path
+from app_crawler.tools.lexical_index import get_lexical_index
 
 load_dotenv()
-api_key = os.environ["AZURE_EMBEDDING_KEY"]
-deployment_name = os.environ["AZURE_EMBEDDING_DEPLOYMENT_NAME"]
-api_base = os.environ["AZURE_EMBEDDING_ENDPOINT"] 
-api_version = os.environ["AZURE_EMBEDDING_API_VERSION"] 
+INDEXING_QUEUE_BATCHES = int(os.getenv("INDEXING_QUEUE_BATCHES", 2))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", 32000))
+EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv("EMBEDDING_BATCH_MAX_ITEMS", 256))
+EMBEDDING_MAX_INPUT_TOKENS = int(os.getenv("EMBEDDING_MAX_INPUT_TOKENS", 8000))
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+RRF_K = int(os.getenv("RRF_K", 60))
+
+def owner_key(convocatoria_id: str) -> str:
+    """Clave booleana de metadatos que marca que un fragmento pertenece a una convocatoria."""
+    return f"convocatoria_{convocatoria_id}"
+
+
+def doc_key(doc_id: str) -> str:
+    """Clave booleana de metadatos que marca que un fragmento pertenece al documento `doc_id`."""
+    return f"documento_{doc_id}"
+
+
+def pdf_metadata(pdf_path: str, owner_ids: list, doc_ids: list = None) -> dict:
+    """
+    Metadatos comunes a todos los fragmentos de un PDF: su nombre (`id`), el sha256 del
+    contenido (`blob_sha`) y las convocatorias a las que pertenece. `convocatoria_id` guarda
+    la primera y cada una tiene además su clave owner_key() a True, porque Chroma no admite
+    listas en los metadatos.
+
+    Un PDF compartido se indexa una sola vez con el nombre de uno de sus ficheros; `doc_ids`
+    son los nombres de todos los ficheros con ese contenido (p. ej. `X_bases` e `Y_bases`),
+    que se guardan con su clave doc_key() a True para poder buscarlo por cualquiera de ellos.
+    """
+    nombre = os.path.splitext(os.path.basename(pdf_path))[0]
+    metadata = {
+        "id": nombre,
+        "convocatoria_id": owner_ids[0],
+        "blob_sha": file_sha256(pdf_path)
+    }
+    for convocatoria_id in owner_ids:
+        metadata[owner_key(convocatoria_id)] = True
+    for doc_id in [nombre, *(doc_ids or [])]:
+        metadata[doc_key(doc_id)] = True
+    return metadata
+
+
+def owners_of(metadata: dict) -> set:
+    """Convocatorias a las que pertenece un fragmento según sus metadatos."""
+    owners = {metadata["convocatoria_id"]} if metadata.get("convocatoria_id") else set()
+    prefix = owner_key("")
+    for key, value in metadata.items():
+        if key.startswith(prefix) and key != "convocatoria_id" and value is True:
+            owners.add(key[len(prefix):])
+    return owners
+
+
+def chunk_id(doc_id: str, fragment: str, content: str) -> str:
+    """
+    Id determinista de un fragmento a partir del documento, su número de fragmento y el hash
+    de su contenido: reindexar el mismo PDF produce los mismos ids.
+    """
+    content_sha = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{doc_id}\x1f{fragment}\x1f{content_sha}".encode("utf-8")).hexdigest()
+
+
+def docs_of(metadata: dict) -> set:
+    """Nombres de documento (ficheros PDF) que comparten un fragmento según sus metadatos."""
+    docs = {metadata["id"]} if metadata.get("id") else set()
+    prefix = doc_key("")
+    for key, value in metadata.items():
+        if key.startswith(prefix) and value is True:
+            docs.add(key[len(prefix):])
+    return docs
+
+
+def doc_id_for(metadata: dict, convocatoria_id: str) -> str:
+    """
+    Nombre del documento de un fragmento tal y como lo ve la convocatoria `convocatoria_id`:
+    si el PDF está compartido, el de su propio fichero (<id>_bases, <id>_ficha), para que sus
+    referencias apunten a sus documentos y no a los de otra convocatoria.
+    """
+    if metadata.get("id", "").startswith(f"{convocatoria_id}_"):
+        return metadata["id"]
+    propios = sorted(doc_id for doc_id in docs_of(metadata) if doc_id.startswith(f"{convocatoria_id}_"))
+    return propios[0] if propios else metadata.get("id")
+
+
+def doc_filter(doc_id: str) -> dict:
+    """Filtro de Chroma para los fragmentos de un documento, tenga o no el PDF compartido."""
+    return {"$or": [{"id": doc_id}, {doc_key(doc_id): True}]}
+
 
-def extract_text_and_tables(pdf_path):
+def convocatoria_filter(convocatoria_id: str) -> dict:
+    """Filtro de Chroma para los fragmentos de una convocatoria, tenga o no el PDF compartido."""
+    return {"$or": [{"convocatoria_id": convocatoria_id}, {owner_key(convocatoria_id): True}]}
+
+
+def chunk_to_documents(chunk: dict, idx: int, base_metadata: dict, splitter) -> list:
+    """
+    Convierte el fragmento número `idx` (empezando en 1) de un PDF en documentos para la base
+    vectorial: las tablas se guardan enteras y los textos se dividen con `splitter`.
+    """
+    tipo = chunk["tipo"]
+    content = chunk["content"]
+
+    if tipo == 'tabla':
+        return [
+            Document(
+                page_content=content,
+                metadata={
+                    **base_metadata,
+                    "fragment": f"{idx}",
+                    "tipo": tipo
+                }
+            )
+        ]
+
+    return [
+        Document(
+            page_content=sub_content,
+            metadata={
+                **base_metadata,
+                "fragment": f"{idx}-{sub_idx+1}",
+                "tipo": tipo
+            }
+        )
+        for sub_idx, sub_content in enumerate(splitter.split_text(content))
+    ]
+
+
+def iter_pdf_documents(pdf_paths: list, chunk_size: int = 500, chunk_overlap: int = 100, owners: dict = None,
+                       aliases: dict = None):
     """
-    Extrae texto y tablas de un PDF.
-    Retorna una lista de diccionarios {content: str, tipo: 'texto' o 'tabla'}.
+    Genera de forma perezosa los documentos de todos los PDFs de `pdf_paths`, en orden y con
+    la misma numeración de fragmentos que si se extrajera cada PDF completo. Las páginas se
+    parsean en el pool de procesos de pdf_parsing (PDF_PARSE_WORKERS).
+
+    `owners` asocia a cada ruta la lista de convocatorias que comparten ese PDF; por defecto
+    es el nombre de la carpeta del PDF (data/pdf/<id_convocatoria>/). `aliases` asocia a cada
+    ruta los nombres de los demás ficheros con el mismo contenido (ver pdf_metadata).
     """
-    all_chunks = []
+    owners = owners or {}
+    aliases = aliases or {}
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+
+    for pdf_path, page_number, page_chunks in iter_pdfs_pages(pdf_paths):
+        if page_number == 0:
+            owner_ids = owners.get(pdf_path) or [os.path.basename(os.path.dirname(os.path.abspath(pdf_path)))]
+            base_metadata = pdf_metadata(pdf_path, owner_ids, aliases.get(pdf_path))
+            idx = 0
+
+        for chunk in page_chunks:
+            idx += 1
+            yield from chunk_to_documents(chunk, idx, base_metadata, splitter)
+
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text:
-                all_chunks.append({"content": text, "tipo": "texto"})
+def release_owners(metadata: dict, owner_ids: list):
+    """
+    Cambios de metadatos para desasociar `owner_ids` de un fragmento, o None si el fragmento
+    no pertenece a ninguna otra convocatoria y debe borrarse.
+    """
+    otras = owners_of(metadata) - set(owner_ids)
+    if not otras:
+        return None
 
-            tables = page.extract_tables()
-            for table in tables:
-                table_string = "\n".join([" | ".join([str(cell) if cell is not None else "" for cell in row]) for row in table if row])
-                all_chunks.append({"content": table_string, "tipo": "tabla"})
+    liberada = {owner_key(convocatoria_id): False for convocatoria_id in owner_ids}
+    if metadata.get("convocatoria_id") in owner_ids:
+        liberada["convocatoria_id"] = sorted(otras)[0]
+    return liberada
 
-    return all_chunks
+
+def update_owners(vectorstore_path: str, chunk_ids: list, add: list = (), remove: list = (),
+                  add_docs: list = (), remove_docs: list = ()) -> int:
+    """
+    Añade y quita convocatorias (y nombres de documento, ver pdf_metadata) de los fragmentos
+    `chunk_ids` ya indexados, sin recalcular sus embeddings.
+
+    Returns:
+        int: Número de fragmentos actualizados.
+    """
+    if not chunk_ids:
+        return 0
+
+    collection = get_vectorstore(vectorstore_path)._collection
+    existentes = collection.get(ids=list(chunk_ids), include=["metadatas"])
+
+    metadatas = []
+    for metadata in existentes["metadatas"]:
+        cambios = {owner_key(convocatoria_id): True for convocatoria_id in add}
+        if remove:
+            cambios.update(release_owners({**metadata, **cambios}, remove) or {})
+
+        cambios.update({doc_key(doc_id): True for doc_id in add_docs})
+        cambios.update({doc_key(doc_id): False for doc_id in remove_docs if doc_id not in add_docs})
+        restantes = docs_of({**metadata, **cambios}) - set(remove_docs)
+        if metadata.get("id") in remove_docs and restantes:
+            cambios["id"] = sorted(restantes)[0]
+        metadatas.append(cambios)
+
+    if existentes["ids"]:
+        collection.update(ids=existentes["ids"], metadatas=metadatas)
+    return len(existentes["ids"])
+
+
+def remove_stale_chunks(collection, doc_id: str, keep_ids: set, owner_ids: list, lexical_index=None) -> int:
+    """
+    Elimina los fragmentos del documento `doc_id` que no están en `keep_ids` (restos de una
+    versión anterior del PDF). Si un fragmento obsoleto pertenece también a convocatorias que
+    no se están reindexando, no se borra: solo se le quitan las convocatorias `owner_ids`.
+
+    Returns:
+        int: Número de fragmentos eliminados o desasociados.
+    """
+    existentes = collection.get(where={"id": doc_id}, include=["metadatas"])
+
+    borrar, liberar_ids, liberar_metadatas = [], [], []
+    for id_, metadata in zip(existentes["ids"], existentes["metadatas"]):
+        if id_ in keep_ids:
+            continue
+
+        liberada = release_owners(metadata, owner_ids)
+        if liberada is None:
+            borrar.append(id_)
+        else:
+            liberar_ids.append(id_)
+            liberar_metadatas.append(liberada)
+
+    if borrar:
+        collection.delete(ids=borrar)
+        if lexical_index is not None:
+            lexical_index.delete(borrar)
+    if liberar_ids:
+        collection.update(ids=liberar_ids, metadatas=liberar_metadatas)
+    return len(borrar) + len(liberar_ids)
+
+
+def embedding_tokens(text: str) -> int:
+    """Tokens estimados que cuesta el embedding de `text` (ver embedding_input)."""
+    return min(estimate_tokens([text]), EMBEDDING_MAX_INPUT_TOKENS)
+
+
+def embedding_input(text: str) -> str:
+    """
+    Texto que se envía al modelo de embeddings: las tablas enormes se recortan a
+    EMBEDDING_MAX_INPUT_TOKENS, aunque en la base vectorial se guarda el contenido completo.
+    """
+    return text[:EMBEDDING_MAX_INPUT_TOKENS * CHARS_PER_TOKEN]
+
+
+def embed_with_split(provider, texts: list, max_retries: int = None):
+    """
+    Calcula los embeddings de `texts` en una petición al proveedor. Si la rechaza con un error
+    no transitorio (p. ej. por exceder el límite de tokens), la divide en dos mitades y
+    reintenta cada una, de modo que solo se pierden los textos que fallan por sí solos. Los
+    errores transitorios ya se han reintentado en el proveedor y dividir no ayudaría.
+
+    Returns:
+        tuple: (embeddings en el orden de `texts`, con None en los que han fallado; número de
+        llamadas al proveedor)
+    """
+    inputs = [embedding_input(text) for text in texts]
+    try:
+        return provider.embed(inputs, max_retries=max_retries), 1
+    except Exception as e:
+        if len(texts) == 1 or provider.is_retryable(e):
+            print(f"No se han podido calcular {len(texts)} embeddings: {str(e)}")
+            return [None] * len(texts), 1
+
+        mitad = len(texts) // 2
+        print(f"Falla un batch de {len(texts)} embeddings ({str(e)}); se divide en dos.")
+        primera, llamadas_1 = embed_with_split(provider, texts[:mitad], max_retries)
+        segunda, llamadas_2 = embed_with_split(provider, texts[mitad:], max_retries)
+        return primera + segunda, 1 + llamadas_1 + llamadas_2
+
+
+def ensure_lexical_index(vectorstore_path: str, page_size: int = 1000):
+    """
+    Construye el índice léxico de una base vectorial creada antes de que existiera, a partir
+    de los fragmentos ya guardados en Chroma (sin recalcular embeddings).
+    """
+    collection = get_vectorstore(vectorstore_path)._collection
+    lexical_index = get_lexical_index(vectorstore_path)
+    total = collection.count()
+    if len(lexical_index) >= total:
+        return
+
+    print(f"Construyendo índice léxico de {vectorstore_path} con {total} fragmentos...")
+    for offset in range(0, total, page_size):
+        page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        lexical_index.add(page["ids"], page["documents"], [(metadata or {}).get("tipo") for metadata in page["metadatas"]])
 
 
 def save_pdf_at_vec_db(
@@ -41,179 +312,383 @@ def save_pdf_at_vec_db(
     vectorstore_path: str,
     chunk_size: int = 500,
     chunk_overlap: int = 100,
-    batch_size: int = 50,
-    max_retries: int = 5,
-    retry_delay: int = 10
+    batch_size: int = EMBEDDING_BATCH_MAX_ITEMS,
+    max_retries: int = None,
+    owners: dict = None,
+    max_batch_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+    aliases: dict = None
 ):
     """
     Procesa una lista de PDFs y guarda sus embeddings en una base de datos vectorial Chroma,
-    manejando automáticamente limitaciones de tasa de Azure OpenAI.
+    con el proveedor de embeddings configurado (get_embedding_provider).
+
+    La indexación es un pipeline en streaming de tres etapas unidas por colas acotadas:
+    extracción de páginas y troceado, agrupación en batches y embedding + escritura. Mientras
+    se calcula el embedding de un batch se sigue extrayendo el siguiente, y nunca hay más de
+    INDEXING_QUEUE_BATCHES batches en memoria, independientemente del número de PDFs.
+
+    Los batches se forman por tokens estimados: como mucho `max_batch_tokens` tokens y
+    `batch_size` fragmentos por petición, y una tabla que por sí sola supera el presupuesto
+    va en una petición propia. Los errores transitorios de Azure se reintentan con la
+    política común de call_with_retry; si el proveedor rechaza un batch se divide en dos y se
+    reintenta (embed_with_split), y los fragmentos que aun así fallan no se escriben.
+
+    Antes de llamar al proveedor se consulta la caché persistente de embeddings, de modo que
+    reindexar contenido ya visto no genera llamadas a la API.
+
+    Junto a la colección se mantiene el índice léxico BM25 (lexical_index) con los mismos ids.
+
+    Los ids de los fragmentos son deterministas (chunk_id) y la escritura es un upsert: los
+    fragmentos que ya están en la base no se vuelven a calcular ni a escribir (solo se
+    actualizan sus convocatorias), y al terminar se eliminan los fragmentos de versiones
+    anteriores de cada documento que ya no existen (remove_stale_chunks).
+
+    `owners` (opcional) asocia a cada ruta las convocatorias que comparten ese PDF, que se
+    guardan en los metadatos de sus fragmentos, y `aliases` (opcional) los nombres de los
+    demás ficheros con el mismo contenido (ver pdf_metadata).
+
+    Returns:
+        dict: {blob_sha: ids de sus fragmentos} de los PDFs indexados sin errores.
     """
     if not pdf_paths:
         raise ValueError("La lista de pdf_paths está vacía.")
 
-    all_documents = []
-
     for pdf_path in pdf_paths:
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"El archivo {pdf_path} no existe.")
 
-        extracted_chunks = extract_text_and_tables(pdf_path)
+    provider = get_embedding_provider()
 
-        file_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    print(f"Guardando en base vectorial: {vectorstore_path}")
+    db = get_vectorstore(vectorstore_path)
+    ensure_lexical_index(vectorstore_path)
+    lexical_index = get_lexical_index(vectorstore_path)
+
+    cache = get_embedding_cache()
+    total_documents = 0
+    unchanged = 0
+    cache_hits = 0
+    api_calls = 0
+    api_calls_saved = 0
+    embedded = 0
+    documentos = {}
+    fallidos = set()
+
+    documents = in_background(
+        iter_pdf_documents(pdf_paths, chunk_size, chunk_overlap, owners, aliases),
+        maxsize=batch_size,
+        name="pdf-parser"
+    )
+    batches = in_background(
+        token_batched(documents, max_batch_tokens, batch_size, lambda doc: embedding_tokens(doc.page_content)),
+        maxsize=INDEXING_QUEUE_BATCHES,
+        name="pdf-batcher"
+    )
 
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
+    inicio = time.perf_counter()
+    with tqdm(desc="Indexando documentos", unit="docs") as progress:
+        for batch_number, batch in enumerate(batches, start=1):
+            total_documents += len(batch)
+            progress.update(len(batch))
 
-        for idx, chunk in enumerate(extracted_chunks):
-            tipo = chunk["tipo"]
-            content = chunk["content"]
-
-            if tipo == 'tabla':
-                doc = Document(
-                    page_content=content,
-                    metadata={
-                        "id": file_name,
-                        "fragment": f"{idx+1}",
-                        "tipo": tipo
-                    }
+            ids_batch = [chunk_id(doc.metadata["id"], doc.metadata["fragment"], doc.page_content) for doc in batch]
+            for doc, id_ in zip(batch, ids_batch):
+                documento = documentos.setdefault(
+                    doc.metadata["id"], (set(), list(owners_of(doc.metadata)), doc.metadata["blob_sha"])
                 )
-                all_documents.append(doc)
-            else:
-                split_docs = splitter.split_text(content)
-
-                for sub_idx, sub_content in enumerate(split_docs):
-                    doc = Document(
-                        page_content=sub_content,
-                        metadata={
-                            "id": file_name,
-                            "fragment": f"{idx+1}-{sub_idx+1}",
-                            "tipo": tipo
-                        }
+                documento[0].add(id_)
+
+            try:
+                existentes = set(db._collection.get(ids=ids_batch, include=[])["ids"])
+                nuevos = [j for j, id_ in enumerate(ids_batch) if id_ not in existentes]
+                sin_cambios = [j for j, id_ in enumerate(ids_batch) if id_ in existentes]
+
+                if sin_cambios:
+                    db._collection.update(
+                        ids=[ids_batch[j] for j in sin_cambios],
+                        metadatas=[batch[j].metadata for j in sin_cambios]
                     )
-                    all_documents.append(doc)
+                    unchanged += len(sin_cambios)
 
-    print(f"Total documentos para indexar: {len(all_documents)}")
+                if not nuevos:
+                    continue
 
-    client = AzureOpenAI(
-        api_version=api_version,
-        azure_endpoint=api_base,
-        api_key=api_key
-    )
+                texts_batch = [batch[j].page_content for j in nuevos]
+                metadatas_batch = [batch[j].metadata for j in nuevos]
 
-    print(f"Guardando en base vectorial: {vectorstore_path}")
-    db = Chroma(persist_directory=vectorstore_path)
+                embeddings = cache.get_many(provider.name, texts_batch)
+                missing = [j for j, embedding in enumerate(embeddings) if embedding is None]
 
-    for i in tqdm(range(0, len(all_documents), batch_size), desc="Indexando documentos"):
-        batch = all_documents[i:i + batch_size]
+                if missing:
+                    missing_texts = [texts_batch[j] for j in missing]
 
-        retries = 0
-        while retries <= max_retries:
-            try:
-                texts_batch = [doc.page_content for doc in batch]
-                metadatas_batch = [doc.metadata for doc in batch]
+                    calculados, llamadas = embed_with_split(provider, missing_texts, max_retries)
+                    api_calls += llamadas
 
-                response = client.embeddings.create(
-                    input=texts_batch,
-                    model=deployment_name
-                )
-                embeddings = [r.embedding for r in response.data]
+                    for j, embedding in zip(missing, calculados):
+                        embeddings[j] = embedding
+                    ok = [j for j in missing if embeddings[j] is not None]
+                    embedded += len(ok)
+                    cache.put_many(provider.name, [texts_batch[j] for j in ok], [embeddings[j] for j in ok])
 
-                db._collection.add(
-                    embeddings=embeddings,
-                    documents=texts_batch,
-                    metadatas=metadatas_batch,
-                    ids=[str(uuid.uuid4()) for _ in range(len(texts_batch))]
-                )
+                escribir = [j for j, embedding in enumerate(embeddings) if embedding is not None]
+                if len(escribir) < len(embeddings):
+                    fallidos.update(metadatas_batch[j]["id"] for j, embedding in enumerate(embeddings) if embedding is None)
 
+                if escribir:
+                    db._collection.upsert(
+                        embeddings=[embeddings[j] for j in escribir],
+                        documents=[texts_batch[j] for j in escribir],
+                        metadatas=[metadatas_batch[j] for j in escribir],
+                        ids=[ids_batch[nuevos[j]] for j in escribir]
+                    )
+                    lexical_index.add(
+                        [ids_batch[nuevos[j]] for j in escribir],
+                        [texts_batch[j] for j in escribir],
+                        [metadatas_batch[j]["tipo"] for j in escribir]
+                    )
 
-                break
+                cache_hits += len(texts_batch) - len(missing)
+                if not missing:
+                    api_calls_saved += 1
             except Exception as e:
-                print(f"Error al indexar batch {i//batch_size + 1}: {str(e)}")
-                retries += 1
-                if retries > max_retries:
-                    print(f"Max reintentos alcanzados para batch {i//batch_size + 1}, continuando con el siguiente.")
-                    break
-                print(f"Esperando {retry_delay} segundos antes de reintentar...")
-                time.sleep(retry_delay)
+                fallidos.update(doc.metadata["id"] for doc in batch)
+                print(f"Error al indexar batch {batch_number}: {str(e)}. Continuando con el siguiente.")
+
+    eliminados = 0
+    indexados = {}
+    for doc_id, (keep_ids, owner_ids, blob_sha) in documentos.items():
+        if doc_id in fallidos:
+            print(f"No se eliminan fragmentos antiguos de {doc_id}: algún batch ha fallado.")
+            continue
+        eliminados += remove_stale_chunks(db._collection, doc_id, keep_ids, owner_ids, lexical_index)
+        indexados[blob_sha] = keep_ids
+
+    print(f"Base vectorial guardada con {total_documents} documentos: {total_documents - unchanged} nuevos, {unchanged} sin cambios, {eliminados} obsoletos eliminados.")
+
+    nuevos_total = total_documents - unchanged
+    hit_rate = cache_hits / nuevos_total * 100 if nuevos_total else 0
+    print(f"Caché de embeddings: {hit_rate:.1f}% de aciertos, {api_calls} llamadas a la API, {api_calls_saved} llamadas evitadas.")
 
-    db.persist()
+    duracion = time.perf_counter() - inicio
+    if duracion > 0:
+        print(f"{embedded} embeddings calculados en {duracion:.1f}s: {embedded / duracion:.1f} embeddings/s, {total_documents / duracion:.1f} fragmentos/s.")
+
+    return indexados
+
+
+def embed_texts(texts: list, max_retries: int = None) -> list:
+    """
+    Calcula los embeddings de una lista de textos en una sola petición al proveedor
+    configurado (ver embedding_provider).
+
+    Args:
+        texts (list): Textos a convertir en embeddings.
+
+    Returns:
+        list: Lista de vectores, en el mismo orden que `texts`.
+    """
+    return get_embedding_provider().embed(texts, max_retries=max_retries)
+
+
+def prepare_prompt_embeddings(prompts: list) -> int:
+    """
+    Precalcula y persiste los embeddings de los prompts fijos de recuperación para el
+    proveedor de embeddings actual, de forma que search_from_context_vec_db no tenga que
+    calcularlos en cada consulta.
+
+    Returns:
+        int: Número de prompts que no estaban registrados y se han calculado.
+    """
+    return get_prompt_registry(get_embedding_provider().name).ensure(prompts, embed_texts)
 
-    print(f"Base vectorial guardada con {len(all_documents)} documentos.")
 
 def search_from_context_vec_db(
     prompt: str,
     vectorstore_path: str,
     k: int = 3,
     find_table: bool = False,
-    max_retries: int = 5,
-    retry_delay: int = 10
+    doc_id: str = None,
+    max_retries: int = None,
+    lexical_query: str = None
 ) -> list:
     """
     Busca documentos relevantes desde una base vectorial en disco, priorizando 80% textos y 20% tablas,
-    pero asegurando mínimo 1 tabla si es posible.
+    pero asegurando mínimo 1 tabla si es posible. Textos y tablas se buscan con consultas
+    filtradas por tipo (ver search_many_from_context_vec_db y select_context).
 
     Args:
         prompt (str): Pregunta o input del usuario.
         vectorstore_path (str): Ruta donde está almacenada la base de datos vectorial.
         k (int): Número total de resultados a devolver.
         find_table (bool): Si es True, buscará solo tablas; si es False, buscará tanto tablas como textos.
+        doc_id (str, optional): Si se indica, solo se buscan fragmentos de esa convocatoria
+            (ver convocatoria_filter), para consultar la base vectorial compartida.
+        lexical_query (str, optional): Consulta para la parte léxica de la búsqueda híbrida;
+            por defecto, el propio prompt.
 
     Returns:
         list: Lista de documentos más relevantes.
     """
 
-    embedding = None
-    retries = 0
-
-    while retries <= max_retries:
-        try:
-            client = AzureOpenAI(
-                azure_endpoint=api_base,
-                api_key=api_key,
-                api_version=api_version
-            )
+    resultados_finales = select_context(
+        *search_many_from_context_vec_db([prompt], vectorstore_path, n_results=k, doc_id=doc_id,
+                                         find_table=find_table, max_retries=max_retries,
+                                         lexical_queries=[lexical_query])[0],
+        k=k,
+        find_table=find_table
+    )
+    print(f"Se han recuperado {len(resultados_finales)} fragmentos.")
 
-            response = client.embeddings.create(
-                input=[prompt],
-                model=deployment_name
-            )
+    return resultados_finales
 
-            embedding = response.data[0].embedding
-            break
-        except Exception as e:
-            print(f"Error al obtener embedding: {str(e)}")
-            retries += 1
-            if retries > max_retries:
-                raise Exception(f"Error permanente al generar embeddings tras {max_retries} reintentos.")
-            print(f"Reintentando en {retry_delay} segundos...")
-            time.sleep(retry_delay)
 
-    print(f"Cargando vectorstore desde: {vectorstore_path}")
-    db = Chroma(persist_directory=vectorstore_path)
+def tipo_filter(doc_id: str, tablas: bool) -> dict:
+    """Filtro de Chroma por tipo de fragmento (tablas o no tablas) y, si se indica, por convocatoria."""
+    tipo = {"tipo": "tabla"} if tablas else {"tipo": {"$ne": "tabla"}}
+    return {"$and": [convocatoria_filter(doc_id), tipo]} if doc_id else tipo
 
-    resultados_generales = db.similarity_search_by_vector(embedding, k=k*2)
 
+def select_context(textos: list, tablas: list, k: int, find_table: bool = False) -> list:
+    """
+    Elige los `k` fragmentos de contexto a partir de los candidatos de texto y de tabla
+    (listas de (documento, distancia) ordenadas por distancia): solo tablas si `find_table`,
+    y si no un 80% de textos y un 20% de tablas, completando por distancia con los del otro
+    tipo si de alguno no hay suficientes.
+    """
     if find_table:
-        resultados_finales = [doc for doc in resultados_generales if doc.metadata.get('tipo') == 'tabla']
-    else:
-        textos = [doc for doc in resultados_generales if doc.metadata.get('tipo') != 'tabla']
-        tablas = [doc for doc in resultados_generales if doc.metadata.get('tipo') == 'tabla']
+        return [doc for doc, _ in tablas[:k]]
 
-        n_textos = int(k * 0.8)
-        n_tablas = k - n_textos
+    n_textos = int(k * 0.8)
+    n_tablas = k - n_textos
 
-        resultados_finales = textos[:n_textos] + tablas[:n_tablas]
+    elegidos = textos[:n_textos] + tablas[:n_tablas]
 
-        if len(resultados_finales) < k:
-            otros = [doc for doc in resultados_generales if doc not in resultados_finales]
-            resultados_finales += otros[:k - len(resultados_finales)]
+    if len(elegidos) < k:
+        resto = sorted(textos[n_textos:] + tablas[n_tablas:], key=lambda resultado: resultado[1])
+        elegidos += resto[:k - len(elegidos)]
 
-    print(f"Se han recuperado {len(resultados_finales)} fragmentos.")
+    return [doc for doc, _ in elegidos]
 
-    return resultados_finales
+
+def fuse_rankings(collection, vectoriales: list, lexicos: list, n_results: int) -> list:
+    """
+    Combina, para cada prompt, los resultados vectoriales [(id, documento, distancia)] y los
+    léxicos [(id, puntuación BM25)] con Reciprocal Rank Fusion (1 / (RRF_K + posición)).
+
+    Returns:
+        list: Para cada prompt, los `n_results` mejores (documento, -puntuación fusionada).
+    """
+    documentos = {id_: doc for resultados in vectoriales for id_, doc, _ in resultados}
+    faltan = list({id_ for resultados in lexicos for id_, _ in resultados if id_ not in documentos})
+    if faltan:
+        extra = collection.get(ids=faltan, include=["documents", "metadatas"])
+        for id_, content, metadata in zip(extra["ids"], extra["documents"], extra["metadatas"]):
+            documentos[id_] = Document(page_content=content, metadata=metadata or {})
+
+    fusionados = []
+    for vectorial, lexico in zip(vectoriales, lexicos):
+        puntuaciones = {}
+        for posicion, (id_, _, _) in enumerate(vectorial):
+            puntuaciones[id_] = puntuaciones.get(id_, 0) + 1 / (RRF_K + posicion + 1)
+        for posicion, (id_, _) in enumerate(lexico):
+            puntuaciones[id_] = puntuaciones.get(id_, 0) + 1 / (RRF_K + posicion + 1)
+
+        mejores = sorted(puntuaciones.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        fusionados.append([(documentos[id_], -puntuacion) for id_, puntuacion in mejores if id_ in documentos])
+    return fusionados
+
+
+def search_many_from_context_vec_db(
+    prompts: list,
+    vectorstore_path: str,
+    n_results: int,
+    doc_id: str = None,
+    find_table: bool = False,
+    max_retries: int = None,
+    lexical_queries: list = None,
+    mode: str = None
+) -> list:
+    """
+    Busca a la vez los fragmentos más cercanos a varios prompts: los embeddings se leen del
+    registro de prompts y los que falten se calculan en una sola petición. El filtrado por
+    tipo se hace en la propia consulta: una consulta multi-vector para los textos y otra
+    para las tablas, de modo que cada cupo sale siempre del conjunto correcto.
+
+    En modo "hybrid" (RETRIEVAL_MODE, por defecto) cada lista de candidatos combina la
+    búsqueda vectorial con la búsqueda BM25 del índice léxico mediante Reciprocal Rank
+    Fusion; si la base no tiene índice léxico se usa solo la búsqueda vectorial.
+
+    Args:
+        prompts (list): Prompts a buscar.
+        vectorstore_path (str): Ruta donde está almacenada la base de datos vectorial.
+        n_results (int): Número de candidatos de cada tipo a recuperar por prompt.
+        doc_id (str, optional): Si se indica, solo se buscan fragmentos de esa convocatoria, y
+            el `id` de los PDFs compartidos es el de sus propios ficheros (ver doc_id_for).
+        find_table (bool): Si es True, solo se buscan tablas.
+        lexical_queries (list, optional): Consulta léxica de cada prompt (None = el prompt).
+        mode (str, optional): "vector" o "hybrid"; por defecto RETRIEVAL_MODE.
+
+    Returns:
+        list: Para cada prompt, en el mismo orden, un par (textos, tablas) de listas de
+        (documento, orden) ordenadas de más a menos relevante, para repartirlos con
+        select_context. El orden es la distancia en modo vectorial y menos la puntuación
+        fusionada en modo híbrido.
+    """
+    if not prompts:
+        return []
+
+    registry = get_prompt_registry(get_embedding_provider().name)
+    embeddings = [registry.get(prompt) for prompt in prompts]
+    missing = [j for j, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        for j, embedding in zip(missing, embed_texts([prompts[j] for j in missing], max_retries=max_retries)):
+            embeddings[j] = embedding
+
+    collection = get_vectorstore(vectorstore_path)._collection
+
+    lexical_index = None
+    if (mode or RETRIEVAL_MODE) == "hybrid":
+        lexical_index = get_lexical_index(vectorstore_path, create=False)
+        if lexical_index is not None and not len(lexical_index):
+            lexical_index = None
+    lexical_queries = [query or prompt for query, prompt in zip(lexical_queries or [None] * len(prompts), prompts)]
+
+    # El índice léxico filtra por tipo él mismo; solo la convocatoria hay que resolverla en
+    # Chroma, y son los fragmentos de una sola convocatoria, no los de toda la base.
+    allowed_ids = None
+    if lexical_index is not None and doc_id:
+        allowed_ids = set(collection.get(where=convocatoria_filter(doc_id), include=[])["ids"])
+
+    def consultar(tablas: bool) -> list:
+        results = collection.query(
+            query_embeddings=embeddings,
+            n_results=n_results,
+            where=tipo_filter(doc_id, tablas),
+            include=["documents", "metadatas", "distances"]
+        )
+        vectoriales = [
+            [
+                (id_, Document(page_content=content, metadata=metadata or {}), distance)
+                for id_, content, metadata, distance in zip(ids, documents, metadatas, distances)
+            ]
+            for ids, documents, metadatas, distances in zip(results["ids"], results["documents"], results["metadatas"], results["distances"])
+        ]
+
+        if lexical_index is None:
+            return [[(doc, distance) for _, doc, distance in resultados] for resultados in vectoriales]
+
+        lexicos = [lexical_index.search(query, n_results, allowed_ids, tablas=tablas) for query in lexical_queries]
+        return fuse_rankings(collection, vectoriales, lexicos, n_results)
+
+    tablas = consultar(tablas=True)
+    textos = [[] for _ in prompts] if find_table else consultar(tablas=False)
+
+    if doc_id:
+        for resultados in tablas + textos:
+            for doc, _ in resultados:
+                doc.metadata["id"] = doc_id_for(doc.metadata, doc_id)
+    return list(zip(textos, tablas))
 
 
 def process_temp_pdfs_batch(pdf_dir: str, db_dir: str):
@@ -254,38 +729,121 @@ def process_pdfs_to_shared_db(pdf_dir="data/pdf", db_dir="db/vec_ayudas_db"):
     Procesa todos los PDFs en el directorio dado (`pdf_dir`) y sus subdirectorios, 
     y guarda sus vectores en una única base de datos vectorial ubicada en `db_dir`.
 
-    Evita reprocesar PDFs que ya fueron agregados, verificando si un archivo de marca
-    existe en una subcarpeta `processed_files` dentro de `db_dir`.
+    La indexación es incremental a partir del manifiesto SQLite de `db_dir` (IndexManifest):
+    los ficheros con el mismo tamaño y mtime que en la ejecución anterior no se vuelven a
+    leer, y en una sola pasada se calcula qué contenidos hay que indexar (nuevos, modificados
+    o extraídos con otra versión del extractor), en cuáles solo cambian las convocatorias y
+    cuáles ya no existen y se borran de la base vectorial.
+
+    Los PDFs con el mismo contenido (enlaces al mismo blob de pdf_store, o copias) se indexan
+    una sola vez, con todas las convocatorias a las que pertenecen en los metadatos.
     """
     os.makedirs(db_dir, exist_ok=True)
-    processed_dir = os.path.join(db_dir, "processed_files")
-    os.makedirs(processed_dir, exist_ok=True)
-
-    pdf_paths_to_process = []
-
-    for root, _, files in os.walk(pdf_dir):
-        for filename in files:
-            if filename.lower().endswith(".pdf"):
-                name_without_ext = os.path.splitext(filename)[0]
-                marker_path = os.path.join(processed_dir, f"{name_without_ext}.done")
-
-                if os.path.exists(marker_path):
-                    print(f"Skipping '{filename}' (already processed).")
-                    continue
-
-                pdf_path = os.path.join(root, filename)
-                pdf_paths_to_process.append((pdf_path, name_without_ext))
-
-    if not pdf_paths_to_process:
-        print("No hay nuevos PDFs por procesar.")
-        return
-
-    pdf_files = [pdf_path for pdf_path, _ in pdf_paths_to_process]
-    save_pdf_at_vec_db(pdf_files, db_dir)
-
-    for _, name_without_ext in pdf_paths_to_process:
-        marker_path = os.path.join(processed_dir, f"{name_without_ext}.done")
-        with open(marker_path, "w") as f:
-            f.write("done")
+    manifest = IndexManifest(manifest_path(db_dir))
+    try:
+        _sync_shared_db(pdf_dir, db_dir, manifest)
+    finally:
+        manifest.close()
+
+
+def _sync_shared_db(pdf_dir: str, db_dir: str, manifest: IndexManifest):
+    ensure_lexical_index(db_dir)
+    registrados = manifest.files()
+    indexados = manifest.blobs()
+
+    ficheros = {}
+    rutas = {}
+    hashes_calculados = 0
+    for root, dirs, files in os.walk(pdf_dir):
+        dirs.sort()
+        for filename in sorted(files):
+            if not filename.lower().endswith(".pdf"):
+                continue
+
+            pdf_path = os.path.join(root, filename)
+            relativa = os.path.relpath(pdf_path, pdf_dir)
+            stat = os.stat(pdf_path)
+
+            anterior = registrados.get(relativa)
+            if anterior and anterior[2] == stat.st_size and anterior[3] == stat.st_mtime:
+                blob_sha = anterior[1]
+            else:
+                blob_sha = file_sha256(pdf_path)
+                hashes_calculados += 1
+
+            ficheros[relativa] = (os.path.basename(root), blob_sha, stat.st_size, stat.st_mtime)
+            rutas[relativa] = pdf_path
+
+    def owners_por_blob(registro: dict) -> dict:
+        owners = {}
+        for convocatoria_id, blob_sha, _, _ in registro.values():
+            owners.setdefault(blob_sha, [])
+            if convocatoria_id not in owners[blob_sha]:
+                owners[blob_sha].append(convocatoria_id)
+        return owners
+
+    def docs_por_blob(registro: dict) -> dict:
+        docs = {}
+        for relativa, (_, blob_sha, _, _) in sorted(registro.items()):
+            doc_id = os.path.splitext(os.path.basename(relativa))[0]
+            docs.setdefault(blob_sha, [])
+            if doc_id not in docs[blob_sha]:
+                docs[blob_sha].append(doc_id)
+        return docs
+
+    owners_actuales = owners_por_blob(ficheros)
+    owners_anteriores = owners_por_blob(registrados)
+    docs_actuales = docs_por_blob(ficheros)
+    docs_anteriores = docs_por_blob(registrados)
+    representantes = {}
+    for relativa, (_, blob_sha, _, _) in ficheros.items():
+        representantes.setdefault(blob_sha, rutas[relativa])
+
+    a_indexar = [blob_sha for blob_sha in owners_actuales if indexados.get(blob_sha) != EXTRACTOR_VERSION]
+    a_actualizar = [
+        blob_sha for blob_sha in owners_actuales
+        if blob_sha in indexados and blob_sha not in a_indexar
+        and (set(owners_actuales[blob_sha]) != set(owners_anteriores.get(blob_sha, []))
+             or set(docs_actuales[blob_sha]) != set(docs_anteriores.get(blob_sha, [])))
+    ]
+    a_eliminar = [blob_sha for blob_sha in indexados if blob_sha not in owners_actuales]
+
+    print(
+        f"{len(ficheros)} PDFs ({hashes_calculados} con hash recalculado): {len(a_indexar)} contenidos por indexar, "
+        f"{len(a_actualizar)} con convocatorias actualizadas y {len(a_eliminar)} eliminados."
+    )
 
-    print(f"Procesados {len(pdf_paths_to_process)} PDFs.")
+    if a_indexar:
+        pdf_files = [representantes[blob_sha] for blob_sha in a_indexar]
+        owners = {representantes[blob_sha]: owners_actuales[blob_sha] for blob_sha in a_indexar}
+        aliases = {representantes[blob_sha]: docs_actuales[blob_sha] for blob_sha in a_indexar}
+        chunk_ids = save_pdf_at_vec_db(pdf_files, db_dir, owners=owners, aliases=aliases)
+
+        for blob_sha in a_indexar:
+            if blob_sha in chunk_ids:
+                doc_id = os.path.splitext(os.path.basename(representantes[blob_sha]))[0]
+                manifest.record_blob(blob_sha, doc_id, EXTRACTOR_VERSION, chunk_ids[blob_sha])
+                if blob_sha in indexados:
+                    a_actualizar.append(blob_sha)
+
+    for blob_sha in a_actualizar:
+        actuales = owners_actuales[blob_sha]
+        anteriores = owners_anteriores.get(blob_sha, [])
+        nuevas = [convocatoria_id for convocatoria_id in actuales if convocatoria_id not in anteriores]
+        quitadas = [convocatoria_id for convocatoria_id in anteriores if convocatoria_id not in actuales]
+        docs_nuevos = [doc_id for doc_id in docs_actuales[blob_sha] if doc_id not in docs_anteriores.get(blob_sha, [])]
+        docs_quitados = [doc_id for doc_id in docs_anteriores.get(blob_sha, []) if doc_id not in docs_actuales[blob_sha]]
+        actualizados = update_owners(db_dir, manifest.chunk_ids(blob_sha), add=nuevas, remove=quitadas,
+                                     add_docs=docs_nuevos, remove_docs=docs_quitados)
+        print(f"{os.path.basename(representantes[blob_sha])}: {actualizados} fragmentos, +{len(nuevas)}/-{len(quitadas)} convocatorias.")
+
+    if a_eliminar:
+        collection = get_vectorstore(db_dir)._collection
+        lexical_index = get_lexical_index(db_dir)
+        for blob_sha in a_eliminar:
+            obsoletos = manifest.remove_blob(blob_sha)
+            if obsoletos:
+                collection.delete(ids=obsoletos)
+                lexical_index.delete(obsoletos)
+
+    manifest.set_files(ficheros)
@@ -1,23 +1,11 @@
 import os
 from dotenv import load_dotenv
-from langchain_openai import AzureChatOpenAI
 from browser_use.agent.service import Agent, Controller, Browser
+from app_navigation.utils.azure_clients import get_chat_llm
 
 load_dotenv()
 
-azure_openai_api_key = os.getenv('AZURE_OPENAI_KEY')
-azure_openai_endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
-
-if not azure_openai_api_key or not azure_openai_endpoint:
-    raise ValueError('AZURE_OPENAI_KEY or AZURE_OPENAI_ENDPOINT is not set')
-
-llm = AzureChatOpenAI(
-    model_name='gpt-4.1',
-    openai_api_key=azure_openai_api_key,
-    azure_endpoint=azure_openai_endpoint, 
-    deployment_name='gpt-4.1',
-    api_version='2024-12-01-preview',
-)
+llm = get_chat_llm(deployment_name='gpt-4.1', api_version='2024-12-01-preview')
 
 output_dir = "data/nav_urls"
 os.makedirs(output_dir, exist_ok=True)
@@ -0,0 +1,50 @@
+import os
+import threading
+import httpx
+from dotenv import load_dotenv
+from langchain_openai import AzureChatOpenAI
+
+load_dotenv()
+
+_llms = {}
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    # El pool limita también las peticiones simultáneas contra el despliegue.
+    concurrency = int(os.getenv("AZURE_MAX_CONCURRENCY", 8))
+    return httpx.Limits(
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        keepalive_expiry=60
+    )
+
+
+def get_chat_llm(deployment_name: str, api_version: str) -> AzureChatOpenAI:
+    """
+    Devuelve el modelo de chat compartido para `deployment_name`, con clientes HTTP síncrono
+    y asíncrono keep-alive propios del despliegue.
+
+    Los reintentos quedan en manos del SDK de OpenAI (backoff exponencial con jitter que
+    respeta Retry-After), configurados con AZURE_MAX_RETRIES como en el resto de apps.
+    """
+    api_key = os.getenv("AZURE_OPENAI_KEY")
+    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+
+    if not api_key or not endpoint:
+        raise ValueError('AZURE_OPENAI_KEY or AZURE_OPENAI_ENDPOINT is not set')
+
+    with _lock:
+        if deployment_name not in _llms:
+            timeout = httpx.Timeout(120, connect=10)
+            _llms[deployment_name] = AzureChatOpenAI(
+                model_name=deployment_name,
+                openai_api_key=api_key,
+                azure_endpoint=endpoint,
+                deployment_name=deployment_name,
+                api_version=api_version,
+                max_retries=int(os.getenv("AZURE_MAX_RETRIES", 6)),
+                http_client=httpx.Client(limits=_limits(), timeout=timeout),
+                http_async_client=httpx.AsyncClient(limits=_limits(), timeout=timeout)
+            )
+        return _llms[deployment_name]